@@ -5,11 +5,19 @@ __author__ = "Nasrollah Yusefi"
 __version__ = "0.3.3"
 
 __all__ = [
+    "MemoryMetaStore",
+    "Policy",
     "change_root_store",
+    "change_timing_wheel",
     "register_next_step",
     "unregister_steps",
     "wait_for",
+    "listen",
+    "Subscription",
     "clear",
+    "RedisMetaStore",
+    "TimingWheel",
+    "StepExecutor",
     "aiogram_dialect",
     "telebot_dialect",
     "telethon_dialect",
@@ -17,16 +25,28 @@ __all__ = [
     "StateContext",
     "MemoryStateStorage",
     "FileStateStorage",
+    "LogFileStateStorage",
+    "SQLiteStateStorage",
+    "ShardedFileStateStorage",
+    "rebalance_shards",
     "RedisStateStorage"
 ]
 
 from .steps import (
     MetaStore as MetaStore,
+    MemoryMetaStore as MemoryMetaStore,
+    Policy as Policy,
     change_root_store as change_root_store,
+    change_timing_wheel as change_timing_wheel,
     register_next_step as register_next_step,
     unregister_steps as unregister_steps,
     wait_for as wait_for,
+    listen as listen,
+    Subscription as Subscription,
     clear as clear,
+    RedisMetaStore as RedisMetaStore,
+    TimingWheel as TimingWheel,
+    StepExecutor as StepExecutor,
     aiogram_dialect as aiogram_dialect,
     telebot_dialect as telebot_dialect,
     telethon_dialect as telethon_dialect
@@ -35,5 +55,9 @@ from .storage import (
     BaseStorage, StateContext,
     MemoryStateStorage,
     FileStateStorage,
+    LogFileStateStorage,
+    SQLiteStateStorage,
+    ShardedFileStateStorage,
+    rebalance_shards,
     RedisStateStorage
 )
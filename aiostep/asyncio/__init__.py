@@ -2,11 +2,17 @@ from .base import BaseAsyncStorage
 from .memory import AsyncMemoryStateStorage
 from .redis import AsyncRedisStateStorage
 from .file import AsyncFileStateStorage
+from .log import AsyncLogFileStateStorage
+from .sqlite import AsyncSQLiteStateStorage
+from .sharded import AsyncShardedFileStateStorage
 
 
 __all__ = [
     'BaseAsyncStorage',
     'AsyncMemoryStateStorage',
     'AsyncRedisStateStorage',
-    'AsyncFileStateStorage'
+    'AsyncFileStateStorage',
+    'AsyncLogFileStateStorage',
+    'AsyncSQLiteStateStorage',
+    'AsyncShardedFileStateStorage'
 ]
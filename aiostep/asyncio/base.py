@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
+from collections.abc import Mapping
 from enum import Enum
-from typing import Any, Union, Optional, Dict
+from typing import Callable, Any, Union, Optional, Dict, Iterable, List
 
 
 class BaseAsyncStorage(ABC):
@@ -60,3 +61,95 @@ class BaseAsyncStorage(ABC):
         use this method to clear and get current data of a key
         """
         raise NotImplementedError
+
+    async def get_data_field(self, key: Union[str, int], field: str, default: Optional[Any] = None) -> Any:
+        """
+        use this method to get a single field of current data of a key
+
+        return default if not found
+        """
+        data = await self.get_data(key)
+        if not isinstance(data, Mapping):
+            return default
+        return data.get(field, default)
+
+    async def delete_data_field(self, key: Union[str, int], field: str, default: Optional[Any] = None) -> Any:
+        """
+        use this method to delete and get a single field of current data of a key
+
+        return default if not found
+        """
+        data = await self.get_data(key)
+        if not isinstance(data, Mapping) or field not in data:
+            return default
+
+        # get_data may give a read-only mapping, e.g. memory storages with `copy_on_write`
+        data = dict(data)
+        value = data.pop(field)
+        await self.set_data(key, data)
+        return value
+
+    async def transition(
+        self,
+        key: Union[str, int],
+        expected: Optional[Union[str, Enum]],
+        new: Union[str, Enum],
+        data_patch: Optional[Dict[Any, Any]] = None
+    ) -> bool:
+        """
+        use this method to set state of a key only if its current state is `expected`
+
+        return True if state was changed
+        """
+        raise NotImplementedError
+
+    async def get_states_many(self, keys: Iterable[Union[str, int]], default: Optional[Any] = None) -> List[Any]:
+        """
+        use this method to get current states of many keys
+
+        return states in order of keys, default for not found ones
+        """
+        return [await self.get_state(key, default) for key in keys]
+
+    async def set_states_many(
+        self,
+        states: Dict[Union[str, int], Union[str, Enum]],
+        callback: Optional[Callable[..., Any]] = None,
+        ex: Optional[float] = None
+    ) -> None:
+        """
+        use this method to set states for many keys, `states` maps keys to states
+        """
+        for key, state in states.items():
+            await self.set_state(key, state, callback=callback, ex=ex)
+
+    async def delete_states_many(self, keys: Iterable[Union[str, int]], default: Optional[Any] = None) -> List[Any]:
+        """
+        use this method to delete and get current states of many keys
+
+        return states in order of keys, default for not found ones
+        """
+        return [await self.delete_state(key, default) for key in keys]
+
+    async def get_data_many(self, keys: Iterable[Union[str, int]], default: Optional[Any] = None) -> List[Any]:
+        """
+        use this method to get current data of many keys
+
+        return data in order of keys, default for not found ones
+        """
+        return [await self.get_data(key, default) for key in keys]
+
+    async def set_data_many(self, data: Dict[Union[str, int], Dict[Any, Any]], ex: Optional[float] = None) -> None:
+        """
+        use this method to set data for many keys, `data` maps keys to their data
+        """
+        for key, key_data in data.items():
+            await self.set_data(key, key_data, ex=ex)
+
+    async def delete_data_many(self, keys: Iterable[Union[str, int]], default: Optional[Any] = None) -> List[Any]:
+        """
+        use this method to clear and get current data of many keys
+
+        return data in order of keys, default for not found ones
+        """
+        return [await self.delete_data(key, default) for key in keys]
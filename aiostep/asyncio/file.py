@@ -1,10 +1,11 @@
 import os
 import time
+import heapq
+import asyncio
 from qsave.asyncio import AsyncQuickSave
 
 from enum import Enum
-from typing import Callable, Any, Union, Dict, Optional
-from copy import deepcopy
+from typing import Callable, Any, Union, Dict, Optional, Iterable, List, Tuple
 
 from .base import BaseAsyncStorage
 from ..storage.base import StateContext
@@ -17,18 +18,66 @@ class AsyncFileStateStorage(BaseAsyncStorage):
     and their associated data. Suitable for applications where persistence
     across sessions or restarts is required.
 
+    Every change rewrites the whole file. With `group_commit=True` changes are
+    queued and a background task applies up to `commit_batch` of them, or all
+    queued in `commit_window` seconds, in one session with a single write.
+
     Args:
         path (str | os.PathLike): Path to the file used for storing states and data.
+        group_commit (bool): Write changes in batches from a background task.
+        commit_window (float): Seconds to wait for more changes before writing a batch.
+        commit_batch (int): Number of changes which are written without waiting.
+        ack (str): When writes of group commit return, `"durable"` after the
+            batch is written to the file, or `"enqueue"` right after queueing.
+            Methods which return a value always wait until the change is applied.
     """
 
-    def __init__(self, path: Union[str, os.PathLike], ex: Optional[float] = None, **kwargs) -> None:
+    def __init__(
+        self,
+        path: Union[str, os.PathLike],
+        ex: Optional[float] = None,
+        group_commit: bool = False,
+        commit_window: float = 0.005,
+        commit_batch: int = 100,
+        ack: str = "durable",
+        **kwargs
+    ) -> None:
         """Initialize the file storage.
 
         Args:
             path (str | os.PathLike): File path to store states and data persistently.
+            ex (float | None, optional): Expiration time for states and data. Defaults to None.
+            group_commit (bool, optional): Write changes in batches. Defaults to False.
+            commit_window (float, optional): Seconds to collect a batch. Defaults to 0.005.
+            commit_batch (int, optional): Maximum changes in a batch. Defaults to 100.
+            ack (str, optional): `"durable"` or `"enqueue"`. Defaults to "durable".
         """
+        if ack not in ("durable", "enqueue"):
+            raise ValueError(f"'ack' must be 'durable' or 'enqueue', got {ack!r}")
+        if commit_batch <= 0:
+            raise ValueError(f"'commit_batch' must be positive, got {commit_batch}")
+
         self.cache = AsyncQuickSave(path=path, **kwargs)
         self.ex = ex
+        self.group_commit = group_commit
+        self.commit_window = commit_window
+        self.commit_batch = commit_batch
+        self.ack = ack
+
+        # (operation, future, resolve before the batch is written)
+        self._queue: List[Tuple[Callable[[dict], Any], Optional[asyncio.Future], bool]] = []
+        self._pending = 0
+        self._full: Optional[asyncio.Event] = None
+        self._writer: Optional[asyncio.Task] = None
+        # sessions read the whole file and write it back, so only one may be open
+        self._lock: Optional[asyncio.Lock] = None
+
+        # (expire time, key) of written records, checked by `sweep`
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._expiry_loaded = False
+        self._sweeper: Optional[asyncio.Task] = None
+        self.purged = 0
+        self.sweeps = 0
 
     def _get_key(self, user_id: Union[int, str]) -> str:
         """Generate Cache key for a user.
@@ -51,7 +100,188 @@ class AsyncFileStateStorage(BaseAsyncStorage):
             str: Cache key
         """
         return f"data:{user_id}"
-    
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def _run(self, operation: Callable[[dict], Any], write: bool = True, returns: bool = False) -> Any:
+        """Run `operation` on the stored dict and write the file if needed.
+
+        Reads write the file only if they removed expired keys. In group commit
+        mode reads are queued too while there are queued changes, so they see them.
+        """
+        if self.group_commit and (write or self._pending):
+            durable = write and self.ack == "durable"
+            return await self._submit(operation, wait=returns or durable or not write, early=not durable)
+
+        async with self._get_lock(), self.cache.session(commit_on_expire=False) as session:
+            size = len(session.bef_data)
+            result = operation(session.bef_data)
+            if write or len(session.bef_data) != size:
+                await session.commit()
+        return result
+
+    async def _submit(self, operation: Callable[[dict], Any], wait: bool = True, early: bool = False) -> Any:
+        if self._writer is None or self._writer.done():
+            self._full = asyncio.Event()
+            self._writer = asyncio.ensure_future(self._write_batches())
+
+        future = asyncio.get_running_loop().create_future() if wait else None
+        self._queue.append((operation, future, early))
+        self._pending += 1
+        if len(self._queue) >= self.commit_batch:
+            self._full.set()
+
+        if future is not None:
+            return await future
+
+    async def _write_batches(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._queue:
+            if len(self._queue) < self.commit_batch:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.commit_window)
+                except asyncio.TimeoutError:
+                    pass
+            self._full.clear()
+
+            batch, self._queue = self._queue[:self.commit_batch], self._queue[self.commit_batch:]
+            if len(self._queue) >= self.commit_batch:
+                self._full.set()
+
+            results = []
+            try:
+                async with self._get_lock(), self.cache.session(commit_on_expire=False) as session:
+                    for operation, future, early in batch:
+                        try:
+                            result = (operation(session.bef_data), None)
+                        except Exception as exc:
+                            result = (None, exc)
+                        if early:
+                            self._resolve(future, *result)
+                        results.append(result)
+                    await session.commit()
+            except Exception as exc:
+                results = [(None, exc)] * len(batch)
+            finally:
+                self._pending -= len(batch)
+
+            for (operation, future, early), (result, exc) in zip(batch, results):
+                if not early:
+                    self._resolve(future, result, exc)
+                elif future is None and exc is not None:
+                    loop.call_exception_handler({
+                        "message": f"Exception in queued write {operation!r}",
+                        "exception": exc
+                    })
+
+    def _resolve(self, future: Optional[asyncio.Future], result: Any, exc: Optional[BaseException]) -> None:
+        if future is None or future.done():
+            return
+        if exc is not None:
+            future.set_exception(exc)
+        else:
+            future.set_result(result)
+
+    async def flush(self) -> None:
+        """Wait until all queued changes are written to the file."""
+        if self._pending:
+            await self._submit(lambda data: None)
+
+    async def close(self) -> None:
+        """Stop the sweeper, write queued changes and stop the background writer."""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+
+        await self.flush()
+        if self._writer is not None:
+            await self._writer
+            self._writer = None
+
+    def _state_context(self, record: Dict[str, Any]) -> StateContext:
+        # records may also have an "expire" key, which isn't a field of StateContext
+        return StateContext(
+            current_state=record.get("current_state"),
+            callback=record.get("callback"),
+            chat_id=record.get("chat_id")
+        )
+
+    def _index_expiry(self, key: str, expire: float) -> None:
+        heapq.heappush(self._expiry_heap, (expire, key))
+
+    def _sweep_records(self, records: Any, limit: Optional[int]) -> int:
+        if not self._expiry_loaded:
+            # records written before this process started are indexed once.
+            entries = set(self._expiry_heap)
+            entries.update(
+                (record["expire"], key) for key, record in records.items()
+                if isinstance(record, dict) and record.get("expire")
+            )
+            self._expiry_heap = list(entries)
+            heapq.heapify(self._expiry_heap)
+            self._expiry_loaded = True
+
+        now = time.time()
+        checked = removed = 0
+        while self._expiry_heap and self._expiry_heap[0][0] <= now and (limit is None or checked < limit):
+            _, key = heapq.heappop(self._expiry_heap)
+            checked += 1
+
+            # the record may be deleted or written again with a later expire time.
+            if self._is_expired(records.get(key)):
+                records.pop(key)
+                removed += 1
+
+        return removed
+
+    def sweep_stats(self) -> Dict[str, int]:
+        """Give counters of removed expired records.
+
+        Returns:
+            dict[str, int]: `purged` records, number of `sweeps` and `indexed` expire times
+        """
+        return {"purged": self.purged, "sweeps": self.sweeps, "indexed": len(self._expiry_heap)}
+
+    async def sweep(self, limit: Optional[int] = None) -> int:
+        """Remove expired states and data.
+
+        Expire times written by this storage are kept in a heap, so only due
+        records are checked. Records of the file are indexed on the first sweep.
+
+        Args:
+            limit (int | None, optional): Maximum number of due records to check.
+                Defaults to None (all of them).
+
+        Returns:
+            int: Number of removed states and data
+        """
+        removed = await self._run(lambda records: self._sweep_records(records, limit), write=False)
+        self.purged += removed
+        self.sweeps += 1
+        return removed
+
+    def start_sweeper(self, interval: float = 60.0, limit: Optional[int] = 1000) -> asyncio.Task:
+        """Start a task which calls `sweep` every `interval` seconds.
+
+        Args:
+            interval (float, optional): Seconds between sweeps. Defaults to 60.
+            limit (int | None, optional): Maximum records checked per sweep. Defaults to 1000.
+
+        Returns:
+            asyncio.Task: The sweeper task, cancel it to stop sweeping
+        """
+        async def sweeper() -> None:
+            while True:
+                await asyncio.sleep(interval)
+                await self.sweep(limit)
+
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.ensure_future(sweeper())
+        return self._sweeper
+
     async def set_state(
         self, 
         user_id: Union[int, str], 
@@ -75,6 +305,7 @@ class AsyncFileStateStorage(BaseAsyncStorage):
             state = state.name
 
         callback_name = callback.__name__ if callback else None
+        ex = ex or self.ex
 
         state_data = {
             "current_state": state,
@@ -83,10 +314,13 @@ class AsyncFileStateStorage(BaseAsyncStorage):
         }
         if ex:
             state_data["expire"] = time.time() + ex
+            self._index_expiry(self._get_key(user_id), state_data["expire"])
         state_key = self._get_key(user_id)
 
-        async with self.cache.session() as session:
-            session[state_key] = state_data
+        def operation(records: dict) -> None:
+            records[state_key] = state_data
+
+        await self._run(operation)
 
     async def get_state(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[StateContext]:
         """Get the state context for a user.
@@ -99,17 +333,20 @@ class AsyncFileStateStorage(BaseAsyncStorage):
         Returns:
             StateContext | None: The state context or default value
         """
-        async with self.cache.session(commit_on_expire=False) as session:
-            data = session.get(self._get_key(user_id))
+        state_key = self._get_key(user_id)
 
-            if not data:
-                return default
-            if data.get("expire") and (data.get("expire") < time.time()):
-                session.pop(self._get_key(user_id))
-                await session.commit()
-                return default
+        def operation(records: dict) -> Optional[dict]:
+            data = records.get(state_key)
+            if data and self._is_expired(data):
+                records.pop(state_key)
+                return None
+            return data
+
+        data = await self._run(operation, write=False)
+        if not data:
+            return default
 
-        return StateContext(**data)
+        return self._state_context(data)
 
     async def delete_state(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[StateContext]:
         """Delete the state for a user.
@@ -124,15 +361,14 @@ class AsyncFileStateStorage(BaseAsyncStorage):
         """
         state_key = self._get_key(user_id)
 
-        async with self.cache.session() as session:
-            data = session.pop(state_key)
+        data = await self._run(lambda records: records.pop(state_key, None), returns=True)
 
         if not data:
             return default
         if data.get("expire") and (data.get("expire") < time.time()):
             return default
 
-        return StateContext(**data)
+        return self._state_context(data)
 
     async def set_data(
         self, 
@@ -151,15 +387,18 @@ class AsyncFileStateStorage(BaseAsyncStorage):
         if not isinstance(data, dict):
             raise ValueError(f"'data' must be a dict, got {type(data)}")
 
-        data = deepcopy(data)
+        data = dict(data)
 
         data_key = self._get_data_key(user_id)
         ex = ex or self.ex
         if ex:
             data["expire"] = time.time() + ex
+            self._index_expiry(self._get_data_key(user_id), data["expire"])
 
-        async with self.cache.session() as session:
-            session[data_key] = data
+        def operation(records: dict) -> None:
+            records[data_key] = data
+
+        await self._run(operation)
 
     async def get_data(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[Dict[Any, Any]]:
         """Get data for a user.
@@ -172,15 +411,18 @@ class AsyncFileStateStorage(BaseAsyncStorage):
         Returns:
             dict[str, Any] | None: The stored data or None if not found
         """
-        async with self.cache.session(commit_on_expire=False) as session:
-            data = session.get(self._get_data_key(user_id))
+        data_key = self._get_data_key(user_id)
 
-            if not data:
-                return default
-            if data.get("expire") and (data.get("expire") < time.time()):
-                session.pop(self._get_data_key(user_id))
-                await session.commit()
-                return default
+        def operation(records: dict) -> Optional[dict]:
+            data = records.get(data_key)
+            if data and self._is_expired(data):
+                records.pop(data_key)
+                return None
+            return data
+
+        data = await self._run(operation, write=False)
+        if not data:
+            return default
 
         return data
 
@@ -207,20 +449,21 @@ class AsyncFileStateStorage(BaseAsyncStorage):
         if not isinstance(data, dict):
             raise ValueError(f"'data' must be a dict, got {type(data)}")
 
-        data = deepcopy(data)
+        data = dict(data)
 
         data_key = self._get_data_key(user_id)
         ex = ex or self.ex
         if ex:
             data["expire"] = time.time() + ex
+            self._index_expiry(self._get_data_key(user_id), data["expire"])
+
+        def operation(records: dict) -> None:
+            current_data = records.get(data_key)
 
-        async with self.cache.session() as session:
-            current_data = session.get(data_key)
+            # a new dict, so data returned by reads of the same batch doesn't change.
+            records[data_key] = {**current_data, **data} if current_data else data
 
-            if current_data:
-                current_data.update(data)
-            else:
-                session[data_key] = data
+        await self._run(operation)
 
     async def delete_data(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[Dict[Any, Any]]:
         """Clear and get all data for a user.
@@ -234,11 +477,243 @@ class AsyncFileStateStorage(BaseAsyncStorage):
             Dict | None: The deleted data or default value
         """
         data_key = self._get_data_key(user_id)
-        async with self.cache.session() as session:
-            data = session.pop(data_key, default)
+        data = await self._run(lambda records: records.pop(data_key, default), returns=True)
 
         if isinstance(data, dict):
             if data.get("expire") and (data.get("expire") < time.time()):
                 return default
 
         return data
+
+    async def transition(
+        self,
+        user_id: Union[int, str],
+        expected: Optional[Union[str, Enum]],
+        new: Union[str, Enum],
+        data_patch: Optional[Dict[Any, Any]] = None,
+        ex: Optional[float] = None,
+        *,
+        callback: Optional[Callable[..., Any]] = None,
+        chat_id: Optional[Union[int, str]] = None
+    ) -> bool:
+        """Move a user to a new state only if the user is in the expected state.
+
+        The check and both writes are done in a single session.
+
+        Args:
+            user_id (int | str): ID of the user
+            expected (str | Enum | None): State the user must be in, None means no state
+            new (str | Enum): State to set
+            data_patch (dict[str, Any] | None, optional): Data to merge like `update_data`.
+                Defaults to None.
+            ex (float | None, optional): Expiration time for the state and data.
+                Defaults to None.
+            callback (Callable | None, optional): Callback function. Defaults to None.
+            chat_id (int | str, optional): Chat ID. Defaults to None.
+
+        Returns:
+            bool: True if the state was changed, False if the user wasn't in `expected`
+        """
+        if data_patch is not None and not isinstance(data_patch, dict):
+            raise ValueError(f"'data_patch' must be a dict, got {type(data_patch)}")
+
+        if chat_id is None:
+            chat_id = user_id
+
+        if isinstance(expected, Enum):
+            expected = expected.name
+        if isinstance(new, Enum):
+            new = new.name
+
+        ex = ex or self.ex
+        state_key = self._get_key(user_id)
+        data_key = self._get_data_key(user_id)
+
+        def operation(records: dict) -> bool:
+            state_data = records.get(state_key)
+            if state_data and self._is_expired(state_data):
+                state_data = None
+
+            current_state = state_data.get("current_state") if state_data else None
+            if current_state != expected:
+                return False
+
+            state_data = {
+                "current_state": new,
+                "chat_id": chat_id,
+                "callback": callback.__name__ if callback else None
+            }
+            if ex:
+                state_data["expire"] = time.time() + ex
+                self._index_expiry(self._get_key(user_id), state_data["expire"])
+            records[state_key] = state_data
+
+            if data_patch:
+                data = dict(data_patch)
+                if ex:
+                    data["expire"] = time.time() + ex
+                    self._index_expiry(self._get_data_key(user_id), data["expire"])
+
+                current_data = records.get(data_key)
+                records[data_key] = {**current_data, **data} if current_data else data
+            return True
+
+        return await self._run(operation, returns=True)
+
+    def _is_expired(self, record: Any) -> bool:
+        return isinstance(record, dict) and bool(record.get("expire")) and record["expire"] < time.time()
+
+    async def _get_many(self, keys: List[str], default: Any) -> List[Any]:
+        def operation(records: dict) -> List[Any]:
+            values = []
+            for key in keys:
+                record = records.get(key)
+                if self._is_expired(record):
+                    records.pop(key)
+                    record = None
+                values.append(record if record else default)
+            return values
+
+        return await self._run(operation, write=False)
+
+    async def _delete_many(self, keys: List[str], default: Any) -> List[Any]:
+        def operation(records: dict) -> List[Any]:
+            values = []
+            for key in keys:
+                record = records.pop(key, None)
+                values.append(record if record and not self._is_expired(record) else default)
+            return values
+
+        return await self._run(operation, returns=True)
+
+    async def get_states_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[StateContext]]:
+        """Get the state contexts of many users in one session.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without state.
+                Defaults to None.
+
+        Returns:
+            list[StateContext | None]: State contexts in order of `user_ids`
+        """
+        records = await self._get_many([self._get_key(user_id) for user_id in user_ids], None)
+        return [self._state_context(record) if record else default for record in records]
+
+    async def set_states_many(
+        self,
+        states: Dict[Union[int, str], Union[str, Enum]],
+        callback: Optional[Callable[..., Any]] = None,
+        ex: Optional[float] = None
+    ) -> None:
+        """Set states of many users in one session.
+
+        Args:
+            states (dict[int | str, str | Enum]): States mapped by user IDs
+            callback (Callable | None, optional): Callback function for all users.
+                Defaults to None.
+            ex (float | None, optional): Expiration time of the states.
+                Defaults to None.
+        """
+        callback_name = callback.__name__ if callback else None
+        ex = ex or self.ex
+
+        def operation(records: dict) -> None:
+            for user_id, state in states.items():
+                state_data = {
+                    "current_state": state.name if isinstance(state, Enum) else state,
+                    "chat_id": user_id,
+                    "callback": callback_name
+                }
+                if ex:
+                    state_data["expire"] = time.time() + ex
+                    self._index_expiry(self._get_key(user_id), state_data["expire"])
+                records[self._get_key(user_id)] = state_data
+
+        await self._run(operation)
+
+    async def delete_states_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[StateContext]]:
+        """Delete and get the states of many users in one session.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without state.
+                Defaults to None.
+
+        Returns:
+            list[StateContext | None]: Deleted state contexts in order of `user_ids`
+        """
+        records = await self._delete_many([self._get_key(user_id) for user_id in user_ids], None)
+        return [self._state_context(record) if record else default for record in records]
+
+    async def get_data_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[Dict[Any, Any]]]:
+        """Get data of many users in one session.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without data.
+                Defaults to None.
+
+        Returns:
+            list[dict[str, Any] | None]: Data in order of `user_ids`
+        """
+        return await self._get_many([self._get_data_key(user_id) for user_id in user_ids], default)
+
+    async def set_data_many(
+        self,
+        data: Dict[Union[int, str], Dict[Any, Any]],
+        ex: Optional[float] = None
+    ) -> None:
+        """Set data of many users in one session.
+
+        This method completely replaces any existing data of the users.
+
+        Args:
+            data (dict[int | str, dict[str, Any]]): Data mapped by user IDs
+            ex (float | None, optional): Expiration time of the data.
+                Defaults to None.
+        """
+        for user_data in data.values():
+            if not isinstance(user_data, dict):
+                raise ValueError(f"'data' values must be dicts, got {type(user_data)}")
+
+        ex = ex or self.ex
+
+        def operation(records: dict) -> None:
+            for user_id, user_data in data.items():
+                user_data = dict(user_data)
+                if ex:
+                    user_data["expire"] = time.time() + ex
+                    self._index_expiry(self._get_data_key(user_id), user_data["expire"])
+                records[self._get_data_key(user_id)] = user_data
+
+        await self._run(operation)
+
+    async def delete_data_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[Dict[Any, Any]]]:
+        """Clear and get data of many users in one session.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without data.
+                Defaults to None.
+
+        Returns:
+            list[dict[str, Any] | None]: Deleted data in order of `user_ids`
+        """
+        return await self._delete_many([self._get_data_key(user_id) for user_id in user_ids], default)
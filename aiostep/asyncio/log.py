@@ -0,0 +1,219 @@
+import os
+import asyncio
+
+from enum import Enum
+from typing import Callable, Any, Union, Dict, Optional
+
+from .base import BaseAsyncStorage
+from ..storage.base import StateContext
+from ..storage.log import LogFileStateStorage
+
+
+class AsyncLogFileStateStorage(BaseAsyncStorage):
+    """Append-only file storage implementation for managing bot states.
+
+    Async version of `LogFileStateStorage`. Reads are served from memory and
+    appending a line is cheap, so they run in the loop; compaction, and writes
+    with `fsync=True`, run in a thread so they don't block other updates.
+
+    Args:
+        path (str | os.PathLike): Path to the log file.
+        ex (float | None): Expiration time for states and data.
+        fsync (bool): Call `os.fsync` after every write.
+        compact_ratio (float): Records per live key which trigger compaction.
+        compact_min (int): Minimum number of records before compaction.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, os.PathLike],
+        ex: Optional[float] = None,
+        fsync: bool = False,
+        compact_ratio: float = 2.0,
+        compact_min: int = 1000
+    ) -> None:
+        """Initialize the log storage and load the log.
+
+        Args:
+            path (str | os.PathLike): File path to store states and data persistently.
+            ex (float | None, optional): Expiration time for states and data. Defaults to None.
+            fsync (bool, optional): Sync the file to disk on every write. Defaults to False.
+            compact_ratio (float, optional): Records per live key which trigger compaction.
+                Defaults to 2.
+            compact_min (int, optional): Minimum number of records before compaction.
+                Defaults to 1000.
+        """
+        self.storage = LogFileStateStorage(
+            path,
+            ex=ex,
+            fsync=fsync,
+            compact_ratio=compact_ratio,
+            compact_min=compact_min,
+            auto_compact=False
+        )
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def _write(self, method: Callable[..., Any], *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        async with self._get_lock():
+            if self.storage.fsync:
+                result = await loop.run_in_executor(None, lambda: method(*args, **kwargs))
+            else:
+                result = method(*args, **kwargs)
+
+            if self.storage.needs_compaction:
+                await loop.run_in_executor(None, self.storage.compact)
+            return result
+
+    async def compact(self) -> None:
+        """Rewrite the log with only live states and data in a thread."""
+        async with self._get_lock():
+            await asyncio.get_running_loop().run_in_executor(None, self.storage.compact)
+
+    async def close(self) -> None:
+        """Close the log file."""
+        async with self._get_lock():
+            self.storage.close()
+
+    async def set_state(
+        self,
+        user_id: Union[int, str],
+        state: Union[str, Enum],
+        callback: Optional[Callable[..., Any]] = None,
+        chat_id: Optional[Union[int, str]] = None,
+        ex: Optional[float] = None
+    ) -> None:
+        """Set the state for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            state (str | Enum): State to set
+            callback (Callable | None, optional): Callback function. Defaults to None.
+            chat_id (int | str, optional): Chat ID. Defaults to None.
+            ex (float | None, optional): Expiration time in seconds. Defaults to None.
+        """
+        await self._write(self.storage.set_state, user_id, state, callback=callback, chat_id=chat_id, ex=ex)
+
+    async def get_state(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[StateContext]:
+        """Get the state context for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            default (Any, optional): Default value if state doesn't exist.
+                Defaults to None.
+
+        Returns:
+            StateContext | None: The state context or default value
+        """
+        return self.storage.get_state(user_id, default)
+
+    async def delete_state(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[StateContext]:
+        """Delete the state for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            default (Any, optional): Default value if state doesn't exist.
+                Defaults to None.
+
+        Returns:
+            StateContext | None: The deleted state context or default value
+        """
+        return await self._write(self.storage.delete_state, user_id, default)
+
+    async def set_data(self, user_id: Union[int, str], data: Dict[Any, Any], ex: Optional[float] = None) -> None:
+        """Set data for a user.
+
+        This method completely replaces any existing data.
+
+        Args:
+            user_id (int | str): ID of the user
+            data (dict[str, Any]): Data to store
+            ex (float | None, optional): Expiration time in seconds. Defaults to None.
+        """
+        await self._write(self.storage.set_data, user_id, data, ex=ex)
+
+    async def get_data(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[Dict[Any, Any]]:
+        """Get data for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            default (Any, optional): Default value if data doesn't exist.
+                Defaults to None.
+
+        Returns:
+            dict[str, Any] | None: The stored data or None if not found
+        """
+        return self.storage.get_data(user_id, default)
+
+    async def update_data(self, user_id: Union[int, str], data: Dict[Any, Any], ex: Optional[float] = None) -> None:
+        """Update data for a user.
+
+        Only the given keys are written to the log.
+
+        Args:
+            user_id (int | str): ID of the user
+            data (dict[str, Any]): Data to update
+            ex (float | None, optional): New expiration time in seconds. Defaults to None.
+
+        Example:
+            >>> # Existing data: {"name": "John"}
+            >>> await storage.update_data(user_id, {"age": 25})
+            >>> # Result: {"name": "John", "age": 25}
+        """
+        await self._write(self.storage.update_data, user_id, data, ex=ex)
+
+    async def delete_data(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[Dict[Any, Any]]:
+        """Clear and get all data for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            default (Any, optional): Default value if data doesn't exist.
+                Defaults to None.
+
+        Returns:
+            Dict | None: The deleted data or default value
+        """
+        return await self._write(self.storage.delete_data, user_id, default)
+
+    async def transition(
+        self,
+        user_id: Union[int, str],
+        expected: Optional[Union[str, Enum]],
+        new: Union[str, Enum],
+        data_patch: Optional[Dict[Any, Any]] = None,
+        ex: Optional[float] = None,
+        *,
+        callback: Optional[Callable[..., Any]] = None,
+        chat_id: Optional[Union[int, str]] = None
+    ) -> bool:
+        """Move a user to a new state only if the user is in the expected state.
+
+        Args:
+            user_id (int | str): ID of the user
+            expected (str | Enum | None): State the user must be in, None means no state
+            new (str | Enum): State to set
+            data_patch (dict[str, Any] | None, optional): Data to merge like `update_data`.
+                Defaults to None.
+            ex (float | None, optional): Expiration time for the state and data.
+                Defaults to None.
+            callback (Callable | None, optional): Callback function. Defaults to None.
+            chat_id (int | str, optional): Chat ID. Defaults to None.
+
+        Returns:
+            bool: True if the state was changed, False if the user wasn't in `expected`
+        """
+        return await self._write(
+            self.storage.transition,
+            user_id,
+            expected,
+            new,
+            data_patch,
+            ex,
+            callback=callback,
+            chat_id=chat_id
+        )
@@ -1,11 +1,17 @@
-from msgspec import DecodeError
-from msgspec.json import Encoder, Decoder
-from copy import deepcopy
+import asyncio
+import time
+import uuid
+from cachebox import BaseCacheImpl
+import msgspec
+from msgspec import DecodeError, ValidationError
+from datetime import timedelta
 from enum import Enum
-from typing import Callable, Union, Any, Dict, Optional
+from itertools import chain
+from typing import Callable, Union, Any, Dict, Optional, Iterable, Iterator, List, Tuple
 
 try:
     from redis.asyncio.client import Redis
+    from redis.asyncio.cluster import RedisCluster
     from redis.typing import ExpiryT
     redis_installed = True
 except ImportError:
@@ -15,6 +21,7 @@ from typing import Any, Callable
 
 from .base import BaseAsyncStorage
 from ..storage.base import StateContext
+from ..storage.redis import _TRANSITION_SCRIPT, _NOT_CACHED
 
 
 class AsyncRedisStateStorage(BaseAsyncStorage):
@@ -30,15 +37,44 @@ class AsyncRedisStateStorage(BaseAsyncStorage):
     Args:
         cache (Redis): Redis client instance
         ex (ExpiryT | None): Optional expiration time for all keys
+        hash_data (bool): Store data as a redis hash instead of a JSON string,
+            so updates and single field reads don't touch other fields.
+            Existing JSON data isn't converted.
+        batch_size (int): Maximum number of users in one pipeline of bulk methods
+        local_cache (BaseCacheImpl | None): Optional in-process cache (e.g.
+            `cachebox.TTLCache(10000, 5)`) in front of redis. Writes go through it
+            and are published to `invalidation_channel`, so other workers drop
+            their copies. Entries hold encoded values and expire with their
+            redis keys, so any cache (e.g. `LRUCache`) can be used.
+        invalidation_channel (str): Pub/sub channel for local cache invalidation
+        prefix (str | None): Namespace of the keys. When set, keys look like
+            `{prefix}:{{user_id}}:state` and `{prefix}:{{user_id}}:data`, so state and
+            data of a user are in the same cluster slot. Without it the old
+            `state:{user_id}` and `data:{user_id}` keys are used.
+
+        codec (str): "json" or "msgpack" (smaller and faster, but not readable
+            in redis-cli). Values written with another codec can't be read.
+        data_type (Any): Type of users' data for `msgspec` to decode into and
+            validate, e.g. a `TypedDict`. Defaults to any dict.
+
+    A `RedisCluster` client can be passed as `redis`; use it with `prefix`,
+    since `transition` needs both keys of a user in one slot.
     """
     def __init__(
         self,
-        redis: Optional["Redis"] = None,
+        redis: Optional[Union["Redis", "RedisCluster"]] = None,
         host: Optional[str] = "localhost",
         port: Optional[int] = 6379,
         db: Optional[int] = 0,
         password: Optional[str] = None,
         ex: Optional["ExpiryT"] = None,
+        hash_data: bool = False,
+        batch_size: int = 1000,
+        local_cache: Optional[BaseCacheImpl] = None,
+        invalidation_channel: str = "aiostep:invalidate",
+        prefix: Optional[str] = None,
+        codec: str = "json",
+        data_type: Any = Any,
         **kwargs
     ) -> None:
         """Initialize the Redis storage.
@@ -47,6 +83,20 @@ class AsyncRedisStateStorage(BaseAsyncStorage):
             cache (Redis): Redis client instance
             ex (ExpiryT | None, optional): Expiration time for all keys. 
                 Defaults to None.
+            hash_data (bool, optional): Store data as a redis hash, one field per key.
+                Defaults to False.
+            batch_size (int, optional): Maximum number of users in one pipeline
+                of bulk methods. Defaults to 1000.
+            local_cache (BaseCacheImpl | None, optional): In-process cache for
+                states and data. Defaults to None.
+            invalidation_channel (str, optional): Pub/sub channel used to invalidate
+                local caches of other workers. Defaults to "aiostep:invalidate".
+            prefix (str | None, optional): Namespace of the keys, enables hash-tagged
+                `{prefix}:{{user_id}}:state` keys. Defaults to None.
+            codec (str, optional): Serializer of stored values, "json" or "msgpack".
+                Defaults to "json".
+            data_type (Any, optional): Type used to decode and validate data.
+                Defaults to Any.
         """
         if not redis_installed:
             raise ImportError(
@@ -65,8 +115,30 @@ class AsyncRedisStateStorage(BaseAsyncStorage):
             )
         self.cache = redis
         self.ex = ex
-        self.encoder = Encoder()
-        self.decoder = Decoder()
+        if codec not in ("json", "msgpack"):
+            raise ValueError(f"'codec' must be 'json' or 'msgpack', got {codec!r}")
+
+        codec_module = msgspec.msgpack if codec == "msgpack" else msgspec.json
+        self.codec = codec
+        self.data_type = data_type
+        self.encoder = codec_module.Encoder()
+        self.decoder = codec_module.Decoder()
+        self.state_decoder = codec_module.Decoder(StateContext)
+        self.data_decoder = codec_module.Decoder(data_type)
+        self.hash_data = hash_data
+        self.batch_size = batch_size
+        self.prefix = prefix
+        self.cluster = isinstance(redis, RedisCluster)
+        self._transition_script = self.cache.register_script(_TRANSITION_SCRIPT)
+        self.local_cache = local_cache
+        self.invalidation_channel = invalidation_channel
+        self.worker_id = uuid.uuid4().hex
+        self.local_hits = 0
+        self.local_misses = 0
+        self._generation = 0
+        self._pubsub = None
+        self._listener = None
+        self._lock: Optional[asyncio.Lock] = None
 
     def _get_key(self, user_id: Union[int, str]) -> str:
         """Generate Redis key for a user.
@@ -77,6 +149,8 @@ class AsyncRedisStateStorage(BaseAsyncStorage):
         Returns:
             str: Redis key
         """
+        if self.prefix is not None:
+            return f"{self.prefix}:{{{user_id}}}:state"
         return f"state:{user_id}"
 
     def _get_data_key(self, user_id: Union[int, str]) -> str:
@@ -88,8 +162,189 @@ class AsyncRedisStateStorage(BaseAsyncStorage):
         Returns:
             str: Redis key
         """
+        if self.prefix is not None:
+            return f"{self.prefix}:{{{user_id}}}:data"
         return f"data:{user_id}"
 
+    def _encode_fields(self, data: Dict[Any, Any]) -> Dict[Any, bytes]:
+        return {field: self.encoder.encode(value) for field, value in data.items()}
+
+    def _decode_fields(self, fields: Dict[bytes, bytes]) -> Dict[str, Any]:
+        data = {field.decode(): self.decoder.decode(value) for field, value in fields.items()}
+        if self.data_type is not Any:
+            data = msgspec.convert(data, self.data_type)
+        return data
+
+    def _mget(self, keys: List[str]) -> Any:
+        # keys of a cluster are in different slots, so they are read per node.
+        if self.cluster:
+            return self.cache.mget_nonatomic(keys)
+        return self.cache.mget(keys)
+
+    def _chunked(self, user_ids: Iterable[Union[int, str]]) -> Iterator[List[Union[int, str]]]:
+        user_ids = list(user_ids)
+        for start in range(0, len(user_ids), self.batch_size):
+            yield user_ids[start:start + self.batch_size]
+
+    def _encode_state(
+        self,
+        user_id: Union[int, str],
+        state: Union[str, Enum],
+        callback: Optional[Callable[..., Any]] = None,
+        chat_id: Optional[Union[int, str]] = None
+    ) -> bytes:
+        if isinstance(state, Enum):
+            state = state.name
+
+        return self.encoder.encode(StateContext(
+            current_state=state,
+            chat_id=chat_id if chat_id is not None else user_id,
+            callback=callback.__name__ if callback else None
+        ))
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def _ensure_listener(self) -> None:
+        if self._listener is not None and not self._listener.done():
+            return
+
+        async with self._get_lock():
+            # another call may have started it while this one waited.
+            if self._listener is not None and not self._listener.done():
+                return
+
+            if self._pubsub is not None:
+                await self._pubsub.aclose()
+
+            # subscribe before anything is cached, so no invalidation can be missed.
+            self._pubsub = self.cache.pubsub(ignore_subscribe_messages=True)
+            await self._pubsub.subscribe(self.invalidation_channel)
+            self._listener = asyncio.ensure_future(self._listen())
+
+    async def _listen(self) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            async for message in self._pubsub.listen():
+                if message["type"] != "message":
+                    continue
+
+                # a bad message must not stop the invalidation of other keys.
+                try:
+                    self._on_invalidate(message)
+                except Exception as exc:
+                    loop.call_exception_handler({
+                        "message": f"Exception in local cache invalidation on {self.invalidation_channel!r}",
+                        "exception": exc
+                    })
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            loop.call_exception_handler({
+                "message": f"Local cache invalidation listener on {self.invalidation_channel!r} stopped",
+                "exception": exc
+            })
+        finally:
+            # invalidations are missed until the next call subscribes again.
+            self._generation += 1
+            self.local_cache.clear()
+
+    def _on_invalidate(self, message: Dict[str, Any]) -> None:
+        worker_id, keys = self.decoder.decode(message["data"])
+        if worker_id == self.worker_id:
+            return
+
+        self._generation += 1
+        for key in keys:
+            self.local_cache.pop(key, None)
+
+    def _local_get(self, key: str) -> Any:
+        entry = self.local_cache.get(key, _NOT_CACHED)
+        if entry is not _NOT_CACHED and entry[1] is not None and entry[1] <= time.monotonic():
+            # the redis key has expired.
+            self.local_cache.pop(key, None)
+            entry = _NOT_CACHED
+
+        if entry is _NOT_CACHED:
+            self.local_misses += 1
+            return _NOT_CACHED
+        self.local_hits += 1
+        return entry[0]
+
+    def _local_set(self, key: str, value: Optional[bytes], generation: int, deadline: Optional[float]) -> None:
+        # an invalidation received while reading means the value may be stale.
+        if generation == self._generation:
+            self.local_cache[key] = (value, deadline)
+
+    async def _fetch(self, key: str, command: str = "get") -> Tuple[Any, Optional[float]]:
+        """Read `key` with `command` and the deadline of its redis TTL."""
+        async with self.cache.pipeline(transaction=False) as pipe:
+            getattr(pipe, command)(key)
+            pipe.pttl(key)
+            value, ttl = await pipe.execute()
+        return value, time.monotonic() + ttl / 1000 if ttl >= 0 else None
+
+    async def _invalidate(self, values: Dict[str, Any], ex: Optional["ExpiryT"] = None) -> None:
+        """Write `values` to the local cache and drop these keys in other workers.
+
+        Values are encoded, or None for missing keys, and expire after `ex` like
+        the written redis keys. `_NOT_CACHED` values are removed from the local cache.
+        """
+        if self.local_cache is None or not values:
+            return
+
+        if self._listener is None or self._listener.done():
+            # writes of other workers before subscribing weren't heard, so don't cache yet.
+            await self._ensure_listener()
+            values = dict.fromkeys(values, _NOT_CACHED)
+
+        ex_ms = self._expiry_ms(ex)
+        deadline = time.monotonic() + ex_ms / 1000 if ex_ms else None
+
+        self._generation += 1
+        for key, value in values.items():
+            if value is _NOT_CACHED:
+                self.local_cache.pop(key, None)
+            else:
+                self.local_cache[key] = (value, deadline)
+
+        await self.cache.publish(
+            self.invalidation_channel,
+            self.encoder.encode([self.worker_id, list(values)])
+        )
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Get hit and miss counters of the local cache.
+
+        Returns:
+            dict[str, Any]: Hits, misses, hit ratio and size of the local cache
+        """
+        lookups = self.local_hits + self.local_misses
+        return {
+            "hits": self.local_hits,
+            "misses": self.local_misses,
+            "hit_ratio": self.local_hits / lookups if lookups else 0.0,
+            "size": len(self.local_cache) if self.local_cache is not None else 0
+        }
+
+    async def close(self) -> None:
+        """Stop listening for local cache invalidations."""
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+
+    def _expiry_ms(self, ex: Optional["ExpiryT"]) -> int:
+        if not ex:
+            return 0
+        if isinstance(ex, timedelta):
+            return int(ex.total_seconds() * 1000)
+        return int(ex * 1000)
+
     async def set_state(
         self, 
         user_id: Union[int, str], 
@@ -114,18 +369,17 @@ class AsyncRedisStateStorage(BaseAsyncStorage):
 
         callback_name = callback.__name__ if callback else None
 
-        state_data = {
-            "current_state": state,
-            "chat_id": chat_id,
-            "callback": callback_name
-        }
-
-        await self.cache.set(
-            self._get_key(user_id),
-            self.encoder.encode(state_data),
-            ex=ex or self.ex
+        state_context = StateContext(
+            current_state=state,
+            chat_id=chat_id,
+            callback=callback_name
         )
 
+        state_key = self._get_key(user_id)
+        encoded = self.encoder.encode(state_context)
+        await self.cache.set(state_key, encoded, ex=ex or self.ex)
+        await self._invalidate({state_key: encoded}, ex or self.ex)
+
     async def get_state(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[StateContext]:
         """Get the state context for a user.
 
@@ -137,12 +391,19 @@ class AsyncRedisStateStorage(BaseAsyncStorage):
         Returns:
             StateContext | None: The state context or default value
         """
-        data = await self.cache.get(self._get_key(user_id))
-        if not data:
-            return default
+        state_key = self._get_key(user_id)
+
+        if self.local_cache is not None:
+            await self._ensure_listener()
+            data = self._local_get(state_key)
+            if data is _NOT_CACHED:
+                generation = self._generation
+                data, deadline = await self._fetch(state_key)
+                self._local_set(state_key, data or None, generation, deadline)
+        else:
+            data = await self.cache.get(state_key)
 
-        state_data = self.decoder.decode(data)
-        return StateContext(**state_data)
+        return self.state_decoder.decode(data) if data else default
 
     async def delete_state(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[StateContext]:
         """Delete the state for a user.
@@ -158,12 +419,12 @@ class AsyncRedisStateStorage(BaseAsyncStorage):
         state_key = self._get_key(user_id)
         data = await self.cache.get(state_key)
         await self.cache.delete(state_key)
+        await self._invalidate({state_key: None})
 
         if not data:
             return default
 
-        state_data = self.decoder.decode(data)
-        return StateContext(**state_data)
+        return self.state_decoder.decode(data)
 
     async def set_data(
         self, 
@@ -184,11 +445,22 @@ class AsyncRedisStateStorage(BaseAsyncStorage):
 
         data_key = self._get_data_key(user_id)
 
-        await self.cache.set(
-            data_key,
-            self.encoder.encode(data),
-            ex=ex or self.ex
-        )
+        if self.hash_data:
+            ex = ex or self.ex
+            async with self.cache.pipeline(transaction=not self.cluster) as pipe:
+                pipe.delete(data_key)
+                if data:
+                    pipe.hset(data_key, mapping=self._encode_fields(data))
+                    if ex:
+                        pipe.expire(data_key, ex)
+                await pipe.execute()
+            if self.local_cache is not None:
+                await self._invalidate({data_key: self.encoder.encode(data) if data else None}, ex)
+            return
+
+        encoded = self.encoder.encode(data)
+        await self.cache.set(data_key, encoded, ex=ex or self.ex)
+        await self._invalidate({data_key: encoded}, ex or self.ex)
 
     async def get_data(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[Dict[Any, Any]]:
         """Get data for a user's state.
@@ -201,12 +473,34 @@ class AsyncRedisStateStorage(BaseAsyncStorage):
         Returns:
             dict[str, Any] | None: The stored data or None if not found
         """
-        data = await self.cache.get(self._get_data_key(user_id))
+        data_key = self._get_data_key(user_id)
+
+        if self.local_cache is not None:
+            await self._ensure_listener()
+            encoded = self._local_get(data_key)
+            if encoded is not _NOT_CACHED:
+                return self.data_decoder.decode(encoded) if encoded is not None else default
+            generation = self._generation
+
+        if self.hash_data:
+            if self.local_cache is not None:
+                fields, deadline = await self._fetch(data_key, "hgetall")
+            else:
+                fields = await self.cache.hgetall(data_key)
+            data = self._decode_fields(fields) if fields else None
+            if self.local_cache is not None:
+                self._local_set(data_key, self.encoder.encode(data) if data else None, generation, deadline)
+            return data if data else default
+
+        if self.local_cache is not None:
+            data, deadline = await self._fetch(data_key)
+            self._local_set(data_key, data if data else None, generation, deadline)
+        else:
+            data = await self.cache.get(data_key)
         if not data:
             return default
 
-        state_data = self.decoder.decode(data)
-        return state_data
+        return self.data_decoder.decode(data)
 
     async def update_data(
         self,
@@ -232,22 +526,35 @@ class AsyncRedisStateStorage(BaseAsyncStorage):
             raise ValueError(f"'data' must be a dict, got {type(data)}")
 
         data_key = self._get_data_key(user_id)
+
+        if self.hash_data:
+            ex = ex or self.ex
+            async with self.cache.pipeline(transaction=not self.cluster) as pipe:
+                if data:
+                    pipe.hset(data_key, mapping=self._encode_fields(data))
+                if ex:
+                    pipe.expire(data_key, ex)
+                await pipe.execute()
+            await self._invalidate({data_key: _NOT_CACHED})
+            return
+
         current_data = await self.cache.get(data_key)
 
         if current_data:
             try:
-                state_data = self.decoder.decode(current_data)
+                state_data = self.data_decoder.decode(current_data)
                 state_data.update(data)
+            except ValidationError:
+                # valid JSON of another shape isn't corrupt, so it isn't overwritten.
+                raise
             except DecodeError:
-                state_data = deepcopy(data)
+                state_data = data
         else:
-            state_data = deepcopy(data)
+            state_data = data
 
-        await self.cache.set(
-            data_key,
-            self.encoder.encode(state_data),
-            ex=ex or self.ex
-        )
+        encoded = self.encoder.encode(state_data)
+        await self.cache.set(data_key, encoded, ex=ex or self.ex)
+        await self._invalidate({data_key: encoded}, ex or self.ex)
 
     async def delete_data(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[Dict[Any, Any]]:
         """Clear and get all data for a user's state.
@@ -261,11 +568,318 @@ class AsyncRedisStateStorage(BaseAsyncStorage):
             Dict | None: The deleted data or default value
         """
         data_key = self._get_data_key(user_id)
+
+        if self.hash_data:
+            async with self.cache.pipeline(transaction=not self.cluster) as pipe:
+                pipe.hgetall(data_key)
+                pipe.delete(data_key)
+                fields, _ = await pipe.execute()
+            await self._invalidate({data_key: None})
+            return self._decode_fields(fields) if fields else default
+
         data = await self.cache.get(data_key)
         await self.cache.delete(data_key)
+        await self._invalidate({data_key: None})
 
         if not data:
             return default
 
-        data = self.decoder.decode(data)
+        return self.data_decoder.decode(data)
+
+    async def get_data_field(self, user_id: Union[int, str], field: str, default: Optional[Any] = None) -> Any:
+        """Get a single field of a user's data.
+
+        In `hash_data` mode only this field is read from redis.
+
+        Args:
+            user_id (int | str): ID of the user
+            field (str): Key of the field
+            default (Any, optional): Default value if field doesn't exist.
+                Defaults to None.
+
+        Returns:
+            Any: Value of the field or default value
+        """
+        if not self.hash_data:
+            return await super().get_data_field(user_id, field, default)
+
+        value = await self.cache.hget(self._get_data_key(user_id), field)
+        return self.decoder.decode(value) if value is not None else default
+
+    async def delete_data_field(self, user_id: Union[int, str], field: str, default: Optional[Any] = None) -> Any:
+        """Delete and get a single field of a user's data.
+
+        In `hash_data` mode only this field is touched in redis.
+
+        Args:
+            user_id (int | str): ID of the user
+            field (str): Key of the field
+            default (Any, optional): Default value if field doesn't exist.
+                Defaults to None.
+
+        Returns:
+            Any: The deleted value or default value
+        """
+        if not self.hash_data:
+            return await super().delete_data_field(user_id, field, default)
+
+        data_key = self._get_data_key(user_id)
+        async with self.cache.pipeline(transaction=not self.cluster) as pipe:
+            pipe.hget(data_key, field)
+            pipe.hdel(data_key, field)
+            value, _ = await pipe.execute()
+        await self._invalidate({data_key: _NOT_CACHED})
+        return self.decoder.decode(value) if value is not None else default
+
+    async def transition(
+        self,
+        user_id: Union[int, str],
+        expected: Optional[Union[str, Enum]],
+        new: Union[str, Enum],
+        data_patch: Optional[Dict[Any, Any]] = None,
+        ex: Optional["ExpiryT"] = None,
+        *,
+        callback: Optional[Callable[..., Any]] = None,
+        chat_id: Optional[Union[int, str]] = None
+    ) -> bool:
+        """Move a user to a new state only if the user is in the expected state.
+
+        The check, the state change, the data merge and the expiry refresh
+        run atomically in a single Lua script on the redis server.
+
+        Args:
+            user_id (int | str): ID of the user
+            expected (str | Enum | None): State the user must be in, None means no state
+            new (str | Enum): State to set
+            data_patch (dict[str, Any] | None, optional): Data to merge like `update_data`.
+                Defaults to None.
+            ex (ExpiryT | None, optional): Expiration time for the state and data.
+                Defaults to None.
+            callback (Callable | None, optional): Callback function. Defaults to None.
+            chat_id (int | str, optional): Chat ID. Defaults to None.
+
+        Returns:
+            bool: True if the state was changed, False if the user wasn't in `expected`
+        """
+        if data_patch is not None and not isinstance(data_patch, dict):
+            raise ValueError(f"'data_patch' must be a dict, got {type(data_patch)}")
+
+        if isinstance(expected, Enum):
+            expected = expected.name
+
+        data_key = self._get_data_key(user_id)
+        keys = [self._get_key(user_id), data_key]
+        args = [
+            self.codec,
+            "0" if expected is None else "1",
+            expected or "",
+            self._encode_state(user_id, new, callback, chat_id),
+            self._expiry_ms(ex or self.ex)
+        ]
+
+        if not data_patch:
+            changed = await self._transition_script(keys=keys, args=[*args, ""]) == 1
+        elif self.hash_data:
+            fields = chain.from_iterable(self._encode_fields(data_patch).items())
+            changed = await self._transition_script(keys=keys, args=[*args, "hash", *fields]) == 1
+        else:
+            # the script refuses to write if data was changed since it was read here.
+            while True:
+                current_data = await self.cache.get(data_key)
+
+                try:
+                    data = self.data_decoder.decode(current_data) if current_data else {}
+                    data.update(data_patch)
+                except ValidationError:
+                    raise
+                except DecodeError:
+                    data = data_patch
+
+                result = await self._transition_script(
+                    keys=keys,
+                    args=[*args, "value", current_data or b"", self.encoder.encode(data)]
+                )
+                if result != -1:
+                    changed = result == 1
+                    break
+
+        if changed:
+            await self._invalidate(dict.fromkeys(keys, _NOT_CACHED))
+        return changed
+
+    async def get_states_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[StateContext]]:
+        """Get the state contexts of many users with one MGET per batch.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without state.
+                Defaults to None.
+
+        Returns:
+            list[StateContext | None]: State contexts in order of `user_ids`
+        """
+        states = []
+        for chunk in self._chunked(user_ids):
+            for data in await self._mget([self._get_key(user_id) for user_id in chunk]):
+                states.append(self.state_decoder.decode(data) if data else default)
+        return states
+
+    async def set_states_many(
+        self,
+        states: Dict[Union[int, str], Union[str, Enum]],
+        callback: Optional[Callable[..., Any]] = None,
+        ex: Optional["ExpiryT"] = None
+    ) -> None:
+        """Set states of many users with one pipeline per batch.
+
+        Args:
+            states (dict[int | str, str | Enum]): States mapped by user IDs
+            callback (Callable | None, optional): Callback function for all users.
+                Defaults to None.
+            ex (ExpiryT | None, optional): Expiration time of the states.
+                Defaults to None.
+        """
+        ex = ex or self.ex
+        for chunk in self._chunked(states):
+            async with self.cache.pipeline(transaction=False) as pipe:
+                for user_id in chunk:
+                    pipe.set(
+                        self._get_key(user_id),
+                        self._encode_state(user_id, states[user_id], callback),
+                        ex=ex
+                    )
+                await pipe.execute()
+            await self._invalidate(dict.fromkeys(map(self._get_key, chunk), _NOT_CACHED))
+
+    async def delete_states_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[StateContext]]:
+        """Delete and get the states of many users.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without state.
+                Defaults to None.
+
+        Returns:
+            list[StateContext | None]: Deleted state contexts in order of `user_ids`
+        """
+        states = []
+        for chunk in self._chunked(user_ids):
+            keys = [self._get_key(user_id) for user_id in chunk]
+            async with self.cache.pipeline(transaction=not self.cluster) as pipe:
+                for key in keys:
+                    pipe.get(key)
+                    pipe.delete(key)
+                records = (await pipe.execute())[::2]
+            await self._invalidate(dict.fromkeys(keys))
+
+            for data in records:
+                states.append(self.state_decoder.decode(data) if data else default)
+        return states
+
+    async def get_data_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[Dict[Any, Any]]]:
+        """Get data of many users with one MGET (or pipeline in `hash_data` mode) per batch.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without data.
+                Defaults to None.
+
+        Returns:
+            list[dict[str, Any] | None]: Data in order of `user_ids`
+        """
+        data = []
+        for chunk in self._chunked(user_ids):
+            keys = [self._get_data_key(user_id) for user_id in chunk]
+
+            if self.hash_data:
+                async with self.cache.pipeline(transaction=False) as pipe:
+                    for key in keys:
+                        pipe.hgetall(key)
+                    records = await pipe.execute()
+                data.extend(self._decode_fields(fields) if fields else default for fields in records)
+            else:
+                records = await self._mget(keys)
+                data.extend(self.data_decoder.decode(record) if record else default for record in records)
+        return data
+
+    async def set_data_many(
+        self,
+        data: Dict[Union[int, str], Dict[Any, Any]],
+        ex: Optional["ExpiryT"] = None
+    ) -> None:
+        """Set data of many users with one pipeline per batch.
+
+        This method completely replaces any existing data of the users.
+
+        Args:
+            data (dict[int | str, dict[str, Any]]): Data mapped by user IDs
+            ex (ExpiryT | None, optional): Expiration time of the data.
+                Defaults to None.
+        """
+        for user_data in data.values():
+            if not isinstance(user_data, dict):
+                raise ValueError(f"'data' values must be dicts, got {type(user_data)}")
+
+        ex = ex or self.ex
+        for chunk in self._chunked(data):
+            async with self.cache.pipeline(transaction=False) as pipe:
+                for user_id in chunk:
+                    data_key = self._get_data_key(user_id)
+                    if not self.hash_data:
+                        pipe.set(data_key, self.encoder.encode(data[user_id]), ex=ex)
+                        continue
+
+                    pipe.delete(data_key)
+                    if data[user_id]:
+                        pipe.hset(data_key, mapping=self._encode_fields(data[user_id]))
+                        if ex:
+                            pipe.expire(data_key, ex)
+                await pipe.execute()
+            await self._invalidate(dict.fromkeys(map(self._get_data_key, chunk), _NOT_CACHED))
+
+    async def delete_data_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[Dict[Any, Any]]]:
+        """Clear and get data of many users.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without data.
+                Defaults to None.
+
+        Returns:
+            list[dict[str, Any] | None]: Deleted data in order of `user_ids`
+        """
+        data = []
+        for chunk in self._chunked(user_ids):
+            keys = [self._get_data_key(user_id) for user_id in chunk]
+
+            async with self.cache.pipeline(transaction=not self.cluster) as pipe:
+                for key in keys:
+                    if self.hash_data:
+                        pipe.hgetall(key)
+                    else:
+                        pipe.get(key)
+                    pipe.delete(key)
+                records = (await pipe.execute())[::2]
+            await self._invalidate(dict.fromkeys(keys))
+
+            if self.hash_data:
+                data.extend(self._decode_fields(fields) if fields else default for fields in records)
+            else:
+                data.extend(self.data_decoder.decode(record) if record else default for record in records)
         return data
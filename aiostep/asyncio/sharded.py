@@ -0,0 +1,345 @@
+import os
+import asyncio
+from collections import defaultdict
+
+from enum import Enum
+from typing import Callable, Any, Union, Dict, Optional, Iterable, List, Type
+
+from .base import BaseAsyncStorage
+from .file import AsyncFileStateStorage
+from ..storage.base import StateContext
+from ..storage.sharded import shard_of, shard_paths
+
+
+class AsyncShardedFileStateStorage(BaseAsyncStorage):
+    """File-based storage which spreads users over several files.
+
+    Async version of `ShardedFileStateStorage`, bulk methods run the shards
+    concurrently.
+
+    Use `rebalance_shards` to change the number of shards of existing files.
+
+    Args:
+        path (str | os.PathLike): Base path of shard files, `states.json` gives
+            `states-0.json`, `states-1.json` and so on.
+        shards (int): Number of shards.
+        storage_class (type): Storage of a shard, `AsyncFileStateStorage` or `AsyncLogFileStateStorage`.
+        **kwargs: Passed to every shard storage, e.g. `ex`.
+
+    Example::
+
+        storage = AsyncShardedFileStateStorage("states.json", shards=16, group_commit=True)
+    """
+
+    def __init__(
+        self,
+        path: Union[str, os.PathLike],
+        shards: int = 8,
+        storage_class: Type[BaseAsyncStorage] = AsyncFileStateStorage,
+        **kwargs
+    ) -> None:
+        """Initialize shard storages.
+
+        Args:
+            path (str | os.PathLike): Base path of shard files.
+            shards (int, optional): Number of shards. Defaults to 8.
+            storage_class (type, optional): Storage of a shard. Defaults to AsyncFileStateStorage.
+        """
+        if shards <= 0:
+            raise ValueError(f"'shards' must be positive, got {shards}")
+
+        self.path = os.fspath(path)
+        self.shards: List[BaseAsyncStorage] = [
+            storage_class(shard_path, **kwargs) for shard_path in shard_paths(path, shards)
+        ]
+
+    def shard(self, user_id: Union[int, str]) -> BaseAsyncStorage:
+        """Give the storage of a user's shard.
+
+        Args:
+            user_id (int | str): ID of the user
+
+        Returns:
+            BaseAsyncStorage: Storage of the shard
+        """
+        return self.shards[shard_of(user_id, len(self.shards))]
+
+    async def _get_many(self, method: str, user_ids: Iterable[Union[int, str]], default: Any) -> List[Any]:
+        user_ids = list(user_ids)
+        groups: Dict[int, List[int]] = defaultdict(list)
+        for position, user_id in enumerate(user_ids):
+            groups[shard_of(user_id, len(self.shards))].append(position)
+
+        shard_results = await asyncio.gather(*(
+            getattr(self.shards[shard], method)([user_ids[position] for position in positions], default)
+            for shard, positions in groups.items()
+        ))
+
+        results = [default] * len(user_ids)
+        for positions, values in zip(groups.values(), shard_results):
+            for position, value in zip(positions, values):
+                results[position] = value
+        return results
+
+    async def _set_many(self, method: str, values: Dict[Union[int, str], Any], *args) -> None:
+        groups: Dict[int, dict] = defaultdict(dict)
+        for user_id, value in values.items():
+            groups[shard_of(user_id, len(self.shards))][user_id] = value
+
+        await asyncio.gather(*(
+            getattr(self.shards[shard], method)(shard_values, *args)
+            for shard, shard_values in groups.items()
+        ))
+
+    async def close(self) -> None:
+        """Close shard storages which can be closed."""
+        await asyncio.gather(*(shard.close() for shard in self.shards if hasattr(shard, "close")))
+
+    async def set_state(
+        self,
+        user_id: Union[int, str],
+        state: Union[str, Enum],
+        callback: Optional[Callable[..., Any]] = None,
+        chat_id: Optional[Union[int, str]] = None,
+        ex: Optional[float] = None
+    ) -> None:
+        """Set the state for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            state (str | Enum): State to set
+            callback (Callable | None, optional): Callback function. Defaults to None.
+            chat_id (int | str, optional): Chat ID. Defaults to None.
+            ex (float | None, optional): Expiration time in seconds. Defaults to None.
+        """
+        await self.shard(user_id).set_state(user_id, state, callback=callback, chat_id=chat_id, ex=ex)
+
+    async def get_state(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[StateContext]:
+        """Get the state context for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            default (Any, optional): Default value if state doesn't exist.
+                Defaults to None.
+
+        Returns:
+            StateContext | None: The state context or default value
+        """
+        return await self.shard(user_id).get_state(user_id, default)
+
+    async def delete_state(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[StateContext]:
+        """Delete the state for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            default (Any, optional): Default value if state doesn't exist.
+                Defaults to None.
+
+        Returns:
+            StateContext | None: The deleted state context or default value
+        """
+        return await self.shard(user_id).delete_state(user_id, default)
+
+    async def set_data(self, user_id: Union[int, str], data: Dict[Any, Any], ex: Optional[float] = None) -> None:
+        """Set data for a user.
+
+        This method completely replaces any existing data.
+
+        Args:
+            user_id (int | str): ID of the user
+            data (dict[str, Any]): Data to store
+            ex (float | None, optional): Expiration time in seconds. Defaults to None.
+        """
+        await self.shard(user_id).set_data(user_id, data, ex=ex)
+
+    async def get_data(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[Dict[Any, Any]]:
+        """Get data for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            default (Any, optional): Default value if data doesn't exist.
+                Defaults to None.
+
+        Returns:
+            dict[str, Any] | None: The stored data or None if not found
+        """
+        return await self.shard(user_id).get_data(user_id, default)
+
+    async def update_data(self, user_id: Union[int, str], data: Dict[Any, Any], ex: Optional[float] = None) -> None:
+        """Update data for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            data (dict[str, Any]): Data to update
+            ex (float | None, optional): New expiration time in seconds. Defaults to None.
+        """
+        await self.shard(user_id).update_data(user_id, data, ex=ex)
+
+    async def delete_data(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[Dict[Any, Any]]:
+        """Clear and get all data for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            default (Any, optional): Default value if data doesn't exist.
+                Defaults to None.
+
+        Returns:
+            Dict | None: The deleted data or default value
+        """
+        return await self.shard(user_id).delete_data(user_id, default)
+
+    async def get_data_field(self, user_id: Union[int, str], field: str, default: Optional[Any] = None) -> Any:
+        """Get a single field of a user's data.
+
+        Args:
+            user_id (int | str): ID of the user
+            field (str): Name of the field
+            default (Any, optional): Default value if the field doesn't exist.
+                Defaults to None.
+
+        Returns:
+            Any: Value of the field or default value
+        """
+        return await self.shard(user_id).get_data_field(user_id, field, default)
+
+    async def delete_data_field(self, user_id: Union[int, str], field: str, default: Optional[Any] = None) -> Any:
+        """Delete and get a single field of a user's data.
+
+        Args:
+            user_id (int | str): ID of the user
+            field (str): Name of the field
+            default (Any, optional): Default value if the field doesn't exist.
+                Defaults to None.
+
+        Returns:
+            Any: Deleted value of the field or default value
+        """
+        return await self.shard(user_id).delete_data_field(user_id, field, default)
+
+    async def transition(
+        self,
+        user_id: Union[int, str],
+        expected: Optional[Union[str, Enum]],
+        new: Union[str, Enum],
+        data_patch: Optional[Dict[Any, Any]] = None,
+        ex: Optional[float] = None,
+        *,
+        callback: Optional[Callable[..., Any]] = None,
+        chat_id: Optional[Union[int, str]] = None
+    ) -> bool:
+        """Move a user to a new state only if the user is in the expected state.
+
+        Args:
+            user_id (int | str): ID of the user
+            expected (str | Enum | None): State the user must be in, None means no state
+            new (str | Enum): State to set
+            data_patch (dict[str, Any] | None, optional): Data to merge like `update_data`.
+                Defaults to None.
+            ex (float | None, optional): Expiration time for the state and data.
+                Defaults to None.
+            callback (Callable | None, optional): Callback function. Defaults to None.
+            chat_id (int | str, optional): Chat ID. Defaults to None.
+
+        Returns:
+            bool: True if the state was changed, False if the user wasn't in `expected`
+        """
+        return await self.shard(user_id).transition(
+            user_id, expected, new, data_patch, ex, callback=callback, chat_id=chat_id
+        )
+
+    async def get_states_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[StateContext]]:
+        """Get the state contexts of many users, shards are read concurrently.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without state.
+                Defaults to None.
+
+        Returns:
+            list[StateContext | None]: State contexts in order of `user_ids`
+        """
+        return await self._get_many("get_states_many", user_ids, default)
+
+    async def set_states_many(
+        self,
+        states: Dict[Union[int, str], Union[str, Enum]],
+        callback: Optional[Callable[..., Any]] = None,
+        ex: Optional[float] = None
+    ) -> None:
+        """Set states of many users, shards are written concurrently.
+
+        Args:
+            states (dict[int | str, str | Enum]): States mapped by user IDs
+            callback (Callable | None, optional): Callback function for all users.
+                Defaults to None.
+            ex (float | None, optional): Expiration time of the states.
+                Defaults to None.
+        """
+        await self._set_many("set_states_many", states, callback, ex)
+
+    async def delete_states_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[StateContext]]:
+        """Delete and get the states of many users, shards are written concurrently.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without state.
+                Defaults to None.
+
+        Returns:
+            list[StateContext | None]: Deleted state contexts in order of `user_ids`
+        """
+        return await self._get_many("delete_states_many", user_ids, default)
+
+    async def get_data_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[Dict[Any, Any]]]:
+        """Get data of many users, shards are read concurrently.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without data.
+                Defaults to None.
+
+        Returns:
+            list[dict[str, Any] | None]: Data in order of `user_ids`
+        """
+        return await self._get_many("get_data_many", user_ids, default)
+
+    async def set_data_many(self, data: Dict[Union[int, str], Dict[Any, Any]], ex: Optional[float] = None) -> None:
+        """Set data of many users, shards are written concurrently.
+
+        This method completely replaces any existing data of the users.
+
+        Args:
+            data (dict[int | str, dict[str, Any]]): Data mapped by user IDs
+            ex (float | None, optional): Expiration time of the data.
+                Defaults to None.
+        """
+        await self._set_many("set_data_many", data, ex)
+
+    async def delete_data_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[Dict[Any, Any]]]:
+        """Clear and get data of many users, shards are written concurrently.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without data.
+                Defaults to None.
+
+        Returns:
+            list[dict[str, Any] | None]: Deleted data in order of `user_ids`
+        """
+        return await self._get_many("delete_data_many", user_ids, default)
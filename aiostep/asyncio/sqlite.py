@@ -0,0 +1,380 @@
+import os
+import queue
+import asyncio
+import threading
+
+from enum import Enum
+from typing import Callable, Any, Union, Dict, Optional, Iterable, List
+
+from .base import BaseAsyncStorage
+from ..storage.base import StateContext
+from ..storage.sqlite import SQLiteStateStorage
+
+
+class AsyncSQLiteStateStorage(BaseAsyncStorage):
+    """SQLite-based storage implementation for managing bot states.
+
+    Async version of `SQLiteStateStorage`. The connection is used by a single
+    thread, which takes up to `batch_size` queued calls at once and runs them
+    in one transaction, so concurrent writes share one commit. Each call runs
+    in its own savepoint, so a failing call doesn't undo the others.
+
+    Args:
+        path (str | os.PathLike): Path to the database file.
+        ex (float | None): Expiration time for states and data.
+        synchronous (str): SQLite `synchronous` pragma.
+        batch_size (int): Maximum calls run in one transaction.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, os.PathLike],
+        ex: Optional[float] = None,
+        synchronous: str = "NORMAL",
+        batch_size: int = 100,
+        **kwargs
+    ) -> None:
+        """Initialize the SQLite storage and start its thread.
+
+        Args:
+            path (str | os.PathLike): Path to the database file.
+            ex (float | None, optional): Expiration time for states and data. Defaults to None.
+            synchronous (str, optional): SQLite `synchronous` pragma. Defaults to "NORMAL".
+            batch_size (int, optional): Maximum calls run in one transaction. Defaults to 100.
+            **kwargs: Passed to `sqlite3.connect`.
+        """
+        if batch_size <= 0:
+            raise ValueError(f"'batch_size' must be positive, got {batch_size}")
+
+        self.storage = SQLiteStateStorage(path, ex=ex, synchronous=synchronous, **kwargs)
+        self.batch_size = batch_size
+        self._queue: "queue.SimpleQueue[Optional[tuple]]" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._work, name="aiostep-sqlite", daemon=True)
+        self._thread.start()
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def _work(self) -> None:
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if None in batch:
+                running = False
+                batch = [call for call in batch if call is not None]
+            if not batch:
+                continue
+
+            results = []
+            try:
+                with self.storage._transaction():
+                    for method, args, kwargs, future in batch:
+                        try:
+                            results.append((method(*args, **kwargs), None))
+                        except Exception as exc:
+                            results.append((None, exc))
+            except Exception as exc:
+                results = [(None, exc)] * len(batch)
+
+            for (method, args, kwargs, future), (result, exc) in zip(batch, results):
+                future.get_loop().call_soon_threadsafe(self._resolve, future, result, exc)
+
+        self.storage.close()
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, result: Any, exc: Optional[BaseException]) -> None:
+        if future.done():
+            return
+        if exc is not None:
+            future.set_exception(exc)
+        else:
+            future.set_result(result)
+
+    async def _call(self, method: Callable[..., Any], *args, **kwargs) -> Any:
+        if not self._thread.is_alive():
+            raise RuntimeError("storage is closed")
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put((method, args, kwargs, future))
+        return await future
+
+    async def sweep(self, limit: Optional[int] = None) -> int:
+        """Remove expired states and data.
+
+        Args:
+            limit (int | None, optional): Maximum rows removed from each table.
+                Defaults to None, which removes all expired rows.
+
+        Returns:
+            int: Number of removed rows
+        """
+        return await self._call(self.storage.sweep, limit)
+
+    def start_sweeper(self, interval: float = 60.0, limit: Optional[int] = 1000) -> asyncio.Task:
+        """Start a task which calls `sweep` every `interval` seconds.
+
+        Args:
+            interval (float, optional): Seconds between sweeps. Defaults to 60.
+            limit (int | None, optional): Maximum rows removed per sweep. Defaults to 1000.
+
+        Returns:
+            asyncio.Task: The sweeper task, cancel it to stop sweeping
+        """
+        async def sweeper() -> None:
+            while True:
+                await asyncio.sleep(interval)
+                await self.sweep(limit)
+
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.ensure_future(sweeper())
+        return self._sweeper
+
+    async def close(self) -> None:
+        """Run queued calls, stop the thread and close the database."""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+
+        if self._thread.is_alive():
+            self._queue.put(None)
+            await asyncio.get_running_loop().run_in_executor(None, self._thread.join)
+
+    async def set_state(
+        self,
+        user_id: Union[int, str],
+        state: Union[str, Enum],
+        callback: Optional[Callable[..., Any]] = None,
+        chat_id: Optional[Union[int, str]] = None,
+        ex: Optional[float] = None
+    ) -> None:
+        """Set the state for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            state (str | Enum): State to set
+            callback (Callable | None, optional): Callback function. Defaults to None.
+            chat_id (int | str, optional): Chat ID. Defaults to None.
+            ex (float | None, optional): Expiration time in seconds. Defaults to None.
+        """
+        await self._call(self.storage.set_state, user_id, state, callback=callback, chat_id=chat_id, ex=ex)
+
+    async def get_state(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[StateContext]:
+        """Get the state context for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            default (Any, optional): Default value if state doesn't exist.
+                Defaults to None.
+
+        Returns:
+            StateContext | None: The state context or default value
+        """
+        return await self._call(self.storage.get_state, user_id, default)
+
+    async def delete_state(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[StateContext]:
+        """Delete the state for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            default (Any, optional): Default value if state doesn't exist.
+                Defaults to None.
+
+        Returns:
+            StateContext | None: The deleted state context or default value
+        """
+        return await self._call(self.storage.delete_state, user_id, default)
+
+    async def set_data(self, user_id: Union[int, str], data: Dict[Any, Any], ex: Optional[float] = None) -> None:
+        """Set data for a user.
+
+        This method completely replaces any existing data.
+
+        Args:
+            user_id (int | str): ID of the user
+            data (dict[str, Any]): Data to store
+            ex (float | None, optional): Expiration time in seconds. Defaults to None.
+        """
+        await self._call(self.storage.set_data, user_id, data, ex=ex)
+
+    async def get_data(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[Dict[Any, Any]]:
+        """Get data for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            default (Any, optional): Default value if data doesn't exist.
+                Defaults to None.
+
+        Returns:
+            dict[str, Any] | None: The stored data or None if not found
+        """
+        return await self._call(self.storage.get_data, user_id, default)
+
+    async def update_data(self, user_id: Union[int, str], data: Dict[Any, Any], ex: Optional[float] = None) -> None:
+        """Update data for a user.
+
+        This method updates existing data with new values, similar to dict.update().
+        Without `ex` the current expiration time is kept.
+
+        Args:
+            user_id (int | str): ID of the user
+            data (dict[str, Any]): Data to update
+            ex (float | None, optional): New expiration time in seconds. Defaults to None.
+
+        Example:
+            >>> # Existing data: {"name": "John"}
+            >>> await storage.update_data(user_id, {"age": 25})
+            >>> # Result: {"name": "John", "age": 25}
+        """
+        await self._call(self.storage.update_data, user_id, data, ex=ex)
+
+    async def delete_data(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[Dict[Any, Any]]:
+        """Clear and get all data for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            default (Any, optional): Default value if data doesn't exist.
+                Defaults to None.
+
+        Returns:
+            Dict | None: The deleted data or default value
+        """
+        return await self._call(self.storage.delete_data, user_id, default)
+
+    async def transition(
+        self,
+        user_id: Union[int, str],
+        expected: Optional[Union[str, Enum]],
+        new: Union[str, Enum],
+        data_patch: Optional[Dict[Any, Any]] = None,
+        ex: Optional[float] = None,
+        *,
+        callback: Optional[Callable[..., Any]] = None,
+        chat_id: Optional[Union[int, str]] = None
+    ) -> bool:
+        """Move a user to a new state only if the user is in the expected state.
+
+        Args:
+            user_id (int | str): ID of the user
+            expected (str | Enum | None): State the user must be in, None means no state
+            new (str | Enum): State to set
+            data_patch (dict[str, Any] | None, optional): Data to merge like `update_data`.
+                Defaults to None.
+            ex (float | None, optional): Expiration time for the state and data.
+                Defaults to None.
+            callback (Callable | None, optional): Callback function. Defaults to None.
+            chat_id (int | str, optional): Chat ID. Defaults to None.
+
+        Returns:
+            bool: True if the state was changed, False if the user wasn't in `expected`
+        """
+        return await self._call(
+            self.storage.transition,
+            user_id,
+            expected,
+            new,
+            data_patch,
+            ex,
+            callback=callback,
+            chat_id=chat_id
+        )
+
+    async def get_states_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[StateContext]]:
+        """Get the state contexts of many users with `IN` queries.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without state.
+                Defaults to None.
+
+        Returns:
+            list[StateContext | None]: State contexts in order of `user_ids`
+        """
+        return await self._call(self.storage.get_states_many, list(user_ids), default)
+
+    async def set_states_many(
+        self,
+        states: Dict[Union[int, str], Union[str, Enum]],
+        callback: Optional[Callable[..., Any]] = None,
+        ex: Optional[float] = None
+    ) -> None:
+        """Set states of many users in one transaction.
+
+        Args:
+            states (dict[int | str, str | Enum]): States mapped by user IDs
+            callback (Callable | None, optional): Callback function for all users.
+                Defaults to None.
+            ex (float | None, optional): Expiration time of the states.
+                Defaults to None.
+        """
+        await self._call(self.storage.set_states_many, states, callback, ex)
+
+    async def delete_states_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[StateContext]]:
+        """Delete and get the states of many users in one transaction.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without state.
+                Defaults to None.
+
+        Returns:
+            list[StateContext | None]: Deleted state contexts in order of `user_ids`
+        """
+        return await self._call(self.storage.delete_states_many, list(user_ids), default)
+
+    async def get_data_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[Dict[Any, Any]]]:
+        """Get data of many users with `IN` queries.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without data.
+                Defaults to None.
+
+        Returns:
+            list[dict[str, Any] | None]: Data in order of `user_ids`
+        """
+        return await self._call(self.storage.get_data_many, list(user_ids), default)
+
+    async def set_data_many(self, data: Dict[Union[int, str], Dict[Any, Any]], ex: Optional[float] = None) -> None:
+        """Set data of many users in one transaction.
+
+        This method completely replaces any existing data of the users.
+
+        Args:
+            data (dict[int | str, dict[str, Any]]): Data mapped by user IDs
+            ex (float | None, optional): Expiration time of the data.
+                Defaults to None.
+        """
+        await self._call(self.storage.set_data_many, data, ex)
+
+    async def delete_data_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[Dict[Any, Any]]]:
+        """Clear and get data of many users in one transaction.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without data.
+                Defaults to None.
+
+        Returns:
+            list[dict[str, Any] | None]: Deleted data in order of `user_ids`
+        """
+        return await self._call(self.storage.delete_data_many, list(user_ids), default)
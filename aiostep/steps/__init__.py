@@ -1,11 +1,19 @@
 from .functions import (
     MetaStore as MetaStore,
+    MemoryMetaStore as MemoryMetaStore,
+    Policy as Policy,
     change_root_store as change_root_store,
+    change_timing_wheel as change_timing_wheel,
     register_next_step as register_next_step,
     unregister_steps as unregister_steps,
     wait_for as wait_for,
+    listen as listen,
+    Subscription as Subscription,
     clear as clear
 )
+from .executor import StepExecutor as StepExecutor
+from .wheel import TimingWheel as TimingWheel
+from .redis import RedisMetaStore as RedisMetaStore
 from .dialects import (
     aiogram_dialect as aiogram_dialect,
     telebot_dialect as telebot_dialect,
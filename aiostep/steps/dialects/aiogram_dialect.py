@@ -1,4 +1,3 @@
-import asyncio
 import typing
 
 try:
@@ -9,7 +8,25 @@ except ImportError:
         pass
     aiogram_installed = False
 
-from ..functions import MetaStore, root
+from .. import functions
+from ..executor import StepExecutor
+from ..functions import MetaStore
+
+
+def _get_keys(event: "types.TelegramObject") -> typing.List[int]:
+    keys = []
+
+    try:
+        keys.append(event.from_user.id)
+    except AttributeError:
+        pass
+
+    try:
+        keys.append(event.message.chat.id if isinstance(event, types.CallbackQuery) else event.chat.id)
+    except AttributeError:
+        pass
+
+    return keys
 
 
 class Listen(BaseMiddleware):
@@ -23,6 +40,8 @@ class Listen(BaseMiddleware):
         - `ChatMemberUpdatedHandler`
         - `EditedMessageHandler`
 
+    if `executor` is given, step callbacks run as tasks on that `StepExecutor`.
+
     Example::
 
         dp = Dispatcher()
@@ -31,7 +50,8 @@ class Listen(BaseMiddleware):
 
     def __init__(
         self,
-        store: typing.Optional[MetaStore] = None
+        store: typing.Optional[MetaStore] = None,
+        executor: typing.Optional[StepExecutor] = None
     ) -> None:
         if not aiogram_installed:
             raise ImportError(
@@ -39,7 +59,8 @@ class Listen(BaseMiddleware):
                 "install package: "
                 "pip install aiogram"
             )
-        self.store = store or root
+        self.store = store or functions.root
+        self.executor = executor
 
     async def __call__(
         self,
@@ -47,22 +68,9 @@ class Listen(BaseMiddleware):
         event: types.TelegramObject,
         data: typing.Dict[str, typing.Any]
     ) -> typing.Any:
-        fn = None
-
-        try:
-            fn = await self.store.pop_item(event.from_user.id)
-        except (KeyError, AttributeError):
-            try:
-                chat_id = event.message.chat.id if isinstance(event, types.CallbackQuery) else event.chat.id
-                fn = await self.store.pop_item(chat_id)
-            except (KeyError, AttributeError):
-                pass
-
-        if fn is not None:
-            if isinstance(fn, asyncio.Future):
-                fn.set_result(event)
-                return
-            await fn(event)
+        if self.store.has_any() and await functions._feed_step(
+            self.store, _get_keys(event), event, self.executor
+        ):
             return
 
         return await handler(event, data)
@@ -1,4 +1,3 @@
-import asyncio
 import typing
 
 try:
@@ -11,7 +10,9 @@ except ImportError:
 
     telebot_installed = False
 
-from ..functions import MetaStore, root
+from .. import functions
+from ..executor import StepExecutor
+from ..functions import MetaStore
 
 
 class Listen(BaseMiddleware):
@@ -25,6 +26,8 @@ class Listen(BaseMiddleware):
         - `chat_member`
         - `edited_message`
 
+    if `executor` is given, step callbacks run as tasks on that `StepExecutor`.
+
     Example::
 
         bot = TeleBot()
@@ -33,7 +36,8 @@ class Listen(BaseMiddleware):
     def __init__(
         self,
         update_types: typing.Optional[typing.List[str]] = None,
-        store: typing.Optional[MetaStore] = None
+        store: typing.Optional[MetaStore] = None,
+        executor: typing.Optional[StepExecutor] = None
     ):
         if not telebot_installed:
             raise ImportError(
@@ -41,111 +45,46 @@ class Listen(BaseMiddleware):
                 "install package: "
                 "pip install pyTelegramBotAPI"
             )
-        self.store = store or root
+        self.store = store or functions.root
+        self.executor = executor
         self.update_sensitive = True
         self.update_types = update_types or ["message"]
 
-    async def pre_process_message(self, message: "types.Message", data):
-        fn = None
-
-        try:
-            fn = await self.store.pop_item(message.from_user.id)
-        except (KeyError, AttributeError):
-            try:
-                fn = await self.store.pop_item(message.chat.id)
-            except (KeyError, AttributeError):
-                pass
-
-        if fn is not None:
-            if isinstance(fn, asyncio.Future):
-                fn.set_result(message)
-                return SkipHandler()
-            await fn(message)
+    async def _listen(self, update: typing.Any, chat: typing.Any) -> typing.Optional["SkipHandler"]:
+        if not self.store.has_any():
+            return None
+
+        keys = [obj.id for obj in (getattr(update, "from_user", None), chat) if obj is not None]
+        if await functions._feed_step(self.store, keys, update, self.executor):
             return SkipHandler()
+        return None
+
+    async def pre_process_message(self, message: "types.Message", data):
+        return await self._listen(message, message.chat)
 
     async def post_process_message(self, message: "types.Message", data, exception):
         pass
 
     async def pre_process_callback_query(self, call: "types.CallbackQuery", data):
-        fn = None
-
-        try:
-            fn = await self.store.pop_item(call.from_user.id)
-        except (KeyError, AttributeError):
-            try:
-                fn = await self.store.pop_item(call.message.chat.id)
-            except (KeyError, AttributeError):
-                pass
-
-        if fn is not None:
-            if isinstance(fn, asyncio.Future):
-                fn.set_result(call)
-                return SkipHandler()
-            await fn(call)
-            return SkipHandler()
+        return await self._listen(call, call.message.chat if call.message else None)
 
     async def post_process_callback_query(self, call: "types.CallbackQuery", data, exception):
         pass
 
     async def pre_process_edited_message(self, message: "types.Message", data):
-        fn = None
-
-        try:
-            fn = await self.store.pop_item(message.from_user.id)
-        except (KeyError, AttributeError):
-            try:
-                fn = await self.store.pop_item(message.chat.id)
-            except (KeyError, AttributeError):
-                pass
-
-        if fn is not None:
-            if isinstance(fn, asyncio.Future):
-                fn.set_result(message)
-                return SkipHandler()
-            await fn(message)
-            return SkipHandler()
+        return await self._listen(message, message.chat)
 
     async def post_process_edited_message(self, message: "types.Message", data, exception):
         pass
 
     async def pre_process_chat_join_request(self, join_request: "types.ChatJoinRequest", data):
-        fn = None
-
-        try:
-            fn = await self.store.pop_item(join_request.from_user.id)
-        except (KeyError, AttributeError):
-            try:
-                fn = await self.store.pop_item(join_request.chat.id)
-            except (KeyError, AttributeError):
-                pass
-
-        if fn is not None:
-            if isinstance(fn, asyncio.Future):
-                fn.set_result(join_request)
-                return SkipHandler()
-            await fn(join_request)
-            return SkipHandler()
+        return await self._listen(join_request, join_request.chat)
 
     async def post_process_chat_join_request(self, join_request: "types.ChatJoinRequest", data, exception):
         pass
 
     async def pre_process_chat_member(self, status: "types.ChatMemberUpdated", data):
-        fn = None
-
-        try:
-            fn = await self.store.pop_item(status.from_user.id)
-        except (KeyError, AttributeError):
-            try:
-                fn = await self.store.pop_item(status.chat.id)
-            except (KeyError, AttributeError):
-                pass
-
-        if fn is not None:
-            if isinstance(fn, asyncio.Future):
-                fn.set_result(status)
-                return SkipHandler()
-            await fn(status)
-            return SkipHandler()
+        return await self._listen(status, status.chat)
 
     async def post_process_chat_member(self, status: "types.ChatMemberUpdated", data, exception):
         pass
@@ -1,4 +1,3 @@
-import asyncio
 import typing
 
 try:
@@ -7,13 +6,16 @@ try:
 except ImportError:
     telethon_installed = False
 
-from ..functions import MetaStore, root
+from .. import functions
+from ..executor import StepExecutor
+from ..functions import MetaStore
 
 
 def Listen(
     app: "TelegramClient",
     store: typing.Optional[MetaStore] = None,
     event: typing.Any = None,
+    executor: typing.Optional[StepExecutor] = None,
     **kwargs
 ) -> None:
     """
@@ -24,6 +26,8 @@ def Listen(
         - `CallbackQuery`
         - `MessageEdited`
 
+    if `executor` is given, step callbacks run as tasks on that `StepExecutor`.
+
     Example::
 
         app = TelegramClient()
@@ -35,26 +39,15 @@ def Listen(
             "install package: "
             "pip install telethon"
         )
-    store = store or root
+    store = store or functions.root
     event = event or events.NewMessage
 
     async def _listen_wrapper(_event):
-        fn = None
-
-        try:
-            fn = await store.pop_item(_event.sender_id)
-        except (KeyError, AttributeError):
-            try:
-                fn = await store.pop_item(_event.chat_id)
-            except (KeyError, AttributeError):
-                pass
-
-        if fn is not None:
-            if isinstance(fn, asyncio.Future):
-                fn.set_result(_event)
-                return
-
-            await fn(_event)
-            return
+        if store.has_any():
+            keys = [
+                key for key in (getattr(_event, "sender_id", None), getattr(_event, "chat_id", None))
+                if key is not None
+            ]
+            await functions._feed_step(store, keys, _event, executor)
 
     app.add_event_handler(_listen_wrapper, event(**kwargs))
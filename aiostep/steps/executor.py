@@ -0,0 +1,106 @@
+import asyncio
+import collections
+import typing
+
+
+class StepExecutor:
+    """Runs next-step callbacks as tasks instead of awaiting them in `Listen`.
+
+    At most `concurrency` callbacks run at the same time, and callbacks of the
+    same user run one after another in the order updates arrived, so a slow
+    step doesn't block other users.
+
+    Exceptions raised by callbacks are passed to the loop exception handler.
+
+    Args:
+        concurrency (int): Maximum number of callbacks running at the same time.
+            Defaults to 100.
+
+    Example::
+
+        executor = aiostep.StepExecutor(concurrency=50)
+        dp.message.outer_middleware(aiogram_dialect.Listen(executor=executor))
+    """
+
+    def __init__(self, concurrency: int = 100) -> None:
+        if concurrency <= 0:
+            raise ValueError(f"'concurrency' must be positive, got {concurrency}")
+
+        self.concurrency = concurrency
+        self.active = 0
+        self.processed = 0
+        self.failed = 0
+        self.max_depth = 0
+        self._semaphore: typing.Optional[asyncio.Semaphore] = None
+        self._queues: typing.Dict[int, typing.Deque[tuple]] = {}
+        self._workers: typing.Dict[int, asyncio.Task] = {}
+
+    @property
+    def pending(self) -> int:
+        """
+        number of callbacks waiting to run.
+        """
+        return sum(len(queue) for queue in self._queues.values())
+
+    def queue_depth(self, key: int) -> int:
+        """
+        number of callbacks waiting to run for `key`.
+        """
+        queue = self._queues.get(key)
+        return len(queue) if queue is not None else 0
+
+    def stats(self) -> typing.Dict[str, int]:
+        """
+        gives counters of executor.
+        """
+        return {
+            "active": self.active,
+            "pending": self.pending,
+            "users": len(self._queues),
+            "max_depth": self.max_depth,
+            "processed": self.processed,
+            "failed": self.failed
+        }
+
+    def submit(self, key: int, fn: typing.Callable[[typing.Any], typing.Awaitable[typing.Any]], event: typing.Any) -> None:
+        """
+        schedules `fn(event)` after previous callbacks of `key`.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = collections.deque()
+            self._workers[key] = asyncio.ensure_future(self._run(key, queue))
+
+        queue.append((fn, event))
+        self.max_depth = max(self.max_depth, len(queue))
+
+    async def _run(self, key: int, queue: typing.Deque[tuple]) -> None:
+        try:
+            while queue:
+                fn, event = queue.popleft()
+                async with self._semaphore:
+                    self.active += 1
+                    try:
+                        await fn(event)
+                    except Exception as exc:
+                        self.failed += 1
+                        asyncio.get_running_loop().call_exception_handler({
+                            "message": f"Exception in step {fn!r}",
+                            "exception": exc
+                        })
+                    finally:
+                        self.active -= 1
+                        self.processed += 1
+        finally:
+            del self._queues[key]
+            del self._workers[key]
+
+    async def join(self) -> None:
+        """
+        waits until all scheduled callbacks are done.
+        """
+        while self._workers:
+            await asyncio.gather(*self._workers.values(), return_exceptions=True)
@@ -1,15 +1,183 @@
 import asyncio
+import heapq
+import itertools
 import typing
 import functools
 import cachebox
 
-_MT = typing.Union[asyncio.Future, typing.Callable]
+from enum import Enum
+
+from .executor import StepExecutor
+from .wheel import TimingWheel
+
+_MT = typing.Union[asyncio.Future, "Subscription", typing.Callable]
+_Predicate = typing.Callable[[_MT], bool]
+_Filter = typing.Callable[[typing.Any], bool]
+_ExpireHook = typing.Callable[[int, _MT], typing.Awaitable[None]]
+_CLOSED = object()
+
+
+def _matches(
+    event: typing.Any,
+    filter: typing.Optional[_Filter],
+    content_types: typing.Optional[typing.FrozenSet[str]]
+) -> bool:
+    if content_types is not None and getattr(event, "content_type", None) not in content_types:
+        return False
+    return filter is None or bool(filter(event))
+
+
+class _Waiter(asyncio.Future):
+    """
+    Future of `wait_for` which accepts only matching updates.
+    """
+
+    def __init__(
+        self,
+        filter: typing.Optional[_Filter] = None,
+        content_types: typing.Optional[typing.Iterable[str]] = None,
+        *,
+        loop: typing.Optional[asyncio.AbstractEventLoop] = None
+    ) -> None:
+        super().__init__(loop=loop)
+        self.filter = filter
+        self.content_types = frozenset(content_types) if content_types is not None else None
+
+    def accepts(self, event: typing.Any) -> bool:
+        return _matches(event, self.filter, self.content_types)
+
+
+class Subscription:
+    """
+    Stream of updates coming from specific user_id, created by `listen`.
+
+    Unlike `wait_for`, subscription stays registered in the store until it's
+    closed, and updates are delivered through a bounded queue. When the queue
+    is full, `Listen` waits until the consumer catches up.
+
+    Example::
+
+        async with aiostep.listen(message.from_user.id, idle_timeout=60) as updates:
+            async for update in updates:
+                if update.text == "/done":
+                    break
+    """
+
+    # dialects don't remove persistent values from the store.
+    persistent = True
+
+    def __init__(
+        self,
+        user_id: int,
+        store: "MetaStore",
+        maxsize: int = 100,
+        idle_timeout: typing.Optional[float] = None,
+        filter: typing.Optional[_Filter] = None,
+        content_types: typing.Optional[typing.Iterable[str]] = None
+    ) -> None:
+        self.user_id = user_id
+        self.store = store
+        self.idle_timeout = idle_timeout
+        self.filter = filter
+        self.content_types = frozenset(content_types) if content_types is not None else None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.registered = False
+        self.closed = False
+
+    def accepts(self, event: typing.Any) -> bool:
+        return not self.closed and _matches(event, self.filter, self.content_types)
+
+    async def feed(self, event: typing.Any) -> None:
+        """
+        puts `event` into the queue, waits if the queue is full.
+        """
+        await self.queue.put(event)
+
+    async def open(self) -> None:
+        """
+        registers subscription in the store.
+        """
+        if not self.registered and not self.closed:
+            await self.store.set_item(self.user_id, self)
+            self.registered = True
+
+    def cancel(self) -> None:
+        """
+        stops iteration without unregistering from the store.
+        """
+        self.closed = True
+        try:
+            self.queue.put_nowait(_CLOSED)
+        except asyncio.QueueFull:
+            pass
+
+    async def close(self) -> None:
+        """
+        unregisters subscription and stops iteration.
+        """
+        self.cancel()
+        if not self.registered:
+            return
+
+        self.registered = False
+        await self.store.discard_item(self.user_id, self)
+
+    async def __aenter__(self) -> "Subscription":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> typing.Any:
+        if self.closed and self.queue.empty():
+            raise StopAsyncIteration
+        await self.open()
+
+        try:
+            event = await asyncio.wait_for(self.queue.get(), self.idle_timeout)
+        except asyncio.TimeoutError:
+            await self.close()
+            raise TimeoutError
+
+        if event is _CLOSED:
+            await self.close()
+            raise StopAsyncIteration
+        return event
+
+
+class Policy(str, Enum):
+    """
+    What a store does when several steps are registered for the same key.
+
+    Attributes:
+        FIRST: Steps are kept in FIFO order, an update goes to the oldest one.
+        BROADCAST: Steps are kept, an update goes to all of them.
+        REPLACE: New step replaces the old one, old waiters are cancelled.
+    """
+    FIRST = "first"
+    BROADCAST = "broadcast"
+    REPLACE = "replace"
+
+
+def _cancel(value: _MT) -> None:
+    if isinstance(value, asyncio.Future):
+        if not value.done():
+            value.cancel("replaced")
+    elif isinstance(value, Subscription):
+        value.cancel()
 
 
 class MetaStore:
-    async def set_item(self, key: int, value: _MT) -> None:
+    async def set_item(self, key: int, value: _MT, ttl: typing.Optional[float] = None) -> None:
         """
         Stores key-value.
+
+        stores with a `Policy` may keep earlier values of the key.
+        value is removed after `ttl` seconds, if given.
         """
         raise NotImplementedError
 
@@ -17,10 +185,71 @@ class MetaStore:
         """
         Gives stored key-value.
 
+        if there are several values, gives the oldest one.
+
         raise KeyError if not found.
         """
         raise NotImplementedError
 
+    async def discard_item(self, key: int, value: _MT) -> None:
+        """
+        Removes `value` from key, keeps other values of the key.
+        """
+        try:
+            stored = await self.pop_item(key)
+        except KeyError:
+            return
+        if stored is not value:
+            await self.set_item(key, stored)
+
+    async def pop_first(
+        self,
+        keys: typing.Iterable[int],
+        predicate: typing.Optional[_Predicate] = None
+    ) -> typing.Optional[typing.Union[_MT, typing.List[_MT]]]:
+        """
+        Gives stored value of the first found key and removes it.
+
+        values rejected by `predicate` are skipped, and values with a true
+        `persistent` attribute (subscriptions) are given, both stay stored.
+        stores with `Policy.BROADCAST` give a list of all accepted values.
+
+        return None if none of `keys` is found.
+        """
+        for key in keys:
+            try:
+                value = await self.pop_item(key)
+            except KeyError:
+                continue
+
+            accepted = predicate is None or predicate(value)
+            if not accepted or getattr(value, "persistent", False):
+                await self.set_item(key, value)
+            if accepted:
+                return value
+        return None
+
+    async def pop_many(self, keys: typing.Iterable[int]) -> typing.List[_MT]:
+        """
+        Gives all stored values of found keys and removes them.
+        """
+        values = []
+        for key in keys:
+            while True:
+                try:
+                    values.append(await self.pop_item(key))
+                except KeyError:
+                    break
+        return values
+
+    def has_any(self) -> bool:
+        """
+        Tells whether anything may be stored, without waiting for I/O.
+
+        stores that can't tell it cheaply should return True.
+        """
+        return True
+
     async def clear(self) -> typing.AsyncGenerator[_MT, None]:
         """
         Gives and clears all stored key-value.
@@ -28,22 +257,221 @@ class MetaStore:
         raise NotImplementedError
 
 
-class _RootStore(MetaStore):
-    def __init__(self) -> None:
-        self.cache = cachebox.Cache(0)
+class MemoryMetaStore(MetaStore):
+    """
+    In-memory store, used as the default root store.
+
+    Args:
+        policy (Policy | str): What to do when several steps are registered
+            for the same key. Defaults to `Policy.REPLACE`.
+        maxsize (int): Maximum number of keys, least recently used keys are
+            evicted when it's reached. Defaults to 0 (unbounded).
+        ttl (float | None): Default time to live of stored steps in seconds,
+            `ttl=0` of `set_item` stores a step without it. Defaults to None (no expiry).
+        on_expire (Callable | None): Async callback called with key and value
+            of each expired or evicted step. Steps expire on a loop timer,
+            even if no more updates come, and expired `wait_for` calls raise TimeoutError.
+
+    Example::
+
+        async def on_expire(user_id, step):
+            await bot.send_message(user_id, "Conversation expired.")
+
+        aiostep.change_root_store(aiostep.MemoryMetaStore(maxsize=100_000, ttl=3600, on_expire=on_expire))
+    """
 
-    async def set_item(self, key: int, value: _MT) -> None:
-        self.cache[key] = value
+    def __init__(
+        self,
+        policy: typing.Union[Policy, str] = Policy.REPLACE,
+        maxsize: int = 0,
+        ttl: typing.Optional[float] = None,
+        on_expire: typing.Optional[_ExpireHook] = None
+    ) -> None:
+        self.policy = Policy(policy)
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_expire = on_expire
+        self.cache = cachebox.LRUCache(maxsize) if maxsize else cachebox.Cache(0)
+        # (deadline, sequence, key, id of value), entries are checked against `_expiring`
+        self._deadlines: typing.List[typing.Tuple[float, int, int, int]] = []
+        # (key, id of value) -> (deadline, sequence, value) of steps with a ttl
+        self._expiring: typing.Dict[typing.Tuple[int, int], typing.Tuple[float, int, _MT]] = {}
+        self._counter = itertools.count()
+        self._timer: typing.Optional[asyncio.TimerHandle] = None
+        self._expiry_task: typing.Optional[asyncio.Task] = None
+
+    async def _expire(self, key: int, value: _MT) -> None:
+        _cancel(value)
+        if self.on_expire is not None:
+            await self.on_expire(key, value)
+
+    def _set_expiry(self, key: int, value: _MT, ttl: typing.Optional[float]) -> None:
+        if not ttl:
+            self._forget(key, value)
+            return
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + ttl
+        sequence = next(self._counter)
+        self._expiring[(key, id(value))] = (deadline, sequence, value)
+        heapq.heappush(self._deadlines, (deadline, sequence, key, id(value)))
+        self._schedule(loop)
+
+    def _forget(self, key: int, value: _MT) -> None:
+        if not self._expiring or self._expiring.pop((key, id(value)), None) is None:
+            return
+
+        # entries of consumed steps stay in the heap until their deadline,
+        # so it's rebuilt when most of them are stale.
+        if len(self._deadlines) > 2 * len(self._expiring) + 64:
+            self._deadlines = [
+                (deadline, sequence, key, value_id)
+                for (key, value_id), (deadline, sequence, _) in self._expiring.items()
+            ]
+            heapq.heapify(self._deadlines)
+
+    def _schedule(self, loop: asyncio.AbstractEventLoop) -> None:
+        # a single timer for the earliest deadline expires steps without new updates.
+        if not self._deadlines:
+            return
+
+        deadline = self._deadlines[0][0]
+        if self._timer is not None:
+            if self._timer.when() <= deadline:
+                return
+            self._timer.cancel()
+        self._timer = loop.call_at(deadline, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._expiry_task = asyncio.ensure_future(self._expire_due())
+
+    async def _expire_due(self) -> None:
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, sequence, key, value_id = heapq.heappop(self._deadlines)
+
+            entry = self._expiring.get((key, value_id))
+            if entry is None or entry[1] != sequence:
+                # consumed, or registered again with a new ttl.
+                continue
+
+            del self._expiring[(key, value_id)]
+            value = entry[2]
+            await self.discard_item(key, value)
+            if isinstance(value, asyncio.Future) and not value.done():
+                # `wait_for` raises the same error as for its own timeout.
+                value.set_exception(asyncio.TimeoutError())
+            await self._expire(key, value)
+        self._schedule(loop)
+
+    async def set_item(self, key: int, value: _MT, ttl: typing.Optional[float] = None) -> None:
+        self._set_expiry(key, value, ttl if ttl is not None else self.ttl)
+
+        values = self.cache.get(key)
+        if values is None:
+            if self.maxsize and len(self.cache) >= self.maxsize:
+                evicted_key, evicted = self.cache.popitem()
+                for old in evicted:
+                    self._forget(evicted_key, old)
+                    await self._expire(evicted_key, old)
+
+            self.cache[key] = [value]
+            return
+
+        if self.policy is Policy.REPLACE:
+            self.cache[key] = [value]
+            for old in values:
+                if old is not value:
+                    self._forget(key, old)
+                    _cancel(old)
+        else:
+            values.append(value)
 
     async def pop_item(self, key: int) -> _MT:
-        return self.cache.pop(key)
+        values = self.cache[key]
+        value = values.pop(0)
+        if not values:
+            del self.cache[key]
+        self._forget(key, value)
+        return value
+
+    async def discard_item(self, key: int, value: _MT) -> None:
+        values = self.cache.get(key)
+        if values is None:
+            return
+
+        for index, stored in enumerate(values):
+            if stored is value:
+                del values[index]
+                self._forget(key, value)
+                break
+        if not values:
+            del self.cache[key]
+
+    async def pop_first(
+        self,
+        keys: typing.Iterable[int],
+        predicate: typing.Optional[_Predicate] = None
+    ) -> typing.Optional[typing.Union[_MT, typing.List[_MT]]]:
+        for key in keys:
+            values = self.cache.get(key)
+            if values is None:
+                continue
+
+            if self.policy is Policy.BROADCAST:
+                accepted = [value for value in values if predicate is None or predicate(value)]
+                if not accepted:
+                    continue
+
+                kept = []
+                for value in values:
+                    if getattr(value, "persistent", False) or not any(value is a for a in accepted):
+                        kept.append(value)
+                    else:
+                        self._forget(key, value)
+                if kept:
+                    self.cache[key] = kept
+                else:
+                    del self.cache[key]
+                return accepted
+
+            for index, value in enumerate(values):
+                if predicate is not None and not predicate(value):
+                    continue
+
+                if not getattr(value, "persistent", False):
+                    del values[index]
+                    if not values:
+                        del self.cache[key]
+                    self._forget(key, value)
+                return value
+        return None
+
+    async def pop_many(self, keys: typing.Iterable[int]) -> typing.List[_MT]:
+        values = []
+        for key in keys:
+            for value in self.cache.pop(key, ()):
+                self._forget(key, value)
+                values.append(value)
+        return values
+
+    def has_any(self) -> bool:
+        return len(self.cache) != 0
 
     async def clear(self) -> typing.AsyncGenerator[_MT, None]:
-        for k in self.cache.keys():
-            yield self.cache.pop(k)
+        for k in list(self.cache.keys()):
+            for value in self.cache.pop(k, ()):
+                self._forget(k, value)
+                yield value
+
 
+_RootStore = MemoryMetaStore
 
-root = _RootStore()
+
+root = MemoryMetaStore()
+timing_wheel: typing.Optional[TimingWheel] = None
 
 
 def change_root_store(store: MetaStore) -> None:
@@ -54,6 +482,16 @@ def change_root_store(store: MetaStore) -> None:
     root = store
 
 
+def change_timing_wheel(wheel: typing.Optional[TimingWheel]) -> None:
+    """
+    changes timing wheel used by `wait_for` timeouts.
+
+    pass `None` to use `asyncio.wait_for` again.
+    """
+    global timing_wheel
+    timing_wheel = wheel
+
+
 async def register_next_step(
     user_id: int,
     _next: typing.Any,
@@ -61,10 +499,13 @@ async def register_next_step(
     *,
     args: tuple = (),
     kwargs: dict = {},
+    ttl: typing.Optional[float] = None
 ) -> None:
     """
     register next step for user/chat.
 
+    if `ttl` is given, step is removed after `ttl` seconds.
+
     Example::
 
         async def ask_name(message: Message):
@@ -77,49 +518,123 @@ async def register_next_step(
     if args or kwargs:
         _next = functools.partial(_next, *args, **kwargs)
 
-    await (store or root).set_item(user_id, _next)
+    if ttl is None:
+        await (store or root).set_item(user_id, _next)
+    else:
+        await (store or root).set_item(user_id, _next, ttl=ttl)
 
 
 async def unregister_steps(user_id: int, store: typing.Optional[MetaStore] = None) -> None:
     """
     unregister steps for `user_id`.
 
-    if step is `asyncio.Future`, cancels that.
+    if step is `asyncio.Future` or `Subscription`, cancels that.
     """
-    try:
-        u = await (store or root).pop_item(user_id)
-    except KeyError:
-        return
-    else:
+    for u in await (store or root).pop_many((user_id,)):
         if isinstance(u, asyncio.Future):
             u.cancel("cancelled")
+        elif isinstance(u, Subscription):
+            u.registered = False
+            u.cancel()
+
+
+def _accepts(event: typing.Any, fn: _MT) -> bool:
+    return fn.accepts(event) if isinstance(fn, (_Waiter, Subscription)) else True
+
+
+async def _feed_step(
+    store: MetaStore,
+    keys: typing.Sequence[int],
+    event: typing.Any,
+    executor: typing.Optional[StepExecutor] = None
+) -> bool:
+    """
+    gives `event` to the step registered for the first found key.
+
+    step callables are scheduled on `executor` under the first key, if given.
+
+    returns False if there's no step to handle the event.
+    """
+    fn = await store.pop_first(keys, functools.partial(_accepts, event))
+    if fn is None:
+        return False
+
+    if isinstance(fn, list):
+        handled = False
+        for step in fn:
+            handled = await _feed(step, event, keys[0], executor) or handled
+        return handled
+    return await _feed(fn, event, keys[0], executor)
+
+
+async def _feed(fn: _MT, event: typing.Any, key: int, executor: typing.Optional[StepExecutor]) -> bool:
+    if isinstance(fn, Subscription):
+        await fn.feed(event)
+        return True
+
+    if isinstance(fn, asyncio.Future):
+        if fn.done():
+            return False
+        fn.set_result(event)
+        return True
+
+    if executor is not None:
+        executor.submit(key, fn, event)
+    else:
+        await fn(event)
+    return True
 
 
 async def _wait_future(
     user_id: int,
     timeout: typing.Optional[float],
-    store: MetaStore
+    store: MetaStore,
+    wheel: typing.Optional[TimingWheel],
+    filter: typing.Optional[_Filter] = None,
+    content_types: typing.Optional[typing.Iterable[str]] = None
 ):
-    fn = asyncio.get_event_loop().create_future()
+    if filter is None and content_types is None:
+        fn = asyncio.get_event_loop().create_future()
+    else:
+        fn = _Waiter(filter, content_types)
 
     await store.set_item(user_id, fn)
 
     try:
-        return await asyncio.wait_for(fn, timeout)
+        if timeout is None or wheel is None:
+            return await asyncio.wait_for(fn, timeout)
+
+        slot = wheel.add(fn, timeout)
+        try:
+            return await fn
+        finally:
+            wheel.discard(fn, slot)
     finally:
-        await unregister_steps(user_id, store)
+        fn.cancel("cancelled")
+        await store.discard_item(user_id, fn)
 
 
 async def wait_for(
     user_id: int,
     timeout: typing.Optional[float] = None,
-    store: typing.Optional[MetaStore] = None
+    store: typing.Optional[MetaStore] = None,
+    wheel: typing.Optional[TimingWheel] = None,
+    *,
+    filter: typing.Optional[_Filter] = None,
+    content_types: typing.Optional[typing.Iterable[str]] = None
 ):
     """
     wait for update which comming from specific user_id.
 
     raise TimeoutError if timed out.
 
+    updates not matching `filter` or `content_types` aren't consumed and go to
+    the normal handlers instead. `filter` runs only in this process, so stores
+    shared between workers (`RedisMetaStore`) raise ValueError for it.
+
+    if `wheel` (or the one set by `change_timing_wheel`) is given, timeout is
+    handled by that `TimingWheel` instead of `asyncio.wait_for`.
+
     Example::
 
         async def echo_handler(message: Message):
@@ -130,17 +645,53 @@ async def wait_for(
                 await message.reply('You took too long to answer.')
             else:
                 await message.reply(f"You typed: {response.text}")
+
+        photo = await aiostep.wait_for(message.from_user.id, content_types=["photo"])
     """
     try:
-        return await _wait_future(user_id, timeout, store or root)
+        return await _wait_future(
+            user_id,
+            timeout,
+            store or root,
+            wheel if wheel is not None else timing_wheel,
+            filter,
+            content_types
+        )
     except asyncio.TimeoutError:
         raise TimeoutError
 
 
+def listen(
+    user_id: int,
+    store: typing.Optional[MetaStore] = None,
+    *,
+    maxsize: int = 100,
+    idle_timeout: typing.Optional[float] = None,
+    filter: typing.Optional[_Filter] = None,
+    content_types: typing.Optional[typing.Iterable[str]] = None
+) -> Subscription:
+    """
+    listen for all updates which comming from specific user_id.
+
+    raise TimeoutError if no update comes in `idle_timeout` seconds.
+
+    Example::
+
+        async def collect_photos(message: Message):
+            photos = []
+            async with aiostep.listen(message.from_user.id, content_types=["photo", "text"]) as updates:
+                async for update in updates:
+                    if update.text == "/done":
+                        break
+                    photos.append(update.photo[-1])
+    """
+    return Subscription(user_id, store or root, maxsize, idle_timeout, filter, content_types)
+
+
 async def clear(store: typing.Optional[MetaStore] = None) -> None:
     """
     Clears all registered key-value's.
     """
     async for i in (store or root).clear():  # type: ignore
-        if isinstance(i, asyncio.Future):
+        if isinstance(i, (asyncio.Future, Subscription)):
             i.cancel()
@@ -0,0 +1,432 @@
+import asyncio
+import collections
+import functools
+import itertools
+import math
+import pickle
+import typing
+import uuid
+
+from msgspec.json import Encoder, Decoder
+
+try:
+    from redis.asyncio.client import Redis
+    redis_installed = True
+except ImportError:
+    redis_installed = False
+
+from .functions import MetaStore, Policy, Subscription, _MT, _Predicate, _Waiter, _cancel
+
+
+class _RemoteSubscription(Subscription):
+    """
+    Subscription owned by another worker, updates are forwarded to the owner.
+    """
+
+    def __init__(
+        self,
+        store: "RedisMetaStore",
+        owner: str,
+        token: int,
+        content_types: typing.Optional[typing.Iterable[str]]
+    ) -> None:
+        super().__init__(None, store, content_types=content_types)
+        self.owner = owner
+        self.token = token
+
+    async def feed(self, event: typing.Any) -> None:
+        await self.store._publish(self.owner, ("feed", self.token, event))
+
+    def cancel(self) -> None:
+        self.closed = True
+        self.store._send(self.owner, ("cancel", self.token, None))
+
+
+class RedisMetaStore(MetaStore):
+    """Redis-backed store for sharing steps between bot workers.
+
+    Futures can't leave the process that awaits them, so each worker keeps its own
+    waiters locally and only publishes their owner in Redis. A worker that receives
+    the answer forwards the update to the owner through a pub/sub channel.
+
+    Steps of a key are kept in a redis list. Step callables are stored by name, so every worker must register the same
+    steps (see `register_step`) before updates reach it; a worker drops steps
+    it doesn't know and reports them to the loop's exception handler.
+
+    Other workers can't run the `filter` of `wait_for` and `listen`, so it
+    raises ValueError here; `content_types` is shared and works as usual.
+
+    Note:
+        Requires redis package to be installed:
+        pip install aiostep[redis]
+
+    Args:
+        redis (Redis | None): Async redis client instance
+        prefix (str): Prefix for redis keys and channels
+        worker_id (str | None): Unique name of this worker. Defaults to a random id.
+        ex (int | None): Optional expiration time for registered steps.
+            A key with several steps expires with its latest registered step.
+        policy (Policy | str): What to do when several steps are registered
+            for the same key. Defaults to `Policy.REPLACE`.
+        dumps (Callable): Serializer for updates forwarded to other workers
+        loads (Callable): Deserializer for updates forwarded from other workers.
+            Defaults to `pickle.loads`, which can run arbitrary code, so anyone
+            who can publish to the redis channels controls the bot; use a
+            redis server only the workers can reach, or pass your own `dumps` and `loads`.
+
+    Example::
+
+        store = RedisMetaStore(host="localhost")
+        aiostep.change_root_store(store)
+
+        @store.register_step
+        async def ask_age(message: Message):
+            ...
+    """
+
+    def __init__(
+        self,
+        redis: typing.Optional["Redis"] = None,
+        host: typing.Optional[str] = "localhost",
+        port: typing.Optional[int] = 6379,
+        db: typing.Optional[int] = 0,
+        password: typing.Optional[str] = None,
+        prefix: str = "aiostep:steps",
+        worker_id: typing.Optional[str] = None,
+        ex: typing.Optional[int] = None,
+        policy: typing.Union[Policy, str] = Policy.REPLACE,
+        dumps: typing.Callable[[typing.Any], bytes] = pickle.dumps,
+        loads: typing.Callable[[bytes], typing.Any] = pickle.loads,
+        **kwargs
+    ) -> None:
+        if not redis_installed:
+            raise ImportError(
+                "Redis package is not installed. "
+                "To use RedisMetaStore, install package with redis support: "
+                "pip install aiostep[redis]"
+            )
+
+        if not redis:
+            redis = Redis(
+                host=host,
+                port=port,
+                db=db,
+                password=password,
+                **kwargs
+            )
+        self.cache = redis
+        self.prefix = prefix
+        self.worker_id = worker_id or uuid.uuid4().hex
+        self.ex = ex
+        self.policy = Policy(policy)
+        self.dumps = dumps
+        self.loads = loads
+        self.encoder = Encoder()
+        self.decoder = Decoder()
+
+        self.steps: typing.Dict[str, typing.Callable] = {}
+        self._names: typing.Dict[typing.Callable, str] = {}
+        self._waiters: typing.Dict[int, asyncio.Future] = {}
+        self._tokens = itertools.count()
+        self._pubsub = None
+        self._listener: typing.Optional[asyncio.Task] = None
+        self._listener_lock: typing.Optional[asyncio.Lock] = None
+        self._publishing: typing.Set[asyncio.Task] = set()
+        # updates waiting for a full subscription queue, by token
+        self._backlogs: typing.Dict[int, typing.Deque[typing.Any]] = {}
+        self._draining: typing.Set[asyncio.Task] = set()
+
+    def _get_key(self, key: typing.Union[int, str]) -> str:
+        return f"{self.prefix}:{key}"
+
+    def _get_channel(self, worker_id: str) -> str:
+        return f"{self.prefix}:worker:{worker_id}"
+
+    def register_step(
+        self,
+        step: typing.Optional[typing.Callable] = None,
+        *,
+        name: typing.Optional[str] = None
+    ) -> typing.Callable:
+        """
+        registers step callable under `name` (defaults to `step.__name__`).
+
+        can be used as a decorator.
+        """
+        if step is None:
+            return functools.partial(self.register_step, name=name)
+
+        name = name or step.__name__
+        registered = self.steps.get(name)
+        if registered is not None and registered is not step:
+            raise ValueError(f"another step is already registered as {name!r}")
+
+        self.steps[name] = step
+        self._names[step] = name
+        return step
+
+    async def _ensure_listener(self) -> None:
+        if self._listener is not None and not self._listener.done():
+            return
+
+        if self._listener_lock is None:
+            self._listener_lock = asyncio.Lock()
+
+        async with self._listener_lock:
+            # another call may have started it while this one waited.
+            if self._listener is not None and not self._listener.done():
+                return
+
+            if self._pubsub is not None:
+                # the listener stopped, e.g. on a lost connection.
+                await self._pubsub.aclose()
+
+            # subscribe before any waiter is published, so no answer can be missed.
+            self._pubsub = self.cache.pubsub()
+            await self._pubsub.subscribe(self._get_channel(self.worker_id))
+            self._listener = asyncio.ensure_future(self._listen())
+
+    async def _listen(self) -> None:
+        async for message in self._pubsub.listen():
+            if message["type"] != "message":
+                continue
+
+            # a bad message must not stop forwarding to the other waiters.
+            try:
+                await self._handle(message["data"])
+            except Exception as exc:
+                asyncio.get_running_loop().call_exception_handler({
+                    "message": f"Exception in forwarded update of {self.worker_id!r}",
+                    "exception": exc
+                })
+
+    async def _handle(self, data: bytes) -> None:
+        action, token, payload = self.loads(data)
+
+        if action == "feed":
+            subscription = self._waiters.get(token)
+            if subscription is not None:
+                self._deliver(token, subscription, payload)
+            return
+
+        waiter = self._waiters.pop(token, None)
+        if waiter is None or (isinstance(waiter, asyncio.Future) and waiter.done()):
+            return
+
+        if action == "cancel":
+            waiter.cancel()
+        else:
+            waiter.set_result(payload)
+
+    def _deliver(self, token: int, subscription: Subscription, event: typing.Any) -> None:
+        # a slow subscription gets its own task, so the listener never waits for it.
+        backlog = self._backlogs.get(token)
+        if backlog is not None:
+            backlog.append(event)
+            return
+
+        try:
+            subscription.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self._backlogs[token] = collections.deque([event])
+            task = asyncio.ensure_future(self._drain(token, subscription))
+            self._draining.add(task)
+            task.add_done_callback(self._draining.discard)
+
+    async def _drain(self, token: int, subscription: Subscription) -> None:
+        backlog = self._backlogs[token]
+        try:
+            while backlog and not subscription.closed:
+                await subscription.feed(backlog[0])
+                backlog.popleft()
+        finally:
+            del self._backlogs[token]
+
+    async def _publish(self, owner: str, message: tuple) -> None:
+        await self.cache.publish(self._get_channel(owner), self.dumps(message))
+
+    def _send(self, owner: str, message: tuple) -> None:
+        task = asyncio.ensure_future(self._publish(owner, message))
+        self._publishing.add(task)
+        task.add_done_callback(self._publishing.discard)
+
+    def _forward(self, owner: str, token: int, future: asyncio.Future) -> None:
+        if future.cancelled():
+            self._send(owner, ("cancel", token, None))
+        else:
+            self._send(owner, ("resolve", token, future.result()))
+
+    def _encode(self, value: _MT) -> bytes:
+        if isinstance(value, (asyncio.Future, Subscription)):
+            token = next(self._tokens)
+            self._waiters[token] = value
+            if isinstance(value, asyncio.Future):
+                value.add_done_callback(lambda _: self._waiters.pop(token, None))
+
+            content_types = getattr(value, "content_types", None)
+            return self.encoder.encode({
+                "owner": self.worker_id,
+                "token": token,
+                "stream": isinstance(value, Subscription),
+                "content_types": sorted(content_types) if content_types is not None else None
+            })
+
+        args, kwargs = (), {}
+        if isinstance(value, functools.partial):
+            value, args, kwargs = value.func, value.args, value.keywords
+
+        if value not in self._names:
+            self.register_step(value)
+
+        return self.encoder.encode({"step": self._names[value], "args": args, "kwargs": kwargs})
+
+    def _decode(self, data: bytes, remove: bool = False) -> typing.Optional[_MT]:
+        record = self.decoder.decode(data)
+
+        if "step" in record:
+            step = self.steps.get(record["step"])
+            if step is None:
+                # callers drop the record, otherwise it would block the key.
+                asyncio.get_running_loop().call_exception_handler({
+                    "message": f"Dropped step {record['step']!r}, it isn't registered on worker {self.worker_id!r}"
+                })
+                return None
+            if record["args"] or record["kwargs"]:
+                step = functools.partial(step, *record["args"], **record["kwargs"])
+            return step
+
+        if record["owner"] == self.worker_id:
+            if remove:
+                return self._waiters.pop(record["token"], None)
+            return self._waiters.get(record["token"])
+
+        if record.get("stream"):
+            return _RemoteSubscription(self, record["owner"], record["token"], record.get("content_types"))
+
+        future = _Waiter(content_types=record.get("content_types"))
+        future.add_done_callback(
+            functools.partial(self._forward, record["owner"], record["token"])
+        )
+        return future
+
+    def _decode_all(self, records: typing.List[bytes]) -> typing.List[_MT]:
+        values = []
+        for data in records:
+            value = self._decode(data, remove=True)
+            if value is not None:
+                values.append(value)
+        return values
+
+    def _is_record_of(self, data: bytes, value: _MT) -> bool:
+        if not isinstance(value, (asyncio.Future, Subscription)):
+            return data == self._encode(value)
+
+        record = self.decoder.decode(data)
+        return record.get("owner") == self.worker_id and self._waiters.get(record["token"]) is value
+
+    async def set_item(self, key: int, value: _MT, ttl: typing.Optional[float] = None) -> None:
+        if isinstance(value, (asyncio.Future, Subscription)):
+            if getattr(value, "filter", None) is not None:
+                # other workers would give it updates the filter rejects.
+                raise ValueError("RedisMetaStore can't check 'filter' on other workers, use 'content_types'")
+            await self._ensure_listener()
+
+        redis_key = self._get_key(key)
+        data = self._encode(value)
+
+        async with self.cache.pipeline(transaction=True) as pipe:
+            if self.policy is Policy.REPLACE:
+                pipe.lrange(redis_key, 0, -1)
+                pipe.delete(redis_key)
+            pipe.rpush(redis_key, data)
+            ex = ttl if ttl is not None else self.ex
+            if ex:
+                pipe.expire(redis_key, math.ceil(ex))
+            results = await pipe.execute()
+
+        if self.policy is Policy.REPLACE:
+            for old in self._decode_all(results[0]):
+                if old is not value:
+                    _cancel(old)
+
+    async def pop_item(self, key: int) -> _MT:
+        redis_key = self._get_key(key)
+        while True:
+            data = await self.cache.lpop(redis_key)
+            if data is None:
+                raise KeyError(key)
+
+            value = self._decode(data, remove=True)
+            if value is not None:
+                return value
+
+    async def discard_item(self, key: int, value: _MT) -> None:
+        redis_key = self._get_key(key)
+        for data in await self.cache.lrange(redis_key, 0, -1):
+            if self._is_record_of(data, value):
+                await self.cache.lrem(redis_key, 1, data)
+                if isinstance(value, Subscription):
+                    self._waiters.pop(self.decoder.decode(data)["token"], None)
+                return
+
+    async def pop_first(
+        self,
+        keys: typing.Iterable[int],
+        predicate: typing.Optional[_Predicate] = None
+    ) -> typing.Optional[typing.Union[_MT, typing.List[_MT]]]:
+        for key in keys:
+            redis_key = self._get_key(key)
+            accepted = []
+
+            for data in await self.cache.lrange(redis_key, 0, -1):
+                value = self._decode(data)
+                if value is None:
+                    # waiter of this worker which is already gone, or unknown step.
+                    await self.cache.lrem(redis_key, 1, data)
+                    continue
+                if predicate is not None and not predicate(value):
+                    continue
+
+                # LREM tells whether another worker took the value first.
+                if getattr(value, "persistent", False) or await self.cache.lrem(redis_key, 1, data):
+                    if self.policy is not Policy.BROADCAST:
+                        return value
+                    accepted.append(value)
+
+            if accepted:
+                return accepted
+        return None
+
+    async def pop_many(self, keys: typing.Iterable[int]) -> typing.List[_MT]:
+        async with self.cache.pipeline(transaction=True) as pipe:
+            for key in keys:
+                pipe.lrange(self._get_key(key), 0, -1)
+                pipe.delete(self._get_key(key))
+            results = await pipe.execute()
+
+        return self._decode_all([data for records in results[::2] for data in records])
+
+    async def clear(self) -> typing.AsyncGenerator[_MT, None]:
+        async for redis_key in self.cache.scan_iter(match=self._get_key("*")):
+            async with self.cache.pipeline(transaction=True) as pipe:
+                pipe.lrange(redis_key, 0, -1)
+                pipe.delete(redis_key)
+                records, _ = await pipe.execute()
+
+            for value in self._decode_all(records):
+                yield value
+
+    async def close(self) -> None:
+        """
+        stops listening for forwarded updates.
+        """
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        for task in self._draining:
+            task.cancel()
+        if self._publishing:
+            await asyncio.gather(*self._publishing, return_exceptions=True)
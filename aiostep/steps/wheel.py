@@ -0,0 +1,92 @@
+import asyncio
+import math
+import typing
+
+
+class TimingWheel:
+    """Hashed timing wheel for expiring `wait_for` waiters in coarse buckets.
+
+    Instead of one loop timer per waiter, the wheel keeps a single timer which
+    ticks every `resolution` seconds while there are pending waiters. Waiters
+    are grouped into `slots` buckets, so adding and discarding them is O(1).
+
+    Expired waiters get `TimeoutError`, up to `resolution` seconds late.
+
+    Args:
+        resolution (float): Length of a tick in seconds. Defaults to 1.
+        slots (int): Number of buckets in the wheel. Defaults to 512.
+
+    Example::
+
+        aiostep.change_timing_wheel(aiostep.TimingWheel(resolution=0.5))
+    """
+
+    def __init__(self, resolution: float = 1.0, slots: int = 512) -> None:
+        if resolution <= 0:
+            raise ValueError(f"'resolution' must be positive, got {resolution}")
+        if slots <= 0:
+            raise ValueError(f"'slots' must be positive, got {slots}")
+
+        self.resolution = resolution
+        self.slots = slots
+        self._buckets: typing.List[typing.Dict[asyncio.Future, int]] = [{} for _ in range(slots)]
+        self._cursor = 0
+        self._size = 0
+        self._loop: typing.Optional[asyncio.AbstractEventLoop] = None
+        self._handle: typing.Optional[asyncio.TimerHandle] = None
+        self._next_tick = 0.0
+
+    @property
+    def pending(self) -> int:
+        """
+        number of scheduled waiters.
+        """
+        return self._size
+
+    def add(self, future: asyncio.Future, timeout: float) -> int:
+        """
+        schedules `future` to fail with `TimeoutError` after `timeout` seconds.
+
+        returns the slot of future which should be passed to `discard`.
+        """
+        # the first tick may come at any moment, so one extra tick keeps
+        # waiters from expiring early.
+        ticks = math.ceil(timeout / self.resolution) + 1
+        slot = (self._cursor + ticks) % self.slots
+        self._buckets[slot][future] = (ticks - 1) // self.slots
+        self._size += 1
+
+        if self._handle is None:
+            self._loop = asyncio.get_running_loop()
+            self._next_tick = self._loop.time() + self.resolution
+            self._handle = self._loop.call_at(self._next_tick, self._tick)
+
+        return slot
+
+    def discard(self, future: asyncio.Future, slot: int) -> None:
+        """
+        removes `future` from the wheel if it is still scheduled.
+        """
+        bucket = self._buckets[slot]
+        if future in bucket:
+            del bucket[future]
+            self._size -= 1
+
+    def _tick(self) -> None:
+        self._cursor = (self._cursor + 1) % self.slots
+        bucket = self._buckets[self._cursor]
+
+        expired = [future for future, rounds in bucket.items() if rounds == 0]
+        for future in expired:
+            del bucket[future]
+            if not future.done():
+                future.set_exception(TimeoutError())
+        for future in bucket:
+            bucket[future] -= 1
+        self._size -= len(expired)
+
+        if self._size:
+            self._next_tick += self.resolution
+            self._handle = self._loop.call_at(self._next_tick, self._tick)
+        else:
+            self._handle = None
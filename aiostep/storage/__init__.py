@@ -2,6 +2,9 @@ from .base import BaseStorage, StateContext
 from .memory import MemoryStateStorage
 from .redis import RedisStateStorage
 from .file import FileStateStorage
+from .log import LogFileStateStorage
+from .sqlite import SQLiteStateStorage
+from .sharded import ShardedFileStateStorage, rebalance_shards
 
 
 __all__ = [
@@ -9,5 +12,9 @@ __all__ = [
     'StateContext',
     'MemoryStateStorage',
     'RedisStateStorage',
-    'FileStateStorage'
+    'FileStateStorage',
+    'LogFileStateStorage',
+    'SQLiteStateStorage',
+    'ShardedFileStateStorage',
+    'rebalance_shards'
 ]
@@ -1,23 +1,25 @@
 from abc import ABC, abstractmethod
+from collections.abc import Mapping
 from enum import Enum
-from dataclasses import dataclass
-from typing import Callable, Any, Union, Optional, Dict
+from msgspec import Struct
+from typing import Callable, Any, Union, Optional, Dict, Iterable, List
 
 
-@dataclass
-class StateContext:
+class StateContext(Struct):
     """State context for storing bot states.
 
     This class holds information about the current state of a conversation,
     associated data, callback function and chat ID.
 
+    It is a `msgspec.Struct`, so storages decode it directly from stored bytes.
+
     Attributes:
-        current_state (Enum): Current state of the conversation
-        callback (Callable | None): Callback function or its name
+        current_state (str | None): Name of the current state of the conversation
+        callback (Callable | str | None): Callback function or its name
         chat_id (int | str): ID of the chat
     """
-    current_state: Optional[Enum] = None
-    callback: Optional[Callable[..., Any]] = None
+    current_state: Optional[str] = None
+    callback: Any = None
     chat_id: Optional[Union[int, str]] = None
 
 
@@ -77,3 +79,95 @@ class BaseStorage(ABC):
         use this method to clear and get current data of a key
         """
         raise NotImplementedError
+
+    def get_data_field(self, key: Union[str, int], field: str, default: Optional[Any] = None) -> Any:
+        """
+        use this method to get a single field of current data of a key
+
+        return default if not found
+        """
+        data = self.get_data(key)
+        if not isinstance(data, Mapping):
+            return default
+        return data.get(field, default)
+
+    def delete_data_field(self, key: Union[str, int], field: str, default: Optional[Any] = None) -> Any:
+        """
+        use this method to delete and get a single field of current data of a key
+
+        return default if not found
+        """
+        data = self.get_data(key)
+        if not isinstance(data, Mapping) or field not in data:
+            return default
+
+        # get_data may give a read-only mapping, e.g. memory storages with `copy_on_write`
+        data = dict(data)
+        value = data.pop(field)
+        self.set_data(key, data)
+        return value
+
+    def transition(
+        self,
+        key: Union[str, int],
+        expected: Optional[Union[str, Enum]],
+        new: Union[str, Enum],
+        data_patch: Optional[Dict[Any, Any]] = None
+    ) -> bool:
+        """
+        use this method to set state of a key only if its current state is `expected`
+
+        return True if state was changed
+        """
+        raise NotImplementedError
+
+    def get_states_many(self, keys: Iterable[Union[str, int]], default: Optional[Any] = None) -> List[Any]:
+        """
+        use this method to get current states of many keys
+
+        return states in order of keys, default for not found ones
+        """
+        return [self.get_state(key, default) for key in keys]
+
+    def set_states_many(
+        self,
+        states: Dict[Union[str, int], Union[str, Enum]],
+        callback: Optional[Callable[..., Any]] = None,
+        ex: Optional[float] = None
+    ) -> None:
+        """
+        use this method to set states for many keys, `states` maps keys to states
+        """
+        for key, state in states.items():
+            self.set_state(key, state, callback=callback, ex=ex)
+
+    def delete_states_many(self, keys: Iterable[Union[str, int]], default: Optional[Any] = None) -> List[Any]:
+        """
+        use this method to delete and get current states of many keys
+
+        return states in order of keys, default for not found ones
+        """
+        return [self.delete_state(key, default) for key in keys]
+
+    def get_data_many(self, keys: Iterable[Union[str, int]], default: Optional[Any] = None) -> List[Any]:
+        """
+        use this method to get current data of many keys
+
+        return data in order of keys, default for not found ones
+        """
+        return [self.get_data(key, default) for key in keys]
+
+    def set_data_many(self, data: Dict[Union[str, int], Dict[Any, Any]], ex: Optional[float] = None) -> None:
+        """
+        use this method to set data for many keys, `data` maps keys to their data
+        """
+        for key, key_data in data.items():
+            self.set_data(key, key_data, ex=ex)
+
+    def delete_data_many(self, keys: Iterable[Union[str, int]], default: Optional[Any] = None) -> List[Any]:
+        """
+        use this method to clear and get current data of many keys
+
+        return data in order of keys, default for not found ones
+        """
+        return [self.delete_data(key, default) for key in keys]
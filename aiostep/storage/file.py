@@ -1,10 +1,11 @@
 import os
 import time
+import heapq
+import threading
 from qsave import QuickSave
 
 from enum import Enum
-from typing import Callable, Any, Union, Dict, Optional
-from copy import deepcopy
+from typing import Callable, Any, Union, Dict, Optional, Iterable, List, Tuple
 
 from .base import BaseStorage, StateContext
 
@@ -29,6 +30,15 @@ class FileStateStorage(BaseStorage):
         self.cache = QuickSave(path=path, **kwargs)
         self.ex = ex
 
+        # (expire time, key) of written records, checked by `sweep`
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._expiry_loaded = False
+        self._expiry_lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+        self._sweeper_stopped = threading.Event()
+        self.purged = 0
+        self.sweeps = 0
+
     def _get_key(self, user_id: Union[int, str]) -> str:
         """Generate Cache key for a user.
 
@@ -50,7 +60,104 @@ class FileStateStorage(BaseStorage):
             str: Cache key
         """
         return f"data:{user_id}"
-    
+
+    def _state_context(self, record: Dict[str, Any]) -> StateContext:
+        # records may also have an "expire" key, which isn't a field of StateContext
+        return StateContext(
+            current_state=record.get("current_state"),
+            callback=record.get("callback"),
+            chat_id=record.get("chat_id")
+        )
+
+    def _index_expiry(self, key: str, expire: float) -> None:
+        with self._expiry_lock:
+            heapq.heappush(self._expiry_heap, (expire, key))
+
+    def _sweep_records(self, records: Any, limit: Optional[int]) -> int:
+        if not self._expiry_loaded:
+            # records written before this process started are indexed once.
+            entries = set(self._expiry_heap)
+            entries.update(
+                (record["expire"], key) for key, record in records.items()
+                if isinstance(record, dict) and record.get("expire")
+            )
+            self._expiry_heap = list(entries)
+            heapq.heapify(self._expiry_heap)
+            self._expiry_loaded = True
+
+        now = time.time()
+        checked = removed = 0
+        while self._expiry_heap and self._expiry_heap[0][0] <= now and (limit is None or checked < limit):
+            _, key = heapq.heappop(self._expiry_heap)
+            checked += 1
+
+            # the record may be deleted or written again with a later expire time.
+            if self._is_expired(records.get(key)):
+                records.pop(key)
+                removed += 1
+
+        return removed
+
+    def sweep_stats(self) -> Dict[str, int]:
+        """Give counters of removed expired records.
+
+        Returns:
+            dict[str, int]: `purged` records, number of `sweeps` and `indexed` expire times
+        """
+        return {"purged": self.purged, "sweeps": self.sweeps, "indexed": len(self._expiry_heap)}
+
+    def sweep(self, limit: Optional[int] = None) -> int:
+        """Remove expired states and data.
+
+        Expire times written by this storage are kept in a heap, so only due
+        records are checked. Records of the file are indexed on the first sweep.
+
+        Args:
+            limit (int | None, optional): Maximum number of due records to check.
+                Defaults to None (all of them).
+
+        Returns:
+            int: Number of removed states and data
+        """
+        with self.cache.session(commit_on_expire=False) as session, self._expiry_lock:
+            removed = self._sweep_records(session, limit)
+            if removed:
+                session.commit()
+
+        self.purged += removed
+        self.sweeps += 1
+        return removed
+
+    def start_sweeper(self, interval: float = 60.0, limit: Optional[int] = 1000) -> threading.Thread:
+        """Start a daemon thread which calls `sweep` every `interval` seconds.
+
+        Args:
+            interval (float, optional): Seconds between sweeps. Defaults to 60.
+            limit (int | None, optional): Maximum records checked per sweep. Defaults to 1000.
+
+        Returns:
+            threading.Thread: The sweeper thread, call `stop_sweeper` to stop it
+        """
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return self._sweeper
+
+        stopped = self._sweeper_stopped = threading.Event()
+
+        def sweeper() -> None:
+            while not stopped.wait(interval):
+                self.sweep(limit)
+
+        self._sweeper = threading.Thread(target=sweeper, name="aiostep-sweeper", daemon=True)
+        self._sweeper.start()
+        return self._sweeper
+
+    def stop_sweeper(self) -> None:
+        """Stop the thread started by `start_sweeper`."""
+        if self._sweeper is not None:
+            self._sweeper_stopped.set()
+            self._sweeper.join()
+            self._sweeper = None
+
     def set_state(
         self, 
         user_id: Union[int, str], 
@@ -83,6 +190,7 @@ class FileStateStorage(BaseStorage):
         }
         if ex:
             state_data["expire"] = time.time() + ex
+            self._index_expiry(self._get_key(user_id), state_data["expire"])
         state_key = self._get_key(user_id)
 
         with self.cache.session() as session:
@@ -109,7 +217,7 @@ class FileStateStorage(BaseStorage):
                 session.commit()
                 return default
 
-        return StateContext(**data)
+        return self._state_context(data)
 
     def delete_state(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[StateContext]:
         """Delete the state for a user.
@@ -132,7 +240,7 @@ class FileStateStorage(BaseStorage):
         if data.get("expire") and (data.get("expire") < time.time()):
             return default
 
-        return StateContext(**data)
+        return self._state_context(data)
 
     def set_data(
         self, 
@@ -151,12 +259,13 @@ class FileStateStorage(BaseStorage):
         if not isinstance(data, dict):
             raise ValueError(f"'data' must be a dict, got {type(data)}")
 
-        data = deepcopy(data)
+        data = dict(data)
 
         data_key = self._get_data_key(user_id)
         ex = ex or self.ex
         if ex:
             data["expire"] = time.time() + ex
+            self._index_expiry(self._get_data_key(user_id), data["expire"])
 
         with self.cache.session() as session:
             session[data_key] = data
@@ -207,12 +316,13 @@ class FileStateStorage(BaseStorage):
         if not isinstance(data, dict):
             raise ValueError(f"'data' must be a dict, got {type(data)}")
 
-        data = deepcopy(data)
+        data = dict(data)
 
         data_key = self._get_data_key(user_id)
         ex = ex or self.ex
         if ex:
             data["expire"] = time.time() + ex
+            self._index_expiry(self._get_data_key(user_id), data["expire"])
 
         with self.cache.session() as session:
             current_data = session.get(data_key)
@@ -242,3 +352,238 @@ class FileStateStorage(BaseStorage):
                 return default
 
         return data
+
+    def transition(
+        self,
+        user_id: Union[int, str],
+        expected: Optional[Union[str, Enum]],
+        new: Union[str, Enum],
+        data_patch: Optional[Dict[Any, Any]] = None,
+        ex: Optional[float] = None,
+        *,
+        callback: Optional[Callable[..., Any]] = None,
+        chat_id: Optional[Union[int, str]] = None
+    ) -> bool:
+        """Move a user to a new state only if the user is in the expected state.
+
+        The check and both writes are done in a single session.
+
+        Args:
+            user_id (int | str): ID of the user
+            expected (str | Enum | None): State the user must be in, None means no state
+            new (str | Enum): State to set
+            data_patch (dict[str, Any] | None, optional): Data to merge like `update_data`.
+                Defaults to None.
+            ex (float | None, optional): Expiration time for the state and data.
+                Defaults to None.
+            callback (Callable | None, optional): Callback function. Defaults to None.
+            chat_id (int | str, optional): Chat ID. Defaults to None.
+
+        Returns:
+            bool: True if the state was changed, False if the user wasn't in `expected`
+        """
+        if data_patch is not None and not isinstance(data_patch, dict):
+            raise ValueError(f"'data_patch' must be a dict, got {type(data_patch)}")
+
+        if chat_id is None:
+            chat_id = user_id
+
+        if isinstance(expected, Enum):
+            expected = expected.name
+        if isinstance(new, Enum):
+            new = new.name
+
+        ex = ex or self.ex
+        state_key = self._get_key(user_id)
+        data_key = self._get_data_key(user_id)
+
+        with self.cache.session(commit_on_expire=False) as session:
+            state_data = session.get(state_key)
+            if state_data and state_data.get("expire") and (state_data.get("expire") < time.time()):
+                state_data = None
+
+            current_state = state_data.get("current_state") if state_data else None
+            if current_state != expected:
+                return False
+
+            state_data = {
+                "current_state": new,
+                "chat_id": chat_id,
+                "callback": callback.__name__ if callback else None
+            }
+            if ex:
+                state_data["expire"] = time.time() + ex
+                self._index_expiry(self._get_key(user_id), state_data["expire"])
+            session[state_key] = state_data
+
+            if data_patch:
+                data = dict(data_patch)
+                if ex:
+                    data["expire"] = time.time() + ex
+                    self._index_expiry(self._get_data_key(user_id), data["expire"])
+
+                current_data = session.get(data_key)
+                if current_data:
+                    current_data.update(data)
+                    session[data_key] = current_data
+                else:
+                    session[data_key] = data
+
+            session.commit()
+
+        return True
+
+    def _is_expired(self, record: Any) -> bool:
+        return isinstance(record, dict) and bool(record.get("expire")) and record["expire"] < time.time()
+
+    def _get_many(self, keys: List[str], default: Any) -> List[Any]:
+        records = []
+        expired = False
+        with self.cache.session(commit_on_expire=False) as session:
+            for key in keys:
+                record = session.get(key)
+                if self._is_expired(record):
+                    session.pop(key)
+                    expired = True
+                    record = None
+                records.append(record if record else default)
+
+            if expired:
+                session.commit()
+        return records
+
+    def _delete_many(self, keys: List[str], default: Any) -> List[Any]:
+        records = []
+        with self.cache.session() as session:
+            for key in keys:
+                record = session.pop(key)
+                records.append(record if record and not self._is_expired(record) else default)
+        return records
+
+    def get_states_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[StateContext]]:
+        """Get the state contexts of many users in one session.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without state.
+                Defaults to None.
+
+        Returns:
+            list[StateContext | None]: State contexts in order of `user_ids`
+        """
+        records = self._get_many([self._get_key(user_id) for user_id in user_ids], None)
+        return [self._state_context(record) if record else default for record in records]
+
+    def set_states_many(
+        self,
+        states: Dict[Union[int, str], Union[str, Enum]],
+        callback: Optional[Callable[..., Any]] = None,
+        ex: Optional[float] = None
+    ) -> None:
+        """Set states of many users in one session.
+
+        Args:
+            states (dict[int | str, str | Enum]): States mapped by user IDs
+            callback (Callable | None, optional): Callback function for all users.
+                Defaults to None.
+            ex (float | None, optional): Expiration time of the states.
+                Defaults to None.
+        """
+        callback_name = callback.__name__ if callback else None
+        ex = ex or self.ex
+
+        with self.cache.session() as session:
+            for user_id, state in states.items():
+                state_data = {
+                    "current_state": state.name if isinstance(state, Enum) else state,
+                    "chat_id": user_id,
+                    "callback": callback_name
+                }
+                if ex:
+                    state_data["expire"] = time.time() + ex
+                    self._index_expiry(self._get_key(user_id), state_data["expire"])
+                session[self._get_key(user_id)] = state_data
+
+    def delete_states_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[StateContext]]:
+        """Delete and get the states of many users in one session.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without state.
+                Defaults to None.
+
+        Returns:
+            list[StateContext | None]: Deleted state contexts in order of `user_ids`
+        """
+        records = self._delete_many([self._get_key(user_id) for user_id in user_ids], None)
+        return [self._state_context(record) if record else default for record in records]
+
+    def get_data_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[Dict[Any, Any]]]:
+        """Get data of many users in one session.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without data.
+                Defaults to None.
+
+        Returns:
+            list[dict[str, Any] | None]: Data in order of `user_ids`
+        """
+        return self._get_many([self._get_data_key(user_id) for user_id in user_ids], default)
+
+    def set_data_many(
+        self,
+        data: Dict[Union[int, str], Dict[Any, Any]],
+        ex: Optional[float] = None
+    ) -> None:
+        """Set data of many users in one session.
+
+        This method completely replaces any existing data of the users.
+
+        Args:
+            data (dict[int | str, dict[str, Any]]): Data mapped by user IDs
+            ex (float | None, optional): Expiration time of the data.
+                Defaults to None.
+        """
+        for user_data in data.values():
+            if not isinstance(user_data, dict):
+                raise ValueError(f"'data' values must be dicts, got {type(user_data)}")
+
+        ex = ex or self.ex
+
+        with self.cache.session() as session:
+            for user_id, user_data in data.items():
+                user_data = dict(user_data)
+                if ex:
+                    user_data["expire"] = time.time() + ex
+                    self._index_expiry(self._get_data_key(user_id), user_data["expire"])
+                session[self._get_data_key(user_id)] = user_data
+
+    def delete_data_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[Dict[Any, Any]]]:
+        """Clear and get data of many users in one session.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without data.
+                Defaults to None.
+
+        Returns:
+            list[dict[str, Any] | None]: Deleted data in order of `user_ids`
+        """
+        return self._delete_many([self._get_data_key(user_id) for user_id in user_ids], default)
@@ -0,0 +1,385 @@
+import os
+import time
+import threading
+
+import msgspec
+from enum import Enum
+from typing import Callable, Any, Union, Dict, Optional, Iterable, Tuple
+
+from .base import BaseStorage, StateContext
+
+_STATE, _DATA = "s", "d"
+_SET, _UPDATE, _DELETE = "set", "update", "delete"
+
+# operation, kind, user id, value, expire time
+_Record = Tuple[str, str, Union[int, str], msgspec.Raw, Optional[float]]
+
+
+def _write_log(
+    path: str,
+    entries: Iterable[Tuple[Tuple[str, Union[int, str]], Tuple[bytes, Optional[float]]]]
+) -> None:
+    """Write `((kind, user_id), (value, expire))` entries as a new synced log."""
+    encoder = msgspec.json.Encoder()
+    with open(path, "wb") as file:
+        for (kind, user_id), (value, expire) in entries:
+            file.write(encoder.encode((_SET, kind, user_id, msgspec.Raw(value), expire)) + b"\n")
+        file.flush()
+        os.fsync(file.fileno())
+
+
+class LogFileStateStorage(BaseStorage):
+    """Append-only file storage implementation for managing bot states.
+
+    Unlike `FileStateStorage`, which rewrites the whole file on every change,
+    this storage appends one JSON line per change, so a write costs the size
+    of the change. All states and data are kept in memory and loaded from the
+    log on start.
+
+    When the log holds `compact_ratio` times more records than live keys, it is
+    compacted: live keys are written to a new file which replaces the log.
+    A partly written last line, e.g. after a crash, is dropped on start; any
+    other line which can't be decoded raises `ValueError` and the log is left as is.
+
+    Args:
+        path (str | os.PathLike): Path to the log file.
+        ex (float | None): Expiration time for states and data.
+        fsync (bool): Call `os.fsync` after every write. By default writes are
+            only flushed to the OS, which survives a crash of the bot but not of the machine.
+        compact_ratio (float): Records per live key which trigger compaction.
+        compact_min (int): Minimum number of records before compaction.
+        auto_compact (bool): Compact during writes when needed. If False, call `compact`.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, os.PathLike],
+        ex: Optional[float] = None,
+        fsync: bool = False,
+        compact_ratio: float = 2.0,
+        compact_min: int = 1000,
+        auto_compact: bool = True
+    ) -> None:
+        """Initialize the log storage and load the log.
+
+        Args:
+            path (str | os.PathLike): File path to store states and data persistently.
+            ex (float | None, optional): Expiration time for states and data. Defaults to None.
+            fsync (bool, optional): Sync the file to disk on every write. Defaults to False.
+            compact_ratio (float, optional): Records per live key which trigger compaction.
+                Defaults to 2.
+            compact_min (int, optional): Minimum number of records before compaction.
+                Defaults to 1000.
+            auto_compact (bool, optional): Compact during writes when needed. Defaults to True.
+        """
+        self.path = os.fspath(path)
+        self.ex = ex
+        self.fsync = fsync
+        self.compact_ratio = compact_ratio
+        self.compact_min = compact_min
+        self.auto_compact = auto_compact
+
+        self.encoder = msgspec.json.Encoder()
+        self.decoder = msgspec.json.Decoder()
+        self.state_decoder = msgspec.json.Decoder(StateContext)
+        self.record_decoder = msgspec.json.Decoder(_Record)
+
+        self._lock = threading.RLock()
+        # (kind, user_id) -> (encoded value, expire time)
+        self._index: Dict[Tuple[str, Union[int, str]], Tuple[bytes, Optional[float]]] = {}
+        self._records = 0
+        self._file = None
+        self._load()
+
+    def _load(self) -> None:
+        valid = 0
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as file:
+                for number, line in enumerate(file, 1):
+                    if not line.endswith(b"\n"):
+                        # only the last line can be partly written
+                        break
+                    try:
+                        record = self.record_decoder.decode(line)
+                    except msgspec.DecodeError as exc:
+                        raise ValueError(f"corrupt record on line {number} of {self.path!r}: {exc}") from exc
+
+                    self._apply(*record)
+                    self._records += 1
+                    valid += len(line)
+
+            if valid != os.path.getsize(self.path):
+                with open(self.path, "r+b") as file:
+                    file.truncate(valid)
+
+        self._file = open(self.path, "ab")
+
+    def _apply(
+        self,
+        operation: str,
+        kind: str,
+        user_id: Union[int, str],
+        value: Union[bytes, msgspec.Raw],
+        expire: Optional[float]
+    ) -> None:
+        key = (kind, user_id)
+
+        if operation == _DELETE:
+            self._index.pop(key, None)
+            return
+
+        # updates are only logged while there is a live value to merge into
+        current = self._index.get(key) if operation == _UPDATE else None
+        if current is not None:
+            data = self.decoder.decode(current[0])
+            data.update(self.decoder.decode(value))
+            self._index[key] = (self.encoder.encode(data), expire if expire is not None else current[1])
+        else:
+            self._index[key] = (bytes(value), expire)
+
+    def _is_expired(self, entry: Tuple[bytes, Optional[float]]) -> bool:
+        return entry[1] is not None and entry[1] < time.time()
+
+    def _get(self, kind: str, user_id: Union[int, str]) -> Optional[bytes]:
+        # reads don't take the lock, so they leave expired entries to compaction.
+        entry = self._index.get((kind, user_id))
+        if entry is None or self._is_expired(entry):
+            return None
+        return entry[0]
+
+    def _write(
+        self,
+        operation: str,
+        kind: str,
+        user_id: Union[int, str],
+        value: bytes = b"null",
+        ex: Optional[float] = None
+    ) -> None:
+        expire = time.time() + ex if ex else None
+
+        with self._lock:
+            if operation == _UPDATE and self._get(kind, user_id) is None:
+                # replay must not depend on whether the old value has expired by then
+                operation = _SET
+
+            line = self.encoder.encode((operation, kind, user_id, msgspec.Raw(value), expire)) + b"\n"
+            self._file.write(line)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+
+            self._apply(operation, kind, user_id, value, expire)
+            self._records += 1
+
+            if self.auto_compact and self.needs_compaction:
+                self.compact()
+
+    @property
+    def needs_compaction(self) -> bool:
+        """
+        whether the log holds enough overwritten records to be compacted.
+        """
+        return self._records >= self.compact_min and self._records > self.compact_ratio * len(self._index)
+
+    def compact(self) -> None:
+        """Rewrite the log with only live states and data.
+
+        The new log is written next to the old one and replaces it atomically.
+        """
+        with self._lock:
+            now = time.time()
+            live = {
+                key: entry for key, entry in list(self._index.items())
+                if entry[1] is None or entry[1] >= now
+            }
+
+            compact_path = f"{self.path}.compact"
+            _write_log(compact_path, live.items())
+
+            self._file.close()
+            os.replace(compact_path, self.path)
+            self._file = open(self.path, "ab")
+            self._index = live
+            self._records = len(live)
+
+    def close(self) -> None:
+        """Close the log file."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def set_state(
+        self,
+        user_id: Union[int, str],
+        state: Union[str, Enum],
+        callback: Optional[Callable[..., Any]] = None,
+        chat_id: Optional[Union[int, str]] = None,
+        ex: Optional[float] = None
+    ) -> None:
+        """Set the state for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            state (str | Enum): State to set
+            callback (Callable | None, optional): Callback function. Defaults to None.
+            chat_id (int | str, optional): Chat ID. Defaults to None.
+            ex (float | None, optional): Expiration time in seconds. Defaults to None.
+        """
+        if chat_id is None:
+            chat_id = user_id
+
+        if isinstance(state, Enum):
+            state = state.name
+
+        state_context = StateContext(
+            current_state=state,
+            callback=callback.__name__ if callback else None,
+            chat_id=chat_id
+        )
+        self._write(_SET, _STATE, user_id, self.encoder.encode(state_context), ex or self.ex)
+
+    def get_state(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[StateContext]:
+        """Get the state context for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            default (Any, optional): Default value if state doesn't exist.
+                Defaults to None.
+
+        Returns:
+            StateContext | None: The state context or default value
+        """
+        value = self._get(_STATE, user_id)
+        return self.state_decoder.decode(value) if value is not None else default
+
+    def delete_state(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[StateContext]:
+        """Delete the state for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            default (Any, optional): Default value if state doesn't exist.
+                Defaults to None.
+
+        Returns:
+            StateContext | None: The deleted state context or default value
+        """
+        with self._lock:
+            value = self._get(_STATE, user_id)
+            if value is None:
+                return default
+
+            self._write(_DELETE, _STATE, user_id)
+            return self.state_decoder.decode(value)
+
+    def set_data(self, user_id: Union[int, str], data: Dict[Any, Any], ex: Optional[float] = None) -> None:
+        """Set data for a user.
+
+        This method completely replaces any existing data.
+
+        Args:
+            user_id (int | str): ID of the user
+            data (dict[str, Any]): Data to store
+            ex (float | None, optional): Expiration time in seconds. Defaults to None.
+        """
+        if not isinstance(data, dict):
+            raise ValueError(f"'data' must be a dict, got {type(data)}")
+
+        self._write(_SET, _DATA, user_id, self.encoder.encode(data), ex or self.ex)
+
+    def get_data(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[Dict[Any, Any]]:
+        """Get data for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            default (Any, optional): Default value if data doesn't exist.
+                Defaults to None.
+
+        Returns:
+            dict[str, Any] | None: The stored data or None if not found
+        """
+        value = self._get(_DATA, user_id)
+        return self.decoder.decode(value) if value is not None else default
+
+    def update_data(self, user_id: Union[int, str], data: Dict[Any, Any], ex: Optional[float] = None) -> None:
+        """Update data for a user.
+
+        Only the given keys are written to the log.
+
+        Args:
+            user_id (int | str): ID of the user
+            data (dict[str, Any]): Data to update
+            ex (float | None, optional): New expiration time in seconds. Defaults to None.
+
+        Example:
+            >>> # Existing data: {"name": "John"}
+            >>> storage.update_data(user_id, {"age": 25})
+            >>> # Result: {"name": "John", "age": 25}
+        """
+        if not isinstance(data, dict):
+            raise ValueError(f"'data' must be a dict, got {type(data)}")
+
+        self._write(_UPDATE, _DATA, user_id, self.encoder.encode(data), ex or self.ex)
+
+    def delete_data(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[Dict[Any, Any]]:
+        """Clear and get all data for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            default (Any, optional): Default value if data doesn't exist.
+                Defaults to None.
+
+        Returns:
+            Dict | None: The deleted data or default value
+        """
+        with self._lock:
+            value = self._get(_DATA, user_id)
+            if value is None:
+                return default
+
+            self._write(_DELETE, _DATA, user_id)
+            return self.decoder.decode(value)
+
+    def transition(
+        self,
+        user_id: Union[int, str],
+        expected: Optional[Union[str, Enum]],
+        new: Union[str, Enum],
+        data_patch: Optional[Dict[Any, Any]] = None,
+        ex: Optional[float] = None,
+        *,
+        callback: Optional[Callable[..., Any]] = None,
+        chat_id: Optional[Union[int, str]] = None
+    ) -> bool:
+        """Move a user to a new state only if the user is in the expected state.
+
+        Args:
+            user_id (int | str): ID of the user
+            expected (str | Enum | None): State the user must be in, None means no state
+            new (str | Enum): State to set
+            data_patch (dict[str, Any] | None, optional): Data to merge like `update_data`.
+                Defaults to None.
+            ex (float | None, optional): Expiration time for the state and data.
+                Defaults to None.
+            callback (Callable | None, optional): Callback function. Defaults to None.
+            chat_id (int | str, optional): Chat ID. Defaults to None.
+
+        Returns:
+            bool: True if the state was changed, False if the user wasn't in `expected`
+        """
+        if data_patch is not None and not isinstance(data_patch, dict):
+            raise ValueError(f"'data_patch' must be a dict, got {type(data_patch)}")
+
+        if isinstance(expected, Enum):
+            expected = expected.name
+
+        with self._lock:
+            state_context = self.get_state(user_id)
+            current_state = state_context.current_state if state_context is not None else None
+            if current_state != expected:
+                return False
+
+            self.set_state(user_id, new, callback=callback, chat_id=chat_id, ex=ex)
+            if data_patch:
+                self.update_data(user_id, data_patch, ex=ex)
+            return True
@@ -1,10 +1,17 @@
+import heapq
+import itertools
+import sys
+import time
 from enum import Enum
 from typing import Callable, Any, Union, Optional, Dict
 from copy import deepcopy
+from types import MappingProxyType
 from cachebox import BaseCacheImpl, Cache
 
 from .base import BaseStorage, StateContext
 
+_STATE, _DATA = 0, 1
+
 
 class MemoryStateStorage(BaseStorage):
     """In-memory storage implementation for managing bot states.
@@ -13,47 +20,133 @@ class MemoryStateStorage(BaseStorage):
     and their associated data. Suitable for development or small applications
     where persistence isn't required.
 
+    States and data are kept in two maps keyed by user ID.
+
     Args:
-        cache (dict | None): Optional dictionary to use as storage. If None,
+        cache (dict | None): Optional dictionary to use as storage of states. If None,
             an empty dictionary will be used.
+        data_cache (dict | None): Optional dictionary to use as storage of data.
+            If None, an empty copy of `cache` will be used.
+        thread_safe (bool): Use thread-safe `cachebox.Cache` when no cache is given.
+            Plain dicts are faster if the storage is used only from one thread.
+        copy_on_write (bool): Don't deepcopy data. Stored dicts are never changed,
+            `get_data` returns a read-only view of them and `update_data` stores a
+            new dict sharing unchanged values. Values inside data must not be
+            mutated in place.
+        ex (float | None): Expiration time in seconds for states and data.
+        sliding (bool): Restart expiration time of a key when it is read.
+
+    Expired keys are removed when they are read and, a few at a time, on writes.
+    Call `sweep` to remove all of them.
     """
 
-    def __init__(self, cache: Optional[Union[BaseCacheImpl, dict]] = None) -> None:
+    # expired entries checked on every write which sets an expiration time
+    sweep_batch = 16
+
+    def __init__(
+        self,
+        cache: Optional[Union[BaseCacheImpl, dict]] = None,
+        data_cache: Optional[Union[BaseCacheImpl, dict]] = None,
+        thread_safe: bool = True,
+        copy_on_write: bool = False,
+        ex: Optional[float] = None,
+        sliding: bool = False
+    ) -> None:
         """Initialize the memory storage.
 
         Args:
-            cache (dict | None, optional): Initial cache dictionary. Defaults to None.
+            cache (dict | None, optional): Initial cache dictionary of states. Defaults to None.
+            data_cache (dict | None, optional): Initial cache dictionary of data. Defaults to None.
+            thread_safe (bool, optional): Use `cachebox.Cache` instead of dict. Defaults to True.
+            copy_on_write (bool, optional): Share data instead of copying it. Defaults to False.
+            ex (float | None, optional): Expiration time of states and data. Defaults to None.
+            sliding (bool, optional): Extend expiration on access. Defaults to False.
         """
-        self.cache = cache if cache is not None else Cache(0)
-
-    def _get_key(self, user_id: Union[int, str]) -> str:
-        """Generate Cache key for a user.
+        if cache is None:
+            cache = Cache(0) if thread_safe else {}
+        if data_cache is None:
+            # same type and limits as cache, e.g. TTLCache gives data the same expiry.
+            data_cache = cache.copy()
+            data_cache.clear()
+
+        self.cache = cache
+        self.data_cache = data_cache
+        self.copy_on_write = copy_on_write
+        self.ex = ex
+        self.sliding = sliding
+        self._maps = (cache, data_cache)
+        # (kind, user_id) -> [deadline, ttl, sequence], heap entries of older sequences are stale.
+        self._expires: Dict[tuple, list] = {}
+        self._heap: list = []
+        self._sequence = itertools.count()
+
+    def _set_expiry(self, kind: int, user_id: Union[int, str], ex: Optional[float]) -> None:
+        key = (kind, user_id)
+        if ex:
+            sequence = next(self._sequence)
+            deadline = time.monotonic() + ex
+            self._expires[key] = [deadline, ex, sequence]
+            heapq.heappush(self._heap, (deadline, sequence, key))
+        elif self._expires:
+            self._expires.pop(key, None)
+
+        if self._heap:
+            self.sweep(self.sweep_batch)
+
+    def _is_expired(self, kind: int, user_id: Union[int, str]) -> bool:
+        expiry = self._expires.get((kind, user_id))
+        if expiry is None:
+            return False
+
+        now = time.monotonic()
+        if expiry[0] <= now:
+            del self._expires[(kind, user_id)]
+            self._maps[kind].pop(user_id, None)
+            return True
+
+        if self.sliding:
+            expiry[0] = now + expiry[1]
+        return False
+
+    def sweep(self, limit: Optional[int] = None) -> int:
+        """Remove expired states and data.
 
         Args:
-            user_id (int | str): ID of the user
+            limit (int | None, optional): Maximum number of expired entries to check.
+                Defaults to None (all of them).
 
         Returns:
-            str: Cache key
+            int: Number of removed states and data
         """
-        return f"state:{user_id}"
+        now = time.monotonic()
+        checked = removed = 0
 
-    def _get_data_key(self, user_id: Union[int, str]) -> str:
-        """Generate Cache key for a user.
+        while self._heap and self._heap[0][0] <= now and (limit is None or checked < limit):
+            _, sequence, key = heapq.heappop(self._heap)
+            checked += 1
 
-        Args:
-            user_id (int | str): ID of the user
+            expiry = self._expires.get(key)
+            if expiry is None or expiry[2] != sequence:
+                continue
+            if expiry[0] > now:
+                # extended by a sliding read, wait for the new deadline.
+                heapq.heappush(self._heap, (expiry[0], sequence, key))
+                continue
+
+            del self._expires[key]
+            self._maps[key[0]].pop(key[1], None)
+            removed += 1
+
+        return removed
 
-        Returns:
-            str: Cache key
-        """
-        return f"data:{user_id}"
     
     def set_state(
         self,
         user_id: Union[int, str],
         state: Union[str, Enum],
         callback: Optional[Callable[..., Any]] = None,
-        chat_id: Optional[Union[int, str]] = None
+        chat_id: Optional[Union[int, str]] = None,
+        ex: Optional[float] = None
     ) -> None:
         """Set the state for a user.
 
@@ -62,6 +155,7 @@ class MemoryStateStorage(BaseStorage):
             state (str | Enum): State to set
             callback (Callable | None, optional): Callback function. Defaults to None.
             chat_id (int | str, optional): Chat ID. Defaults to None.
+            ex (float | None, optional): Expiration time in seconds. Defaults to None.
         """
         if chat_id is None:
             chat_id = user_id
@@ -69,13 +163,16 @@ class MemoryStateStorage(BaseStorage):
         if isinstance(state, Enum):
             state = state.name
 
-        state_key = self._get_key(user_id)
+        # few distinct state names are shared by all users, keep one copy of each.
+        if type(state) is str:
+            state = sys.intern(state)
 
-        self.cache[state_key] = StateContext(
+        self.cache[user_id] = StateContext(
             current_state=state,
             callback=callback,
             chat_id=chat_id
         )
+        self._set_expiry(_STATE, user_id, ex or self.ex)
 
     def get_state(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[StateContext]:
         """Get the state context for a user.
@@ -88,8 +185,9 @@ class MemoryStateStorage(BaseStorage):
         Returns:
             StateContext | None: The state context or default value
         """
-        state_key = self._get_key(user_id)
-        return self.cache.get(state_key, default)
+        if self._expires and self._is_expired(_STATE, user_id):
+            return default
+        return self.cache.get(user_id, default)
 
     def delete_state(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[StateContext]:
         """Delete the state for a user.
@@ -102,10 +200,13 @@ class MemoryStateStorage(BaseStorage):
         Returns:
             StateContext | None: The deleted state context or default value
         """
-        state_key = self._get_key(user_id)
-        return self.cache.pop(state_key, default)
+        if self._expires:
+            if self._is_expired(_STATE, user_id):
+                return default
+            self._expires.pop((_STATE, user_id), None)
+        return self.cache.pop(user_id, default)
 
-    def set_data(self, user_id: Union[int, str], data: Dict[Any, Any]) -> None:
+    def set_data(self, user_id: Union[int, str], data: Dict[Any, Any], ex: Optional[float] = None) -> None:
         """Set data for a user.
 
         This method completely replaces any existing data.
@@ -113,13 +214,13 @@ class MemoryStateStorage(BaseStorage):
         Args:
             user_id (int | str): ID of the user
             data (dict[str, Any]): Data to store
+            ex (float | None, optional): Expiration time in seconds. Defaults to None.
         """
         if not isinstance(data, dict):
             raise ValueError(f"'data' must be a dict, got {type(data)}")
 
-        data_key = self._get_data_key(user_id)
-
-        self.cache[data_key] = deepcopy(data)
+        self.data_cache[user_id] = dict(data) if self.copy_on_write else deepcopy(data)
+        self._set_expiry(_DATA, user_id, ex or self.ex)
 
     def get_data(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[Dict[Any, Any]]:
         """Get data for a user.
@@ -130,14 +231,19 @@ class MemoryStateStorage(BaseStorage):
                 Defaults to None.
 
         Returns:
-            dict[str, Any] | None: The stored data or None if not found
+            dict[str, Any] | None: The stored data or None if not found. A read-only
+                mapping if `copy_on_write` is enabled; it's shallow, so values inside
+                it are the stored ones and must not be changed.
         """
-        data_key = self._get_data_key(user_id)
+        if self._expires and self._is_expired(_DATA, user_id):
+            return default
 
-        data_context = self.cache.get(data_key)
-        return deepcopy(data_context) if data_context else default
+        data_context = self.data_cache.get(user_id)
+        if not data_context:
+            return default
+        return MappingProxyType(data_context) if self.copy_on_write else deepcopy(data_context)
 
-    def update_data(self, user_id: Union[int, str], data: Dict[Any, Any]) -> None:
+    def update_data(self, user_id: Union[int, str], data: Dict[Any, Any], ex: Optional[float] = None) -> None:
         """Update data for a user.
 
         This method updates existing data with new values, similar to dict.update().
@@ -146,6 +252,7 @@ class MemoryStateStorage(BaseStorage):
         Args:
             user_id (int | str): ID of the user
             data (dict[str, Any]): Data to update
+            ex (float | None, optional): New expiration time in seconds. Defaults to None.
         
         Example:
             >>> # Existing data: {"name": "John"}
@@ -155,14 +262,22 @@ class MemoryStateStorage(BaseStorage):
         if not isinstance(data, dict):
             raise ValueError(f"'data' must be a dict, got {type(data)}")
 
-        data_key = self._get_data_key(user_id)
+        if self._expires:
+            self._is_expired(_DATA, user_id)
 
-        data_context: dict = self.cache.get(data_key)
-        if data_context is None:
-            self.cache[data_key] = deepcopy(data)
+        data_context: dict = self.data_cache.get(user_id)
+        if self.copy_on_write:
+            # readers may still hold the old dict, so it is replaced instead of updated.
+            self.data_cache[user_id] = {**data_context, **data} if data_context else dict(data)
+        elif data_context is None:
+            self.data_cache[user_id] = deepcopy(data)
         else:
             data_context.update(deepcopy(data))
 
+        ex = ex or self.ex
+        if ex or data_context is None:
+            self._set_expiry(_DATA, user_id, ex)
+
     def delete_data(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[Dict[Any, Any]]:
         """Clear and get all data for a user.
 
@@ -174,5 +289,55 @@ class MemoryStateStorage(BaseStorage):
         Returns:
             Dict | None: The deleted data or default value
         """
-        data_key = self._get_data_key(user_id)
-        return self.cache.pop(data_key, default)
+        if self._expires:
+            if self._is_expired(_DATA, user_id):
+                return default
+            self._expires.pop((_DATA, user_id), None)
+
+        data = self.data_cache.pop(user_id, default)
+        if self.copy_on_write and isinstance(data, dict):
+            return MappingProxyType(data)
+        return data
+
+    def transition(
+        self,
+        user_id: Union[int, str],
+        expected: Optional[Union[str, Enum]],
+        new: Union[str, Enum],
+        data_patch: Optional[Dict[Any, Any]] = None,
+        ex: Optional[float] = None,
+        *,
+        callback: Optional[Callable[..., Any]] = None,
+        chat_id: Optional[Union[int, str]] = None
+    ) -> bool:
+        """Move a user to a new state only if the user is in the expected state.
+
+        Args:
+            user_id (int | str): ID of the user
+            expected (str | Enum | None): State the user must be in, None means no state
+            new (str | Enum): State to set
+            data_patch (dict[str, Any] | None, optional): Data to merge like `update_data`.
+                Defaults to None.
+            ex (float | None, optional): Expiration time for the state and data.
+                Defaults to None.
+            callback (Callable | None, optional): Callback function. Defaults to None.
+            chat_id (int | str, optional): Chat ID. Defaults to None.
+
+        Returns:
+            bool: True if the state was changed, False if the user wasn't in `expected`
+        """
+        if data_patch is not None and not isinstance(data_patch, dict):
+            raise ValueError(f"'data_patch' must be a dict, got {type(data_patch)}")
+
+        if isinstance(expected, Enum):
+            expected = expected.name
+
+        state_context = self.get_state(user_id)
+        current_state = state_context.current_state if state_context is not None else None
+        if current_state != expected:
+            return False
+
+        self.set_state(user_id, new, callback=callback, chat_id=chat_id, ex=ex)
+        if data_patch:
+            self.update_data(user_id, data_patch, ex=ex)
+        return True
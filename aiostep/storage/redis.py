@@ -1,11 +1,16 @@
-from msgspec import DecodeError
-from msgspec.json import Encoder, Decoder
-from copy import deepcopy
+import time
+import uuid
+from cachebox import BaseCacheImpl
+import msgspec
+from msgspec import DecodeError, ValidationError
+from datetime import timedelta
 from enum import Enum
-from typing import Callable, Union, Any, Dict, Optional
+from itertools import chain
+from typing import Callable, Union, Any, Dict, Optional, Iterable, Iterator, List, Tuple
 
 try:
     from redis import Redis
+    from redis.cluster import RedisCluster
     from redis.typing import ExpiryT
     redis_installed = True
 except ImportError:
@@ -15,6 +20,58 @@ from typing import Any, Callable
 
 from .base import BaseStorage, StateContext
 
+# marks keys which are not in the local cache
+_NOT_CACHED = object()
+
+
+# KEYS: state key, data key
+# ARGV: codec, has expected, expected state, new state record, ttl in ms, data mode, data...
+_TRANSITION_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+local state = nil
+if current then
+    local record
+    if ARGV[1] == 'msgpack' then
+        record = cmsgpack.unpack(current)
+    else
+        record = cjson.decode(current)
+    end
+    state = record['current_state']
+    if state == cjson.null then state = nil end
+end
+if ARGV[2] == '1' then
+    if state ~= ARGV[3] then return 0 end
+elseif state ~= nil then
+    return 0
+end
+
+local mode = ARGV[6]
+if mode == 'value' and (redis.call('GET', KEYS[2]) or '') ~= ARGV[7] then
+    return -1
+end
+
+local ttl = tonumber(ARGV[5])
+if ttl > 0 then
+    redis.call('SET', KEYS[1], ARGV[4], 'PX', ttl)
+else
+    redis.call('SET', KEYS[1], ARGV[4])
+end
+
+if mode == 'value' then
+    if ttl > 0 then
+        redis.call('SET', KEYS[2], ARGV[8], 'PX', ttl)
+    else
+        redis.call('SET', KEYS[2], ARGV[8])
+    end
+elseif mode == 'hash' then
+    redis.call('HSET', KEYS[2], unpack(ARGV, 7))
+end
+if mode ~= 'value' and ttl > 0 then
+    redis.call('PEXPIRE', KEYS[2], ttl)
+end
+return 1
+"""
+
 
 class RedisStateStorage(BaseStorage):
     """Redis-based storage implementation for managing bot states.
@@ -29,15 +86,44 @@ class RedisStateStorage(BaseStorage):
     Args:
         cache (Redis): Redis client instance
         ex (ExpiryT | None): Optional expiration time for all keys
+        hash_data (bool): Store data as a redis hash instead of a JSON string,
+            so updates and single field reads don't touch other fields.
+            Existing JSON data isn't converted.
+        batch_size (int): Maximum number of users in one pipeline of bulk methods
+        local_cache (BaseCacheImpl | None): Optional in-process cache (e.g.
+            `cachebox.TTLCache(10000, 5)`) in front of redis. Writes go through it
+            and are published to `invalidation_channel`, so other workers drop
+            their copies. Entries hold encoded values and expire with their
+            redis keys, so any cache (e.g. `LRUCache`) can be used.
+        invalidation_channel (str): Pub/sub channel for local cache invalidation
+        prefix (str | None): Namespace of the keys. When set, keys look like
+            `{prefix}:{{user_id}}:state` and `{prefix}:{{user_id}}:data`, so state and
+            data of a user are in the same cluster slot. Without it the old
+            `state:{user_id}` and `data:{user_id}` keys are used.
+
+        codec (str): "json" or "msgpack" (smaller and faster, but not readable
+            in redis-cli). Values written with another codec can't be read.
+        data_type (Any): Type of users' data for `msgspec` to decode into and
+            validate, e.g. a `TypedDict`. Defaults to any dict.
+
+    A `RedisCluster` client can be passed as `redis`; use it with `prefix`,
+    since `transition` needs both keys of a user in one slot.
     """
     def __init__(
         self,
-        redis: Optional["Redis"] = None,
+        redis: Optional[Union["Redis", "RedisCluster"]] = None,
         host: Optional[str] = "localhost",
         port: Optional[int] = 6379,
         db: Optional[int] = 0,
         password: Optional[str] = None,
         ex: Optional["ExpiryT"] = None,
+        hash_data: bool = False,
+        batch_size: int = 1000,
+        local_cache: Optional[BaseCacheImpl] = None,
+        invalidation_channel: str = "aiostep:invalidate",
+        prefix: Optional[str] = None,
+        codec: str = "json",
+        data_type: Any = Any,
         **kwargs
     ) -> None:
         """Initialize the Redis storage.
@@ -46,6 +132,20 @@ class RedisStateStorage(BaseStorage):
             cache (Redis): Redis client instance
             ex (ExpiryT | None, optional): Expiration time for all keys. 
                 Defaults to None.
+            hash_data (bool, optional): Store data as a redis hash, one field per key.
+                Defaults to False.
+            batch_size (int, optional): Maximum number of users in one pipeline
+                of bulk methods. Defaults to 1000.
+            local_cache (BaseCacheImpl | None, optional): In-process cache for
+                states and data. Defaults to None.
+            invalidation_channel (str, optional): Pub/sub channel used to invalidate
+                local caches of other workers. Defaults to "aiostep:invalidate".
+            prefix (str | None, optional): Namespace of the keys, enables hash-tagged
+                `{prefix}:{{user_id}}:state` keys. Defaults to None.
+            codec (str, optional): Serializer of stored values, "json" or "msgpack".
+                Defaults to "json".
+            data_type (Any, optional): Type used to decode and validate data.
+                Defaults to Any.
         """
         if not redis_installed:
             raise ImportError(
@@ -64,8 +164,34 @@ class RedisStateStorage(BaseStorage):
             )
         self.cache = redis
         self.ex = ex
-        self.encoder = Encoder()
-        self.decoder = Decoder()
+        if codec not in ("json", "msgpack"):
+            raise ValueError(f"'codec' must be 'json' or 'msgpack', got {codec!r}")
+
+        codec_module = msgspec.msgpack if codec == "msgpack" else msgspec.json
+        self.codec = codec
+        self.data_type = data_type
+        self.encoder = codec_module.Encoder()
+        self.decoder = codec_module.Decoder()
+        self.state_decoder = codec_module.Decoder(StateContext)
+        self.data_decoder = codec_module.Decoder(data_type)
+        self.hash_data = hash_data
+        self.batch_size = batch_size
+        self.prefix = prefix
+        self.cluster = isinstance(redis, RedisCluster)
+        self._transition_script = self.cache.register_script(_TRANSITION_SCRIPT)
+        self.local_cache = local_cache
+        self.invalidation_channel = invalidation_channel
+        self.worker_id = uuid.uuid4().hex
+        self.local_hits = 0
+        self.local_misses = 0
+        self._generation = 0
+        self._pubsub = None
+        self._listener = None
+
+        if local_cache is not None:
+            self._pubsub = self.cache.pubsub(ignore_subscribe_messages=True)
+            self._pubsub.subscribe(**{invalidation_channel: self._on_invalidate})
+            self._listener = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
 
     def _get_key(self, user_id: Union[int, str]) -> str:
         """Generate Redis key for a user.
@@ -76,6 +202,8 @@ class RedisStateStorage(BaseStorage):
         Returns:
             str: Redis key
         """
+        if self.prefix is not None:
+            return f"{self.prefix}:{{{user_id}}}:state"
         return f"state:{user_id}"
 
     def _get_data_key(self, user_id: Union[int, str]) -> str:
@@ -87,8 +215,135 @@ class RedisStateStorage(BaseStorage):
         Returns:
             str: Redis key
         """
+        if self.prefix is not None:
+            return f"{self.prefix}:{{{user_id}}}:data"
         return f"data:{user_id}"
 
+    def _encode_fields(self, data: Dict[Any, Any]) -> Dict[Any, bytes]:
+        return {field: self.encoder.encode(value) for field, value in data.items()}
+
+    def _decode_fields(self, fields: Dict[bytes, bytes]) -> Dict[str, Any]:
+        data = {field.decode(): self.decoder.decode(value) for field, value in fields.items()}
+        if self.data_type is not Any:
+            data = msgspec.convert(data, self.data_type)
+        return data
+
+    def _mget(self, keys: List[str]) -> Any:
+        # keys of a cluster are in different slots, so they are read per node.
+        if self.cluster:
+            return self.cache.mget_nonatomic(keys)
+        return self.cache.mget(keys)
+
+    def _chunked(self, user_ids: Iterable[Union[int, str]]) -> Iterator[List[Union[int, str]]]:
+        user_ids = list(user_ids)
+        for start in range(0, len(user_ids), self.batch_size):
+            yield user_ids[start:start + self.batch_size]
+
+    def _encode_state(
+        self,
+        user_id: Union[int, str],
+        state: Union[str, Enum],
+        callback: Optional[Callable[..., Any]] = None,
+        chat_id: Optional[Union[int, str]] = None
+    ) -> bytes:
+        if isinstance(state, Enum):
+            state = state.name
+
+        return self.encoder.encode(StateContext(
+            current_state=state,
+            chat_id=chat_id if chat_id is not None else user_id,
+            callback=callback.__name__ if callback else None
+        ))
+
+    def _on_invalidate(self, message: Dict[str, Any]) -> None:
+        worker_id, keys = self.decoder.decode(message["data"])
+        if worker_id == self.worker_id:
+            return
+
+        self._generation += 1
+        for key in keys:
+            self.local_cache.pop(key, None)
+
+    def _local_get(self, key: str) -> Any:
+        entry = self.local_cache.get(key, _NOT_CACHED)
+        if entry is not _NOT_CACHED and entry[1] is not None and entry[1] <= time.monotonic():
+            # the redis key has expired.
+            self.local_cache.pop(key, None)
+            entry = _NOT_CACHED
+
+        if entry is _NOT_CACHED:
+            self.local_misses += 1
+            return _NOT_CACHED
+        self.local_hits += 1
+        return entry[0]
+
+    def _local_set(self, key: str, value: Optional[bytes], generation: int, deadline: Optional[float]) -> None:
+        # an invalidation received while reading means the value may be stale.
+        if generation == self._generation:
+            self.local_cache[key] = (value, deadline)
+
+    def _fetch(self, key: str, command: str = "get") -> Tuple[Any, Optional[float]]:
+        """Read `key` with `command` and the deadline of its redis TTL."""
+        with self.cache.pipeline(transaction=False) as pipe:
+            getattr(pipe, command)(key)
+            pipe.pttl(key)
+            value, ttl = pipe.execute()
+        return value, time.monotonic() + ttl / 1000 if ttl >= 0 else None
+
+    def _invalidate(self, values: Dict[str, Any], ex: Optional["ExpiryT"] = None) -> None:
+        """Write `values` to the local cache and drop these keys in other workers.
+
+        Values are encoded, or None for missing keys, and expire after `ex` like
+        the written redis keys. `_NOT_CACHED` values are removed from the local cache.
+        """
+        if self.local_cache is None or not values:
+            return
+
+        ex_ms = self._expiry_ms(ex)
+        deadline = time.monotonic() + ex_ms / 1000 if ex_ms else None
+
+        self._generation += 1
+        for key, value in values.items():
+            if value is _NOT_CACHED:
+                self.local_cache.pop(key, None)
+            else:
+                self.local_cache[key] = (value, deadline)
+
+        self.cache.publish(
+            self.invalidation_channel,
+            self.encoder.encode([self.worker_id, list(values)])
+        )
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Get hit and miss counters of the local cache.
+
+        Returns:
+            dict[str, Any]: Hits, misses, hit ratio and size of the local cache
+        """
+        lookups = self.local_hits + self.local_misses
+        return {
+            "hits": self.local_hits,
+            "misses": self.local_misses,
+            "hit_ratio": self.local_hits / lookups if lookups else 0.0,
+            "size": len(self.local_cache) if self.local_cache is not None else 0
+        }
+
+    def close(self) -> None:
+        """Stop listening for local cache invalidations."""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+        if self._pubsub is not None:
+            self._pubsub.close()
+            self._pubsub = None
+
+    def _expiry_ms(self, ex: Optional["ExpiryT"]) -> int:
+        if not ex:
+            return 0
+        if isinstance(ex, timedelta):
+            return int(ex.total_seconds() * 1000)
+        return int(ex * 1000)
+
     def set_state(
         self, 
         user_id: Union[int, str], 
@@ -113,18 +368,17 @@ class RedisStateStorage(BaseStorage):
 
         callback_name = callback.__name__ if callback else None
 
-        state_data = {
-            "current_state": state,
-            "chat_id": chat_id,
-            "callback": callback_name
-        }
-
-        self.cache.set(
-            self._get_key(user_id),
-            self.encoder.encode(state_data),
-            ex=ex or self.ex
+        state_context = StateContext(
+            current_state=state,
+            chat_id=chat_id,
+            callback=callback_name
         )
 
+        state_key = self._get_key(user_id)
+        encoded = self.encoder.encode(state_context)
+        self.cache.set(state_key, encoded, ex=ex or self.ex)
+        self._invalidate({state_key: encoded}, ex or self.ex)
+
     def get_state(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[StateContext]:
         """Get the state context for a user.
 
@@ -136,12 +390,18 @@ class RedisStateStorage(BaseStorage):
         Returns:
             StateContext | None: The state context or default value
         """
-        data = self.cache.get(self._get_key(user_id))
-        if not data:
-            return default
+        state_key = self._get_key(user_id)
 
-        state_data = self.decoder.decode(data)
-        return StateContext(**state_data)
+        if self.local_cache is not None:
+            data = self._local_get(state_key)
+            if data is _NOT_CACHED:
+                generation = self._generation
+                data, deadline = self._fetch(state_key)
+                self._local_set(state_key, data or None, generation, deadline)
+        else:
+            data = self.cache.get(state_key)
+
+        return self.state_decoder.decode(data) if data else default
 
     def delete_state(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[StateContext]:
         """Delete the state for a user.
@@ -157,12 +417,12 @@ class RedisStateStorage(BaseStorage):
         state_key = self._get_key(user_id)
         data = self.cache.get(state_key)
         self.cache.delete(state_key)
+        self._invalidate({state_key: None})
 
         if not data:
             return default
 
-        state_data = self.decoder.decode(data)
-        return StateContext(**state_data)
+        return self.state_decoder.decode(data)
 
     def set_data(
         self, 
@@ -183,11 +443,22 @@ class RedisStateStorage(BaseStorage):
 
         data_key = self._get_data_key(user_id)
 
-        self.cache.set(
-            data_key,
-            self.encoder.encode(data),
-            ex=ex or self.ex
-        )
+        if self.hash_data:
+            ex = ex or self.ex
+            with self.cache.pipeline(transaction=not self.cluster) as pipe:
+                pipe.delete(data_key)
+                if data:
+                    pipe.hset(data_key, mapping=self._encode_fields(data))
+                    if ex:
+                        pipe.expire(data_key, ex)
+                pipe.execute()
+            if self.local_cache is not None:
+                self._invalidate({data_key: self.encoder.encode(data) if data else None}, ex)
+            return
+
+        encoded = self.encoder.encode(data)
+        self.cache.set(data_key, encoded, ex=ex or self.ex)
+        self._invalidate({data_key: encoded}, ex or self.ex)
 
     def get_data(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[Dict[Any, Any]]:
         """Get data for a user's state.
@@ -200,12 +471,33 @@ class RedisStateStorage(BaseStorage):
         Returns:
             dict[str, Any] | None: The stored data or None if not found
         """
-        data = self.cache.get(self._get_data_key(user_id))
+        data_key = self._get_data_key(user_id)
+
+        if self.local_cache is not None:
+            encoded = self._local_get(data_key)
+            if encoded is not _NOT_CACHED:
+                return self.data_decoder.decode(encoded) if encoded is not None else default
+            generation = self._generation
+
+        if self.hash_data:
+            if self.local_cache is not None:
+                fields, deadline = self._fetch(data_key, "hgetall")
+            else:
+                fields = self.cache.hgetall(data_key)
+            data = self._decode_fields(fields) if fields else None
+            if self.local_cache is not None:
+                self._local_set(data_key, self.encoder.encode(data) if data else None, generation, deadline)
+            return data if data else default
+
+        if self.local_cache is not None:
+            data, deadline = self._fetch(data_key)
+            self._local_set(data_key, data if data else None, generation, deadline)
+        else:
+            data = self.cache.get(data_key)
         if not data:
             return default
 
-        state_data = self.decoder.decode(data)
-        return state_data
+        return self.data_decoder.decode(data)
 
     def update_data(
         self,
@@ -231,22 +523,35 @@ class RedisStateStorage(BaseStorage):
             raise ValueError(f"'data' must be a dict, got {type(data)}")
 
         data_key = self._get_data_key(user_id)
+
+        if self.hash_data:
+            ex = ex or self.ex
+            with self.cache.pipeline(transaction=not self.cluster) as pipe:
+                if data:
+                    pipe.hset(data_key, mapping=self._encode_fields(data))
+                if ex:
+                    pipe.expire(data_key, ex)
+                pipe.execute()
+            self._invalidate({data_key: _NOT_CACHED})
+            return
+
         current_data = self.cache.get(data_key)
 
         if current_data:
             try:
-                state_data = self.decoder.decode(current_data)
+                state_data = self.data_decoder.decode(current_data)
                 state_data.update(data)
+            except ValidationError:
+                # valid JSON of another shape isn't corrupt, so it isn't overwritten.
+                raise
             except DecodeError:
-                state_data = deepcopy(data)
+                state_data = data
         else:
-            state_data = deepcopy(data)
+            state_data = data
 
-        self.cache.set(
-            data_key,
-            self.encoder.encode(state_data),
-            ex=ex or self.ex
-        )
+        encoded = self.encoder.encode(state_data)
+        self.cache.set(data_key, encoded, ex=ex or self.ex)
+        self._invalidate({data_key: encoded}, ex or self.ex)
 
     def delete_data(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[Dict[Any, Any]]:
         """Clear and get all data for a user's state.
@@ -260,11 +565,318 @@ class RedisStateStorage(BaseStorage):
             Dict | None: The deleted data or default value
         """
         data_key = self._get_data_key(user_id)
+
+        if self.hash_data:
+            with self.cache.pipeline(transaction=not self.cluster) as pipe:
+                pipe.hgetall(data_key)
+                pipe.delete(data_key)
+                fields, _ = pipe.execute()
+            self._invalidate({data_key: None})
+            return self._decode_fields(fields) if fields else default
+
         data = self.cache.get(data_key)
         self.cache.delete(data_key)
+        self._invalidate({data_key: None})
 
         if not data:
             return default
 
-        data = self.decoder.decode(data)
+        return self.data_decoder.decode(data)
+
+    def get_data_field(self, user_id: Union[int, str], field: str, default: Optional[Any] = None) -> Any:
+        """Get a single field of a user's data.
+
+        In `hash_data` mode only this field is read from redis.
+
+        Args:
+            user_id (int | str): ID of the user
+            field (str): Key of the field
+            default (Any, optional): Default value if field doesn't exist.
+                Defaults to None.
+
+        Returns:
+            Any: Value of the field or default value
+        """
+        if not self.hash_data:
+            return super().get_data_field(user_id, field, default)
+
+        value = self.cache.hget(self._get_data_key(user_id), field)
+        return self.decoder.decode(value) if value is not None else default
+
+    def delete_data_field(self, user_id: Union[int, str], field: str, default: Optional[Any] = None) -> Any:
+        """Delete and get a single field of a user's data.
+
+        In `hash_data` mode only this field is touched in redis.
+
+        Args:
+            user_id (int | str): ID of the user
+            field (str): Key of the field
+            default (Any, optional): Default value if field doesn't exist.
+                Defaults to None.
+
+        Returns:
+            Any: The deleted value or default value
+        """
+        if not self.hash_data:
+            return super().delete_data_field(user_id, field, default)
+
+        data_key = self._get_data_key(user_id)
+        with self.cache.pipeline(transaction=not self.cluster) as pipe:
+            pipe.hget(data_key, field)
+            pipe.hdel(data_key, field)
+            value, _ = pipe.execute()
+        self._invalidate({data_key: _NOT_CACHED})
+        return self.decoder.decode(value) if value is not None else default
+
+    def transition(
+        self,
+        user_id: Union[int, str],
+        expected: Optional[Union[str, Enum]],
+        new: Union[str, Enum],
+        data_patch: Optional[Dict[Any, Any]] = None,
+        ex: Optional["ExpiryT"] = None,
+        *,
+        callback: Optional[Callable[..., Any]] = None,
+        chat_id: Optional[Union[int, str]] = None
+    ) -> bool:
+        """Move a user to a new state only if the user is in the expected state.
+
+        The check, the state change, the data merge and the expiry refresh
+        run atomically in a single Lua script on the redis server.
+
+        Args:
+            user_id (int | str): ID of the user
+            expected (str | Enum | None): State the user must be in, None means no state
+            new (str | Enum): State to set
+            data_patch (dict[str, Any] | None, optional): Data to merge like `update_data`.
+                Defaults to None.
+            ex (ExpiryT | None, optional): Expiration time for the state and data.
+                Defaults to None.
+            callback (Callable | None, optional): Callback function. Defaults to None.
+            chat_id (int | str, optional): Chat ID. Defaults to None.
+
+        Returns:
+            bool: True if the state was changed, False if the user wasn't in `expected`
+        """
+        if data_patch is not None and not isinstance(data_patch, dict):
+            raise ValueError(f"'data_patch' must be a dict, got {type(data_patch)}")
+
+        if isinstance(expected, Enum):
+            expected = expected.name
+
+        data_key = self._get_data_key(user_id)
+        keys = [self._get_key(user_id), data_key]
+        args = [
+            self.codec,
+            "0" if expected is None else "1",
+            expected or "",
+            self._encode_state(user_id, new, callback, chat_id),
+            self._expiry_ms(ex or self.ex)
+        ]
+
+        if not data_patch:
+            changed = self._transition_script(keys=keys, args=[*args, ""]) == 1
+        elif self.hash_data:
+            fields = chain.from_iterable(self._encode_fields(data_patch).items())
+            changed = self._transition_script(keys=keys, args=[*args, "hash", *fields]) == 1
+        else:
+            # the script refuses to write if data was changed since it was read here.
+            while True:
+                current_data = self.cache.get(data_key)
+
+                try:
+                    data = self.data_decoder.decode(current_data) if current_data else {}
+                    data.update(data_patch)
+                except ValidationError:
+                    raise
+                except DecodeError:
+                    data = data_patch
+
+                result = self._transition_script(
+                    keys=keys,
+                    args=[*args, "value", current_data or b"", self.encoder.encode(data)]
+                )
+                if result != -1:
+                    changed = result == 1
+                    break
+
+        if changed:
+            self._invalidate(dict.fromkeys(keys, _NOT_CACHED))
+        return changed
+
+    def get_states_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[StateContext]]:
+        """Get the state contexts of many users with one MGET per batch.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without state.
+                Defaults to None.
+
+        Returns:
+            list[StateContext | None]: State contexts in order of `user_ids`
+        """
+        states = []
+        for chunk in self._chunked(user_ids):
+            for data in self._mget([self._get_key(user_id) for user_id in chunk]):
+                states.append(self.state_decoder.decode(data) if data else default)
+        return states
+
+    def set_states_many(
+        self,
+        states: Dict[Union[int, str], Union[str, Enum]],
+        callback: Optional[Callable[..., Any]] = None,
+        ex: Optional["ExpiryT"] = None
+    ) -> None:
+        """Set states of many users with one pipeline per batch.
+
+        Args:
+            states (dict[int | str, str | Enum]): States mapped by user IDs
+            callback (Callable | None, optional): Callback function for all users.
+                Defaults to None.
+            ex (ExpiryT | None, optional): Expiration time of the states.
+                Defaults to None.
+        """
+        ex = ex or self.ex
+        for chunk in self._chunked(states):
+            with self.cache.pipeline(transaction=False) as pipe:
+                for user_id in chunk:
+                    pipe.set(
+                        self._get_key(user_id),
+                        self._encode_state(user_id, states[user_id], callback),
+                        ex=ex
+                    )
+                pipe.execute()
+            self._invalidate(dict.fromkeys(map(self._get_key, chunk), _NOT_CACHED))
+
+    def delete_states_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[StateContext]]:
+        """Delete and get the states of many users.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without state.
+                Defaults to None.
+
+        Returns:
+            list[StateContext | None]: Deleted state contexts in order of `user_ids`
+        """
+        states = []
+        for chunk in self._chunked(user_ids):
+            keys = [self._get_key(user_id) for user_id in chunk]
+            with self.cache.pipeline(transaction=not self.cluster) as pipe:
+                for key in keys:
+                    pipe.get(key)
+                    pipe.delete(key)
+                records = (pipe.execute())[::2]
+            self._invalidate(dict.fromkeys(keys))
+
+            for data in records:
+                states.append(self.state_decoder.decode(data) if data else default)
+        return states
+
+    def get_data_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[Dict[Any, Any]]]:
+        """Get data of many users with one MGET (or pipeline in `hash_data` mode) per batch.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without data.
+                Defaults to None.
+
+        Returns:
+            list[dict[str, Any] | None]: Data in order of `user_ids`
+        """
+        data = []
+        for chunk in self._chunked(user_ids):
+            keys = [self._get_data_key(user_id) for user_id in chunk]
+
+            if self.hash_data:
+                with self.cache.pipeline(transaction=False) as pipe:
+                    for key in keys:
+                        pipe.hgetall(key)
+                    records = pipe.execute()
+                data.extend(self._decode_fields(fields) if fields else default for fields in records)
+            else:
+                records = self._mget(keys)
+                data.extend(self.data_decoder.decode(record) if record else default for record in records)
+        return data
+
+    def set_data_many(
+        self,
+        data: Dict[Union[int, str], Dict[Any, Any]],
+        ex: Optional["ExpiryT"] = None
+    ) -> None:
+        """Set data of many users with one pipeline per batch.
+
+        This method completely replaces any existing data of the users.
+
+        Args:
+            data (dict[int | str, dict[str, Any]]): Data mapped by user IDs
+            ex (ExpiryT | None, optional): Expiration time of the data.
+                Defaults to None.
+        """
+        for user_data in data.values():
+            if not isinstance(user_data, dict):
+                raise ValueError(f"'data' values must be dicts, got {type(user_data)}")
+
+        ex = ex or self.ex
+        for chunk in self._chunked(data):
+            with self.cache.pipeline(transaction=False) as pipe:
+                for user_id in chunk:
+                    data_key = self._get_data_key(user_id)
+                    if not self.hash_data:
+                        pipe.set(data_key, self.encoder.encode(data[user_id]), ex=ex)
+                        continue
+
+                    pipe.delete(data_key)
+                    if data[user_id]:
+                        pipe.hset(data_key, mapping=self._encode_fields(data[user_id]))
+                        if ex:
+                            pipe.expire(data_key, ex)
+                pipe.execute()
+            self._invalidate(dict.fromkeys(map(self._get_data_key, chunk), _NOT_CACHED))
+
+    def delete_data_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[Dict[Any, Any]]]:
+        """Clear and get data of many users.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without data.
+                Defaults to None.
+
+        Returns:
+            list[dict[str, Any] | None]: Deleted data in order of `user_ids`
+        """
+        data = []
+        for chunk in self._chunked(user_ids):
+            keys = [self._get_data_key(user_id) for user_id in chunk]
+
+            with self.cache.pipeline(transaction=not self.cluster) as pipe:
+                for key in keys:
+                    if self.hash_data:
+                        pipe.hgetall(key)
+                    else:
+                        pipe.get(key)
+                    pipe.delete(key)
+                records = (pipe.execute())[::2]
+            self._invalidate(dict.fromkeys(keys))
+
+            if self.hash_data:
+                data.extend(self._decode_fields(fields) if fields else default for fields in records)
+            else:
+                data.extend(self.data_decoder.decode(record) if record else default for record in records)
         return data
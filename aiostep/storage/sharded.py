@@ -0,0 +1,451 @@
+import os
+import time
+import zlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from enum import Enum
+from typing import Callable, Any, Union, Dict, Optional, Iterable, List, Type
+
+from qsave import QuickSave
+
+from .base import BaseStorage, StateContext
+from .file import FileStateStorage
+from .log import LogFileStateStorage, _write_log
+
+
+def shard_of(user_id: Union[int, str], shards: int) -> int:
+    """Give the shard of a user.
+
+    The CRC32 of `str(user_id)` is used, so shards don't change between
+    processes (unlike `hash`) and `1` and `"1"` are in the same shard.
+
+    Args:
+        user_id (int | str): ID of the user
+        shards (int): Number of shards
+
+    Returns:
+        int: Index of the shard
+    """
+    return zlib.crc32(str(user_id).encode()) % shards
+
+
+def shard_paths(path: Union[str, os.PathLike], shards: int) -> List[str]:
+    """Give the file paths of shards, e.g. `states-0.json` for `states.json`.
+
+    Args:
+        path (str | os.PathLike): Path of the sharded storage
+        shards (int): Number of shards
+
+    Returns:
+        list[str]: Paths in order of shards
+    """
+    base, ext = os.path.splitext(os.fspath(path))
+    return [f"{base}-{shard}{ext}" for shard in range(shards)]
+
+
+def rebalance_shards(
+    path: Union[str, os.PathLike],
+    old_shards: int,
+    new_shards: int,
+    storage_class: Type[BaseStorage] = FileStateStorage
+) -> None:
+    """Move states and data of a sharded file storage to a new number of shards.
+
+    Storages using the files must be closed while this runs. New shards are
+    written next to the old ones and then replace them, and unused old shard
+    files are removed. Expired records are dropped.
+
+    Args:
+        path (str | os.PathLike): Path given to the sharded storage
+        old_shards (int): Current number of shards
+        new_shards (int): New number of shards
+        storage_class (type): `FileStateStorage` or `LogFileStateStorage`, whichever
+            the shards are stored with. Async versions use the same files.
+    """
+    if new_shards <= 0:
+        raise ValueError(f"'new_shards' must be positive, got {new_shards}")
+
+    old_paths = shard_paths(path, old_shards)
+    new_paths = shard_paths(path, new_shards)
+    now = time.time()
+
+    if issubclass(storage_class, LogFileStateStorage):
+        entries: List[dict] = [{} for _ in new_paths]
+        for old_path in old_paths:
+            if not os.path.exists(old_path):
+                continue
+            storage = LogFileStateStorage(old_path, auto_compact=False)
+            for (kind, user_id), (value, expire) in storage._index.items():
+                if expire is None or expire >= now:
+                    entries[shard_of(user_id, new_shards)][(kind, user_id)] = (value, expire)
+            storage.close()
+
+        for new_path, shard_entries in zip(new_paths, entries):
+            _write_log(f"{new_path}.rebalance", shard_entries.items())
+    else:
+        records: List[dict] = [{} for _ in new_paths]
+        for old_path in old_paths:
+            with QuickSave(path=old_path).session(commit_on_expire=False) as session:
+                for key, record in session.items():
+                    if isinstance(record, dict) and record.get("expire") and record["expire"] < now:
+                        continue
+                    # keys are "state:{user_id}" and "data:{user_id}"
+                    records[shard_of(key.split(":", 1)[1], new_shards)][key] = record
+
+        for new_path, shard_records in zip(new_paths, records):
+            with QuickSave(path=f"{new_path}.rebalance").session(commit_on_expire=False) as session:
+                session.update(shard_records)
+                session.commit()
+
+    for new_path in new_paths:
+        os.replace(f"{new_path}.rebalance", new_path)
+    for old_path in old_paths[new_shards:]:
+        if os.path.exists(old_path):
+            os.remove(old_path)
+
+
+class ShardedFileStateStorage(BaseStorage):
+    """File-based storage which spreads users over several files.
+
+    Each user belongs to one shard (see `shard_of`), and each shard is a
+    separate storage with its own file, so a write rewrites only the file
+    of its shard and writes to different shards don't wait for each other.
+    Bulk methods run the shards in parallel on a thread pool.
+
+    Use `rebalance_shards` to change the number of shards of existing files.
+
+    Args:
+        path (str | os.PathLike): Base path of shard files, `states.json` gives
+            `states-0.json`, `states-1.json` and so on.
+        shards (int): Number of shards.
+        storage_class (type): Storage of a shard, `FileStateStorage` or `LogFileStateStorage`.
+        max_workers (int | None): Threads used by bulk methods. Defaults to `shards`.
+        **kwargs: Passed to every shard storage, e.g. `ex`.
+
+    Example::
+
+        storage = ShardedFileStateStorage("states.json", shards=16)
+    """
+
+    def __init__(
+        self,
+        path: Union[str, os.PathLike],
+        shards: int = 8,
+        storage_class: Type[BaseStorage] = FileStateStorage,
+        max_workers: Optional[int] = None,
+        **kwargs
+    ) -> None:
+        """Initialize shard storages.
+
+        Args:
+            path (str | os.PathLike): Base path of shard files.
+            shards (int, optional): Number of shards. Defaults to 8.
+            storage_class (type, optional): Storage of a shard. Defaults to FileStateStorage.
+            max_workers (int | None, optional): Threads used by bulk methods. Defaults to None.
+        """
+        if shards <= 0:
+            raise ValueError(f"'shards' must be positive, got {shards}")
+
+        self.path = os.fspath(path)
+        self.shards: List[BaseStorage] = [storage_class(shard_path, **kwargs) for shard_path in shard_paths(path, shards)]
+        self._executor = ThreadPoolExecutor(max_workers or shards, thread_name_prefix="aiostep-shard")
+
+    def shard(self, user_id: Union[int, str]) -> BaseStorage:
+        """Give the storage of a user's shard.
+
+        Args:
+            user_id (int | str): ID of the user
+
+        Returns:
+            BaseStorage: Storage of the shard
+        """
+        return self.shards[shard_of(user_id, len(self.shards))]
+
+    def _get_many(self, method: str, user_ids: Iterable[Union[int, str]], default: Any) -> List[Any]:
+        user_ids = list(user_ids)
+        groups: Dict[int, List[int]] = defaultdict(list)
+        for position, user_id in enumerate(user_ids):
+            groups[shard_of(user_id, len(self.shards))].append(position)
+
+        futures = {
+            shard: self._executor.submit(
+                getattr(self.shards[shard], method), [user_ids[position] for position in positions], default
+            )
+            for shard, positions in groups.items()
+        }
+
+        results = [default] * len(user_ids)
+        for shard, positions in groups.items():
+            for position, value in zip(positions, futures[shard].result()):
+                results[position] = value
+        return results
+
+    def _set_many(self, method: str, values: Dict[Union[int, str], Any], *args) -> None:
+        groups: Dict[int, dict] = defaultdict(dict)
+        for user_id, value in values.items():
+            groups[shard_of(user_id, len(self.shards))][user_id] = value
+
+        futures = [
+            self._executor.submit(getattr(self.shards[shard], method), shard_values, *args)
+            for shard, shard_values in groups.items()
+        ]
+        for future in futures:
+            future.result()
+
+    def close(self) -> None:
+        """Close shard storages which can be closed and stop the thread pool."""
+        for shard in self.shards:
+            close = getattr(shard, "close", None)
+            if close is not None:
+                close()
+        self._executor.shutdown()
+
+    def set_state(
+        self,
+        user_id: Union[int, str],
+        state: Union[str, Enum],
+        callback: Optional[Callable[..., Any]] = None,
+        chat_id: Optional[Union[int, str]] = None,
+        ex: Optional[float] = None
+    ) -> None:
+        """Set the state for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            state (str | Enum): State to set
+            callback (Callable | None, optional): Callback function. Defaults to None.
+            chat_id (int | str, optional): Chat ID. Defaults to None.
+            ex (float | None, optional): Expiration time in seconds. Defaults to None.
+        """
+        self.shard(user_id).set_state(user_id, state, callback=callback, chat_id=chat_id, ex=ex)
+
+    def get_state(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[StateContext]:
+        """Get the state context for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            default (Any, optional): Default value if state doesn't exist.
+                Defaults to None.
+
+        Returns:
+            StateContext | None: The state context or default value
+        """
+        return self.shard(user_id).get_state(user_id, default)
+
+    def delete_state(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[StateContext]:
+        """Delete the state for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            default (Any, optional): Default value if state doesn't exist.
+                Defaults to None.
+
+        Returns:
+            StateContext | None: The deleted state context or default value
+        """
+        return self.shard(user_id).delete_state(user_id, default)
+
+    def set_data(self, user_id: Union[int, str], data: Dict[Any, Any], ex: Optional[float] = None) -> None:
+        """Set data for a user.
+
+        This method completely replaces any existing data.
+
+        Args:
+            user_id (int | str): ID of the user
+            data (dict[str, Any]): Data to store
+            ex (float | None, optional): Expiration time in seconds. Defaults to None.
+        """
+        self.shard(user_id).set_data(user_id, data, ex=ex)
+
+    def get_data(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[Dict[Any, Any]]:
+        """Get data for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            default (Any, optional): Default value if data doesn't exist.
+                Defaults to None.
+
+        Returns:
+            dict[str, Any] | None: The stored data or None if not found
+        """
+        return self.shard(user_id).get_data(user_id, default)
+
+    def update_data(self, user_id: Union[int, str], data: Dict[Any, Any], ex: Optional[float] = None) -> None:
+        """Update data for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            data (dict[str, Any]): Data to update
+            ex (float | None, optional): New expiration time in seconds. Defaults to None.
+        """
+        self.shard(user_id).update_data(user_id, data, ex=ex)
+
+    def delete_data(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[Dict[Any, Any]]:
+        """Clear and get all data for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            default (Any, optional): Default value if data doesn't exist.
+                Defaults to None.
+
+        Returns:
+            Dict | None: The deleted data or default value
+        """
+        return self.shard(user_id).delete_data(user_id, default)
+
+    def get_data_field(self, user_id: Union[int, str], field: str, default: Optional[Any] = None) -> Any:
+        """Get a single field of a user's data.
+
+        Args:
+            user_id (int | str): ID of the user
+            field (str): Name of the field
+            default (Any, optional): Default value if the field doesn't exist.
+                Defaults to None.
+
+        Returns:
+            Any: Value of the field or default value
+        """
+        return self.shard(user_id).get_data_field(user_id, field, default)
+
+    def delete_data_field(self, user_id: Union[int, str], field: str, default: Optional[Any] = None) -> Any:
+        """Delete and get a single field of a user's data.
+
+        Args:
+            user_id (int | str): ID of the user
+            field (str): Name of the field
+            default (Any, optional): Default value if the field doesn't exist.
+                Defaults to None.
+
+        Returns:
+            Any: Deleted value of the field or default value
+        """
+        return self.shard(user_id).delete_data_field(user_id, field, default)
+
+    def transition(
+        self,
+        user_id: Union[int, str],
+        expected: Optional[Union[str, Enum]],
+        new: Union[str, Enum],
+        data_patch: Optional[Dict[Any, Any]] = None,
+        ex: Optional[float] = None,
+        *,
+        callback: Optional[Callable[..., Any]] = None,
+        chat_id: Optional[Union[int, str]] = None
+    ) -> bool:
+        """Move a user to a new state only if the user is in the expected state.
+
+        Args:
+            user_id (int | str): ID of the user
+            expected (str | Enum | None): State the user must be in, None means no state
+            new (str | Enum): State to set
+            data_patch (dict[str, Any] | None, optional): Data to merge like `update_data`.
+                Defaults to None.
+            ex (float | None, optional): Expiration time for the state and data.
+                Defaults to None.
+            callback (Callable | None, optional): Callback function. Defaults to None.
+            chat_id (int | str, optional): Chat ID. Defaults to None.
+
+        Returns:
+            bool: True if the state was changed, False if the user wasn't in `expected`
+        """
+        return self.shard(user_id).transition(
+            user_id, expected, new, data_patch, ex, callback=callback, chat_id=chat_id
+        )
+
+    def get_states_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[StateContext]]:
+        """Get the state contexts of many users, shards are read in parallel.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without state.
+                Defaults to None.
+
+        Returns:
+            list[StateContext | None]: State contexts in order of `user_ids`
+        """
+        return self._get_many("get_states_many", user_ids, default)
+
+    def set_states_many(
+        self,
+        states: Dict[Union[int, str], Union[str, Enum]],
+        callback: Optional[Callable[..., Any]] = None,
+        ex: Optional[float] = None
+    ) -> None:
+        """Set states of many users, shards are written in parallel.
+
+        Args:
+            states (dict[int | str, str | Enum]): States mapped by user IDs
+            callback (Callable | None, optional): Callback function for all users.
+                Defaults to None.
+            ex (float | None, optional): Expiration time of the states.
+                Defaults to None.
+        """
+        self._set_many("set_states_many", states, callback, ex)
+
+    def delete_states_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[StateContext]]:
+        """Delete and get the states of many users, shards are written in parallel.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without state.
+                Defaults to None.
+
+        Returns:
+            list[StateContext | None]: Deleted state contexts in order of `user_ids`
+        """
+        return self._get_many("delete_states_many", user_ids, default)
+
+    def get_data_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[Dict[Any, Any]]]:
+        """Get data of many users, shards are read in parallel.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without data.
+                Defaults to None.
+
+        Returns:
+            list[dict[str, Any] | None]: Data in order of `user_ids`
+        """
+        return self._get_many("get_data_many", user_ids, default)
+
+    def set_data_many(self, data: Dict[Union[int, str], Dict[Any, Any]], ex: Optional[float] = None) -> None:
+        """Set data of many users, shards are written in parallel.
+
+        This method completely replaces any existing data of the users.
+
+        Args:
+            data (dict[int | str, dict[str, Any]]): Data mapped by user IDs
+            ex (float | None, optional): Expiration time of the data.
+                Defaults to None.
+        """
+        self._set_many("set_data_many", data, ex)
+
+    def delete_data_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[Dict[Any, Any]]]:
+        """Clear and get data of many users, shards are written in parallel.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without data.
+                Defaults to None.
+
+        Returns:
+            list[dict[str, Any] | None]: Deleted data in order of `user_ids`
+        """
+        return self._get_many("delete_data_many", user_ids, default)
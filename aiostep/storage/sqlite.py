@@ -0,0 +1,486 @@
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import msgspec
+from enum import Enum
+from typing import Callable, Any, Union, Dict, Optional, Iterable, Iterator, List, Tuple
+
+from .base import BaseStorage, StateContext
+
+_STATES, _DATA = "states", "data"
+
+# user_id has no type, so 1 and "1" are different users like in the memory storages.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    user_id PRIMARY KEY,
+    value BLOB NOT NULL,
+    expire_at REAL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS {table}_expire_at ON {table} (expire_at) WHERE expire_at IS NOT NULL;
+"""
+
+# statements are written once per table, so sqlite3 reuses the prepared ones from its cache.
+_SQL = {
+    table: {
+        "get": f"SELECT value, expire_at FROM {table} WHERE user_id = ? AND (expire_at IS NULL OR expire_at > ?)",
+        "set": f"INSERT OR REPLACE INTO {table} (user_id, value, expire_at) VALUES (?, ?, ?)",
+        "delete": f"DELETE FROM {table} WHERE user_id = ?",
+        "sweep": (
+            f"DELETE FROM {table} WHERE user_id IN "
+            f"(SELECT user_id FROM {table} WHERE expire_at <= ? LIMIT ?)"
+        ),
+    }
+    for table in (_STATES, _DATA)
+}
+
+# SQLite limits the number of parameters of a statement.
+_CHUNK_SIZE = 500
+
+
+class SQLiteStateStorage(BaseStorage):
+    """SQLite-based storage implementation for managing bot states.
+
+    States and data are stored in two tables with msgpack-encoded values, so
+    a write changes one row instead of rewriting a file like `FileStateStorage`.
+    The database uses WAL mode, so reads don't wait for writes.
+
+    Expired rows are skipped on read and removed by `sweep`, which uses an
+    index on the expiration time.
+
+    Args:
+        path (str | os.PathLike): Path to the database file.
+        ex (float | None): Expiration time for states and data.
+        synchronous (str): SQLite `synchronous` pragma. `"NORMAL"` may lose the
+            last writes on power loss but never corrupts the database; use `"FULL"`
+            to sync every commit.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, os.PathLike],
+        ex: Optional[float] = None,
+        synchronous: str = "NORMAL",
+        **kwargs
+    ) -> None:
+        """Initialize the SQLite storage.
+
+        Args:
+            path (str | os.PathLike): Path to the database file.
+            ex (float | None, optional): Expiration time for states and data. Defaults to None.
+            synchronous (str, optional): SQLite `synchronous` pragma. Defaults to "NORMAL".
+            **kwargs: Passed to `sqlite3.connect`.
+        """
+        self.path = os.fspath(path)
+        self.ex = ex
+
+        self.encoder = msgspec.msgpack.Encoder()
+        self.decoder = msgspec.msgpack.Decoder()
+        self.state_decoder = msgspec.msgpack.Decoder(StateContext)
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, **kwargs)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={synchronous}")
+        for table in (_STATES, _DATA):
+            self._conn.executescript(_SCHEMA.format(table=table))
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run statements in a transaction, or in a savepoint inside a running one."""
+        with self._lock:
+            conn = self._conn
+            if conn.in_transaction:
+                conn.execute("SAVEPOINT aiostep")
+                try:
+                    yield conn
+                except BaseException:
+                    conn.execute("ROLLBACK TO aiostep")
+                    conn.execute("RELEASE aiostep")
+                    raise
+                conn.execute("RELEASE aiostep")
+            else:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    yield conn
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+                conn.execute("COMMIT")
+
+    def _expire_at(self, ex: Optional[float]) -> Optional[float]:
+        ex = ex or self.ex
+        return time.time() + ex if ex else None
+
+    def _get(self, table: str, user_id: Union[int, str]) -> Optional[Tuple[bytes, Optional[float]]]:
+        with self._lock:
+            return self._conn.execute(_SQL[table]["get"], (user_id, time.time())).fetchone()
+
+    def _get_many(self, table: str, user_ids: List[Union[int, str]]) -> Dict[Union[int, str], bytes]:
+        values = {}
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(user_ids), _CHUNK_SIZE):
+                chunk = user_ids[start:start + _CHUNK_SIZE]
+                rows = self._conn.execute(
+                    f"SELECT user_id, value FROM {table} WHERE user_id IN ({','.join('?' * len(chunk))})"
+                    f" AND (expire_at IS NULL OR expire_at > ?)",
+                    (*chunk, now)
+                )
+                values.update(rows)
+        return values
+
+    def _delete_many(self, table: str, user_ids: List[Union[int, str]]) -> Dict[Union[int, str], bytes]:
+        with self._transaction() as conn:
+            values = self._get_many(table, user_ids)
+            conn.executemany(_SQL[table]["delete"], ((user_id,) for user_id in user_ids))
+        return values
+
+    def _encode_state(
+        self,
+        user_id: Union[int, str],
+        state: Union[str, Enum],
+        callback: Optional[Callable[..., Any]] = None,
+        chat_id: Optional[Union[int, str]] = None
+    ) -> bytes:
+        if isinstance(state, Enum):
+            state = state.name
+
+        return self.encoder.encode(StateContext(
+            current_state=state,
+            callback=callback.__name__ if callback else None,
+            chat_id=user_id if chat_id is None else chat_id
+        ))
+
+    def sweep(self, limit: Optional[int] = None) -> int:
+        """Remove expired states and data.
+
+        Args:
+            limit (int | None, optional): Maximum rows removed from each table.
+                Defaults to None, which removes all expired rows.
+
+        Returns:
+            int: Number of removed rows
+        """
+        removed = 0
+        with self._transaction() as conn:
+            for table in (_STATES, _DATA):
+                removed += conn.execute(_SQL[table]["sweep"], (time.time(), -1 if limit is None else limit)).rowcount
+        return removed
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def set_state(
+        self,
+        user_id: Union[int, str],
+        state: Union[str, Enum],
+        callback: Optional[Callable[..., Any]] = None,
+        chat_id: Optional[Union[int, str]] = None,
+        ex: Optional[float] = None
+    ) -> None:
+        """Set the state for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            state (str | Enum): State to set
+            callback (Callable | None, optional): Callback function. Defaults to None.
+            chat_id (int | str, optional): Chat ID. Defaults to None.
+            ex (float | None, optional): Expiration time in seconds. Defaults to None.
+        """
+        value = self._encode_state(user_id, state, callback, chat_id)
+        with self._lock:
+            self._conn.execute(_SQL[_STATES]["set"], (user_id, value, self._expire_at(ex)))
+
+    def get_state(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[StateContext]:
+        """Get the state context for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            default (Any, optional): Default value if state doesn't exist.
+                Defaults to None.
+
+        Returns:
+            StateContext | None: The state context or default value
+        """
+        row = self._get(_STATES, user_id)
+        return self.state_decoder.decode(row[0]) if row is not None else default
+
+    def delete_state(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[StateContext]:
+        """Delete the state for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            default (Any, optional): Default value if state doesn't exist.
+                Defaults to None.
+
+        Returns:
+            StateContext | None: The deleted state context or default value
+        """
+        with self._transaction() as conn:
+            row = self._get(_STATES, user_id)
+            conn.execute(_SQL[_STATES]["delete"], (user_id,))
+
+        return self.state_decoder.decode(row[0]) if row is not None else default
+
+    def set_data(self, user_id: Union[int, str], data: Dict[Any, Any], ex: Optional[float] = None) -> None:
+        """Set data for a user.
+
+        This method completely replaces any existing data.
+
+        Args:
+            user_id (int | str): ID of the user
+            data (dict[str, Any]): Data to store
+            ex (float | None, optional): Expiration time in seconds. Defaults to None.
+        """
+        if not isinstance(data, dict):
+            raise ValueError(f"'data' must be a dict, got {type(data)}")
+
+        value = self.encoder.encode(data)
+        with self._lock:
+            self._conn.execute(_SQL[_DATA]["set"], (user_id, value, self._expire_at(ex)))
+
+    def get_data(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[Dict[Any, Any]]:
+        """Get data for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            default (Any, optional): Default value if data doesn't exist.
+                Defaults to None.
+
+        Returns:
+            dict[str, Any] | None: The stored data or None if not found
+        """
+        row = self._get(_DATA, user_id)
+        return self.decoder.decode(row[0]) if row is not None else default
+
+    def update_data(self, user_id: Union[int, str], data: Dict[Any, Any], ex: Optional[float] = None) -> None:
+        """Update data for a user.
+
+        This method updates existing data with new values, similar to dict.update().
+        Without `ex` the current expiration time is kept.
+
+        Args:
+            user_id (int | str): ID of the user
+            data (dict[str, Any]): Data to update
+            ex (float | None, optional): New expiration time in seconds. Defaults to None.
+
+        Example:
+            >>> # Existing data: {"name": "John"}
+            >>> storage.update_data(user_id, {"age": 25})
+            >>> # Result: {"name": "John", "age": 25}
+        """
+        if not isinstance(data, dict):
+            raise ValueError(f"'data' must be a dict, got {type(data)}")
+
+        with self._transaction() as conn:
+            self._update_data(conn, user_id, data, ex)
+
+    def _update_data(
+        self,
+        conn: sqlite3.Connection,
+        user_id: Union[int, str],
+        data: Dict[Any, Any],
+        ex: Optional[float]
+    ) -> None:
+        row = self._get(_DATA, user_id)
+        if row is None:
+            conn.execute(_SQL[_DATA]["set"], (user_id, self.encoder.encode(data), self._expire_at(ex)))
+            return
+
+        current_data = self.decoder.decode(row[0])
+        current_data.update(data)
+        expire_at = self._expire_at(ex) if ex else row[1]
+        conn.execute(_SQL[_DATA]["set"], (user_id, self.encoder.encode(current_data), expire_at))
+
+    def delete_data(self, user_id: Union[int, str], default: Optional[Any] = None) -> Optional[Dict[Any, Any]]:
+        """Clear and get all data for a user.
+
+        Args:
+            user_id (int | str): ID of the user
+            default (Any, optional): Default value if data doesn't exist.
+                Defaults to None.
+
+        Returns:
+            Dict | None: The deleted data or default value
+        """
+        with self._transaction() as conn:
+            row = self._get(_DATA, user_id)
+            conn.execute(_SQL[_DATA]["delete"], (user_id,))
+
+        return self.decoder.decode(row[0]) if row is not None else default
+
+    def transition(
+        self,
+        user_id: Union[int, str],
+        expected: Optional[Union[str, Enum]],
+        new: Union[str, Enum],
+        data_patch: Optional[Dict[Any, Any]] = None,
+        ex: Optional[float] = None,
+        *,
+        callback: Optional[Callable[..., Any]] = None,
+        chat_id: Optional[Union[int, str]] = None
+    ) -> bool:
+        """Move a user to a new state only if the user is in the expected state.
+
+        The check and both writes are done in a single transaction.
+
+        Args:
+            user_id (int | str): ID of the user
+            expected (str | Enum | None): State the user must be in, None means no state
+            new (str | Enum): State to set
+            data_patch (dict[str, Any] | None, optional): Data to merge like `update_data`.
+                Defaults to None.
+            ex (float | None, optional): Expiration time for the state and data.
+                Defaults to None.
+            callback (Callable | None, optional): Callback function. Defaults to None.
+            chat_id (int | str, optional): Chat ID. Defaults to None.
+
+        Returns:
+            bool: True if the state was changed, False if the user wasn't in `expected`
+        """
+        if data_patch is not None and not isinstance(data_patch, dict):
+            raise ValueError(f"'data_patch' must be a dict, got {type(data_patch)}")
+
+        if isinstance(expected, Enum):
+            expected = expected.name
+
+        value = self._encode_state(user_id, new, callback, chat_id)
+        with self._transaction() as conn:
+            row = self._get(_STATES, user_id)
+            current_state = self.state_decoder.decode(row[0]).current_state if row is not None else None
+            if current_state != expected:
+                return False
+
+            conn.execute(_SQL[_STATES]["set"], (user_id, value, self._expire_at(ex)))
+            if data_patch:
+                self._update_data(conn, user_id, data_patch, ex)
+            return True
+
+    def get_states_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[StateContext]]:
+        """Get the state contexts of many users with `IN` queries.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without state.
+                Defaults to None.
+
+        Returns:
+            list[StateContext | None]: State contexts in order of `user_ids`
+        """
+        user_ids = list(user_ids)
+        values = self._get_many(_STATES, user_ids)
+        return [
+            self.state_decoder.decode(values[user_id]) if user_id in values else default
+            for user_id in user_ids
+        ]
+
+    def set_states_many(
+        self,
+        states: Dict[Union[int, str], Union[str, Enum]],
+        callback: Optional[Callable[..., Any]] = None,
+        ex: Optional[float] = None
+    ) -> None:
+        """Set states of many users in one transaction.
+
+        Args:
+            states (dict[int | str, str | Enum]): States mapped by user IDs
+            callback (Callable | None, optional): Callback function for all users.
+                Defaults to None.
+            ex (float | None, optional): Expiration time of the states.
+                Defaults to None.
+        """
+        expire_at = self._expire_at(ex)
+        rows = [
+            (user_id, self._encode_state(user_id, state, callback), expire_at)
+            for user_id, state in states.items()
+        ]
+        with self._transaction() as conn:
+            conn.executemany(_SQL[_STATES]["set"], rows)
+
+    def delete_states_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[StateContext]]:
+        """Delete and get the states of many users in one transaction.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without state.
+                Defaults to None.
+
+        Returns:
+            list[StateContext | None]: Deleted state contexts in order of `user_ids`
+        """
+        user_ids = list(user_ids)
+        values = self._delete_many(_STATES, user_ids)
+        return [
+            self.state_decoder.decode(values[user_id]) if user_id in values else default
+            for user_id in user_ids
+        ]
+
+    def get_data_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[Dict[Any, Any]]]:
+        """Get data of many users with `IN` queries.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without data.
+                Defaults to None.
+
+        Returns:
+            list[dict[str, Any] | None]: Data in order of `user_ids`
+        """
+        user_ids = list(user_ids)
+        values = self._get_many(_DATA, user_ids)
+        return [self.decoder.decode(values[user_id]) if user_id in values else default for user_id in user_ids]
+
+    def set_data_many(self, data: Dict[Union[int, str], Dict[Any, Any]], ex: Optional[float] = None) -> None:
+        """Set data of many users in one transaction.
+
+        This method completely replaces any existing data of the users.
+
+        Args:
+            data (dict[int | str, dict[str, Any]]): Data mapped by user IDs
+            ex (float | None, optional): Expiration time of the data.
+                Defaults to None.
+        """
+        for user_data in data.values():
+            if not isinstance(user_data, dict):
+                raise ValueError(f"'data' values must be dicts, got {type(user_data)}")
+
+        expire_at = self._expire_at(ex)
+        rows = [(user_id, self.encoder.encode(user_data), expire_at) for user_id, user_data in data.items()]
+        with self._transaction() as conn:
+            conn.executemany(_SQL[_DATA]["set"], rows)
+
+    def delete_data_many(
+        self,
+        user_ids: Iterable[Union[int, str]],
+        default: Optional[Any] = None
+    ) -> List[Optional[Dict[Any, Any]]]:
+        """Clear and get data of many users in one transaction.
+
+        Args:
+            user_ids (Iterable[int | str]): IDs of the users
+            default (Any, optional): Default value for users without data.
+                Defaults to None.
+
+        Returns:
+            list[dict[str, Any] | None]: Deleted data in order of `user_ids`
+        """
+        user_ids = list(user_ids)
+        values = self._delete_many(_DATA, user_ids)
+        return [self.decoder.decode(values[user_id]) if user_id in values else default for user_id in user_ids]
@@ -1,11 +1,53 @@
+import typing
 from enum import Enum
 
 from .asyncio import BaseAsyncStorage
-from .storage import BaseStorage
-from aiogram import types
+from .storage import BaseStorage, StateContext
+from aiogram import BaseMiddleware, types
+from aiogram.dispatcher.event.handler import CallableObject
 from aiogram.filters import Filter
 
 
+class StateMiddleware(BaseMiddleware):
+    """
+    aiogram middleware which fetches the user's state once per update.
+
+    The `StateContext` (or None) is put into handler data as `aiostep_state`, so
+    filters like `IsState(..., cached=True)` and handlers can read it without
+    querying the storage again.
+
+    Args:
+        state_manager (BaseStorage | BaseAsyncStorage): Storage to read states from.
+
+    Example::
+
+        dp.message.outer_middleware(StateMiddleware(state_manager))
+
+        @dp.message(IsState("STEP_ONE", state_manager, cached=True))
+        async def step_one(message: Message, aiostep_state: StateContext):
+            ...
+    """
+
+    def __init__(self, state_manager: BaseStorage | BaseAsyncStorage) -> None:
+        self.state_manager = state_manager
+        self.sync = isinstance(state_manager, BaseStorage)
+
+    async def __call__(
+        self,
+        handler: typing.Callable[[types.TelegramObject, typing.Dict[str, typing.Any]], typing.Awaitable[typing.Any]],
+        event: types.TelegramObject,
+        data: typing.Dict[str, typing.Any]
+    ) -> typing.Any:
+        user = getattr(event, "from_user", None)
+        if user is not None:
+            if self.sync:
+                data["aiostep_state"] = self.state_manager.get_state(user.id)
+            else:
+                data["aiostep_state"] = await self.state_manager.get_state(user.id)
+
+        return await handler(event, data)
+
+
 class IsState(Filter):
     """
     A filter to validate the current state of a user using aiostep's state management.
@@ -17,6 +59,8 @@ class IsState(Filter):
         state (str | Enum): The target state to match. If an `Enum` is provided, its `name` will be used.
         state_manager (BaseStorage | BaseAsyncStorage): 
             An instance of aiostep's asynchronous state manager for retrieving and validating user states.
+        cached (bool): Read the state fetched by `StateMiddleware` instead of querying
+            `state_manager`. Falls back to `state_manager` if the middleware isn't set up.
 
     Methods:
         __call__(event): Processes an input event and validates the user's current state.
@@ -24,9 +68,15 @@ class IsState(Filter):
             - Returns (bool): True if the user's state matches the target state, False otherwise.
     """
 
-    def __init__(self, state: str | Enum, state_manager: BaseStorage | BaseAsyncStorage) -> None:
+    def __init__(
+        self,
+        state: str | Enum,
+        state_manager: BaseStorage | BaseAsyncStorage,
+        cached: bool = False
+    ) -> None:
         self.state = state.name if isinstance(state, Enum) else state
         self.state_manager = state_manager
+        self.cached = cached
         if isinstance(state_manager, BaseStorage):
             self.sync = True
         else:
@@ -34,9 +84,12 @@ class IsState(Filter):
 
     async def __call__(
         self,
-        event: types.Message | types.CallbackQuery
+        event: types.Message | types.CallbackQuery,
+        **kwargs: typing.Any
     ) -> bool:
-        if self.sync:
+        if self.cached and "aiostep_state" in kwargs:
+            current_state = kwargs["aiostep_state"]
+        elif self.sync:
             current_state = self.state_manager.get_state(event.from_user.id)
         else:
             current_state = await self.state_manager.get_state(event.from_user.id)
@@ -46,3 +99,110 @@ class IsState(Filter):
         chat_id = event.message.chat.id if isinstance(event, types.CallbackQuery) else event.chat.id
 
         return (current_state.current_state == self.state) and (current_state.chat_id == chat_id)
+
+
+class StateRouter(Filter):
+    """
+    Routes updates to handlers by the user's current state.
+
+    Handlers are kept in a dict keyed by state name, so finding the handler
+    takes one `get_state` and one lookup, no matter how many states there are.
+
+    Args:
+        state_manager (BaseStorage | BaseAsyncStorage): Storage to read states from.
+        handlers (Mapping[str | Enum, Callable] | None): Handler of each state.
+        callbacks (Iterable[Callable]): Extra functions which may be saved as
+            `StateContext.callback`, so `resolve_callback` can find them by name.
+        cached (bool): Read the state fetched by `StateMiddleware` if it's available.
+
+    Example::
+
+        states = StateRouter(state_manager, {Form.NAME: ask_name, Form.AGE: ask_age})
+        dp.message.register(states.dispatch, states)
+
+        @states.handler(Form.PHOTO)
+        async def ask_photo(message: Message):
+            ...
+    """
+
+    def __init__(
+        self,
+        state_manager: BaseStorage | BaseAsyncStorage,
+        handlers: typing.Optional[typing.Mapping[str | Enum, typing.Callable[..., typing.Any]]] = None,
+        callbacks: typing.Iterable[typing.Callable[..., typing.Any]] = (),
+        cached: bool = False
+    ) -> None:
+        self.state_manager = state_manager
+        self.sync = isinstance(state_manager, BaseStorage)
+        self.cached = cached
+        self._handlers: typing.Dict[str, CallableObject] = {}
+        self._callbacks: typing.Dict[str, typing.Callable[..., typing.Any]] = {}
+
+        for state, handler in (handlers or {}).items():
+            self.add(state, handler)
+        for callback in callbacks:
+            self._callbacks[callback.__name__] = callback
+
+    def add(self, state: str | Enum, handler: typing.Callable[..., typing.Any]) -> None:
+        """
+        sets `handler` for `state`.
+        """
+        name = state.name if isinstance(state, Enum) else state
+        self._handlers[name] = CallableObject(handler)
+        self._callbacks[handler.__name__] = handler
+
+    def handler(self, state: str | Enum) -> typing.Callable:
+        """
+        decorator version of `add`.
+        """
+        def decorator(handler: typing.Callable[..., typing.Any]) -> typing.Callable[..., typing.Any]:
+            self.add(state, handler)
+            return handler
+        return decorator
+
+    def resolve_callback(self, context: StateContext) -> typing.Optional[typing.Callable[..., typing.Any]]:
+        """
+        gives the function of `context.callback`.
+
+        storages which save callbacks by name (e.g. `RedisStateStorage`) give a string,
+        which is looked up in registered handlers and callbacks.
+        """
+        callback = context.callback
+        if callback is None or callable(callback):
+            return callback
+        return self._callbacks.get(callback)
+
+    async def __call__(
+        self,
+        event: types.Message | types.CallbackQuery,
+        **kwargs: typing.Any
+    ) -> bool | typing.Dict[str, typing.Any]:
+        if self.cached and "aiostep_state" in kwargs:
+            current_state = kwargs["aiostep_state"]
+        elif self.sync:
+            current_state = self.state_manager.get_state(event.from_user.id)
+        else:
+            current_state = await self.state_manager.get_state(event.from_user.id)
+        if not current_state:
+            return False
+
+        handler = self._handlers.get(current_state.current_state)
+        if handler is None:
+            return False
+
+        chat_id = event.message.chat.id if isinstance(event, types.CallbackQuery) else event.chat.id
+        if current_state.chat_id != chat_id:
+            return False
+
+        return {"aiostep_state": current_state, "aiostep_handler": handler}
+
+    async def dispatch(
+        self,
+        event: types.TelegramObject,
+        aiostep_handler: CallableObject,
+        **kwargs: typing.Any
+    ) -> typing.Any:
+        """
+        aiogram handler which calls the handler found by this filter.
+        """
+        return await aiostep_handler.call(event, **kwargs)
@@ -0,0 +1,77 @@
+"""
+Measures memory used per user by `MemoryStateStorage`.
+
+Compares the `msgspec.Struct` based `StateContext` with the previous dataclass
+version, with state names built at runtime (e.g. read from a database).
+
+Usage::
+
+    python benchmarks/memory_per_user.py [users]
+"""
+import gc
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Optional, Union
+
+from aiostep import MemoryStateStorage
+
+STATES = ("MENU", "ASK_NAME", "ASK_AGE", "CONFIRM", "DONE")
+
+
+@dataclass
+class DataclassStateContext:
+    current_state: Optional[str] = None
+    callback: Any = None
+    chat_id: Optional[Union[int, str]] = None
+
+
+def state_name(user_id: int) -> str:
+    # a new string object for every user, like names decoded from storage.
+    return "".join(STATES[user_id % len(STATES)])
+
+
+def measure(name: str, users: int, fill) -> None:
+    gc.collect()
+    tracemalloc.start()
+    storage = fill(users)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<28} {memory / users:8.0f} bytes/user")
+    del storage
+
+
+def fill_dataclass(users: int) -> MemoryStateStorage:
+    storage = MemoryStateStorage()
+    for user_id in range(users):
+        storage.cache[user_id] = DataclassStateContext(
+            current_state=state_name(user_id),
+            chat_id=user_id
+        )
+    return storage
+
+
+def fill_states(users: int) -> MemoryStateStorage:
+    storage = MemoryStateStorage()
+    for user_id in range(users):
+        storage.set_state(user_id, state_name(user_id))
+    return storage
+
+
+def fill_states_and_data(users: int) -> MemoryStateStorage:
+    storage = MemoryStateStorage()
+    for user_id in range(users):
+        storage.set_state(user_id, state_name(user_id))
+        storage.set_data(user_id, {"step": 1})
+    return storage
+
+
+def main() -> None:
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    measure("dataclass StateContext", users, fill_dataclass)
+    measure("StateContext", users, fill_states)
+    measure("StateContext + data", users, fill_states_and_data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Measures time per call of `MemoryStateStorage` methods with the default
+thread-safe `cachebox.Cache`, with plain dicts (`thread_safe=False`) and
+without copying data (`copy_on_write=True`).
+
+Usage::
+
+    python benchmarks/memory_storage_ops.py [users]
+"""
+import sys
+import time
+
+from aiostep import MemoryStateStorage
+
+CART = [{"id": item, "count": 1, "options": ["a", "b"]} for item in range(10)]
+
+
+def run(name: str, storage: MemoryStateStorage, users: int) -> None:
+    timings = []
+    for method, call in (
+        ("set_state", lambda user_id: storage.set_state(user_id, "MENU")),
+        ("get_state", lambda user_id: storage.get_state(user_id)),
+        ("update_data", lambda user_id: storage.update_data(user_id, {"step": 1, "cart": CART})),
+        ("get_data", lambda user_id: storage.get_data(user_id)),
+    ):
+        started = time.perf_counter()
+        for user_id in range(users):
+            call(user_id)
+        timings.append(f"{method} {(time.perf_counter() - started) / users * 1e9:6.0f} ns")
+
+    print(f"{name:<15}", "  ".join(timings))
+
+
+def main() -> None:
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    run("cachebox.Cache", MemoryStateStorage(), users)
+    run("dict", MemoryStateStorage(thread_safe=False), users)
+    run("copy_on_write", MemoryStateStorage(copy_on_write=True), users)
+
+
+if __name__ == "__main__":
+    main()
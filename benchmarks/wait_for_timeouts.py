@@ -0,0 +1,58 @@
+"""
+Compares `wait_for` timeouts handled by `asyncio.wait_for` and by `TimingWheel`.
+
+Reports memory per pending waiter and time spent to start and cancel waiters.
+
+Usage::
+
+    python benchmarks/wait_for_timeouts.py [waiters]
+"""
+import asyncio
+import gc
+import sys
+import time
+import tracemalloc
+
+import aiostep
+from aiostep import MemoryMetaStore
+
+
+async def run(waiters: int, wheel) -> None:
+    store = MemoryMetaStore()
+    tracemalloc.start()
+    started = time.perf_counter()
+
+    tasks = [
+        asyncio.ensure_future(aiostep.wait_for(i, timeout=600, store=store, wheel=wheel))
+        for i in range(waiters)
+    ]
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    elapsed = time.perf_counter() - started
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    cancelled = time.perf_counter() - started
+
+    name = "TimingWheel" if wheel is not None else "asyncio.wait_for"
+    print(
+        f"{name:<18} {memory / waiters:8.0f} bytes/waiter"
+        f" {elapsed / waiters * 1e6:8.2f} us/start"
+        f" {cancelled / waiters * 1e6:8.2f} us/cancel"
+    )
+
+
+def main() -> None:
+    waiters = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    for wheel in (None, aiostep.TimingWheel()):
+        gc.collect()
+        asyncio.run(run(waiters, wheel))
+
+
+if __name__ == "__main__":
+    main()
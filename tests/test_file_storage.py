@@ -0,0 +1,30 @@
+import asyncio
+
+from aiostep.asyncio.file import AsyncFileStateStorage
+
+
+def test_sweeper_keeps_sequential_writes(tmp_path):
+    path = tmp_path / "states.json"
+
+    async def main():
+        storage = AsyncFileStateStorage(path)
+        storage.start_sweeper(interval=0.001, limit=None)
+        for user_id in range(200):
+            # expiring records give every sweep something to remove and write
+            await storage.set_data(f"short-{user_id}", {"n": user_id}, ex=0.001)
+            await storage.set_data(user_id, {"n": user_id})
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.05)
+        await storage.sweep()
+        await storage.close()
+        return storage
+
+    storage = asyncio.run(main())
+    assert storage.purged == 200
+    assert storage.sweep_stats()["indexed"] == 0
+
+    async def check():
+        reopened = AsyncFileStateStorage(path)
+        return [await reopened.get_data(user_id) for user_id in range(200)]
+
+    assert asyncio.run(check()) == [{"n": user_id} for user_id in range(200)]
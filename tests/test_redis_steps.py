@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+import aiostep
+from aiostep.steps.redis import RedisMetaStore
+
+
+def _stores(count, **kwargs):
+    server = fakeredis.FakeServer()
+    return [
+        RedisMetaStore(fakeredis.FakeAsyncRedis(server=server), worker_id=f"worker-{index}", **kwargs)
+        for index in range(count)
+    ]
+
+
+def test_wait_for_answered_by_other_worker():
+    async def main():
+        owner, other = _stores(2)
+        waiter = asyncio.ensure_future(aiostep.wait_for(1, timeout=2, store=owner))
+        await asyncio.sleep(0.05)
+
+        future = await other.pop_item(1)
+        future.set_result("answer")
+        result = await waiter
+
+        await owner.close()
+        await other.close()
+        return result
+
+    assert asyncio.run(main()) == "answer"
+
+
+def test_next_step_runs_on_other_worker():
+    calls = []
+
+    async def handle_answer(update, suffix=""):
+        calls.append(update + suffix)
+
+    async def main():
+        owner, other = _stores(2)
+        for store in (owner, other):
+            store.register_step(handle_answer)
+
+        await aiostep.register_next_step(1, handle_answer, owner, kwargs={"suffix": "!"})
+        step = await other.pop_item(1)
+        await step("hi")
+
+        await owner.close()
+        await other.close()
+
+    asyncio.run(main())
+    assert calls == ["hi!"]
+
+
+def test_concurrent_first_use_opens_one_listener():
+    async def main():
+        owner, other = _stores(2, policy="broadcast")
+        opened = []
+        pubsub = owner.cache.pubsub
+
+        def counting_pubsub(**kwargs):
+            opened.append(pubsub(**kwargs))
+            return opened[-1]
+
+        owner.cache.pubsub = counting_pubsub
+        waiters = [asyncio.ensure_future(aiostep.wait_for(1, timeout=2, store=owner)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+
+        for future in await other.pop_first([1]):
+            future.set_result("answer")
+        results = await asyncio.gather(*waiters)
+
+        await owner.close()
+        await other.close()
+        return opened, results
+
+    opened, results = asyncio.run(main())
+    assert len(opened) == 1
+    assert results == ["answer"] * 3
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+from cachebox import LRUCache
+
+from aiostep.asyncio.redis import AsyncRedisStateStorage
+
+
+async def _settle():
+    # let the listeners receive published invalidations
+    for _ in range(10):
+        await asyncio.sleep(0.01)
+
+
+def _storages(count):
+    server = fakeredis.FakeServer()
+    return [
+        AsyncRedisStateStorage(fakeredis.FakeAsyncRedis(server=server), local_cache=LRUCache(100))
+        for _ in range(count)
+    ]
+
+
+def test_local_cache_sees_remote_write_after_local_write():
+    async def main():
+        first, second = _storages(2)
+        await first.set_state(1, "S1")
+        await second.set_state(1, "S2")
+        await _settle()
+        state = await first.get_state(1)
+
+        await first.set_data(1, {"a": 1})
+        assert await first.get_data(1) == {"a": 1}
+        await second.update_data(1, {"b": 2})
+        await _settle()
+        data = await first.get_data(1)
+
+        await first.close()
+        await second.close()
+        return state, data
+
+    state, data = asyncio.run(main())
+    assert state.current_state == "S2"
+    assert data == {"a": 1, "b": 2}
+
+
+def test_concurrent_first_reads_open_one_pubsub():
+    async def main():
+        storage, = _storages(1)
+        opened = []
+        pubsub = storage.cache.pubsub
+
+        def counting_pubsub(**kwargs):
+            opened.append(pubsub(**kwargs))
+            return opened[-1]
+
+        storage.cache.pubsub = counting_pubsub
+        await asyncio.gather(*(storage.get_state(user_id) for user_id in range(5)))
+        await storage.close()
+        return opened
+
+    assert len(asyncio.run(main())) == 1